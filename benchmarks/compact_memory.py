@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2009-2010 by Gustavo Narea <http://gustavonarea.net/>.
+#
+# This file is part of Booleano <http://booleano.efous.org/>.
+#
+# This program is Freedomware: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+Size of a large set of parse trees stored in a compact forest.
+
+Run it with Booleano in the Python path::
+
+    PYTHONPATH=src python benchmarks/compact_memory.py [node_count]
+
+Compare the results with those of ``node_memory.py``, which uses the same
+trees.
+
+"""
+
+import sys
+from time import time
+
+from booleano.nodes.compact import CompactForest
+
+from node_memory import NODES_PER_TREE, make_tree
+
+
+def main(node_count):
+    tree_count = node_count // NODES_PER_TREE
+    forest = CompactForest.from_nodes(make_tree(index) for index in
+                                      xrange(tree_count))
+    forest_size = len(forest.to_bytes())
+    
+    start_time = time()
+    for tree_index in xrange(len(forest)):
+        forest.evaluate(tree_index, None)
+    evaluation_time = time() - start_time
+    
+    print "Trees: %s" % len(forest)
+    print "Nodes: %s" % (tree_count * NODES_PER_TREE)
+    print "Size: %.1f MiB" % (forest_size / 1024.0 / 1024.0)
+    print "Bytes per node: %.1f" % (float(forest_size) /
+                                    (tree_count * NODES_PER_TREE))
+    print "Evaluation time: %.2f s" % evaluation_time
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        main(int(sys.argv[1]))
+    else:
+        main(1000000)
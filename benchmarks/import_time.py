@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2009-2010 by Gustavo Narea <http://gustavonarea.net/>.
+#
+# This file is part of Booleano <http://booleano.efous.org/>.
+#
+# This program is Freedomware: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+Time taken to import the parser package, with the modules it loads.
+
+Run it with Booleano in the Python path::
+
+    PYTHONPATH=src python benchmarks/import_time.py [-v]
+
+Each import is made in a fresh interpreter. Like ``python -X importtime`` on
+Python 3.7+, the verbose mode prints the cumulative time spent importing each
+module, indented by nesting level.
+
+The exit code is 1 if importing the grammar or the scope definitions loads the
+parser machinery (or an import fails), so the script can guard against
+regressions.
+
+"""
+
+import sys
+from subprocess import PIPE, Popen
+
+
+# The statements to be timed and the modules they must not load:
+IMPORTS = (
+    ("from booleano.parser import Grammar, SymbolTable, Bind",
+     ("pyparsing", "booleano.parser.parsers", "booleano.nodes.operations",
+      "multiprocessing")),
+    ("from booleano.parser import EvaluableParseManager", ("pyparsing", )),
+    ("from booleano.parser.parsers import EvaluableParser", ()),
+    )
+
+# Code run in the fresh interpreter to time the imports made by a statement:
+TIMER_CODE = """
+import __builtin__, sys
+from time import time
+
+original_import = __builtin__.__import__
+imports = []
+level = [0]
+
+def timed_import(name, *args, **kwargs):
+    was_loaded = name in sys.modules
+    level[0] += 1
+    start_time = time()
+    try:
+        return original_import(name, *args, **kwargs)
+    finally:
+        level[0] -= 1
+        if not was_loaded and name in sys.modules:
+            imports.append((level[0], name, time() - start_time))
+
+__builtin__.__import__ = timed_import
+start_time = time()
+exec %r
+total_time = time() - start_time
+__builtin__.__import__ = original_import
+
+for (level, name, elapsed_time) in imports:
+    print "%%9.1f | %%s%%s" %% (elapsed_time * 1000, "  " * level, name)
+print "TOTAL %%.1f" %% (total_time * 1000)
+print "LOADED " + " ".join(sorted(sys.modules))
+"""
+
+
+def time_import(statement):
+    """
+    Import ``statement`` in a fresh interpreter and return the milliseconds it
+    took, the timings of the modules imported and the names of all the
+    modules loaded.
+    
+    :raises RuntimeError: If ``statement`` cannot be run.
+    
+    """
+    process = Popen([sys.executable, "-c", TIMER_CODE % statement],
+                    stdout=PIPE)
+    output = process.communicate()[0].splitlines()
+    if process.returncode:
+        raise RuntimeError("%r failed with exit code %s" % (statement,
+                                                           process.returncode))
+    module_times = output[:-2]
+    total_time = float(output[-2].split()[1])
+    loaded_modules = set(output[-1].split()[1:])
+    return (total_time, module_times, loaded_modules)
+
+
+def main(verbose):
+    failures = []
+    for (statement, forbidden_modules) in IMPORTS:
+        try:
+            (total_time, module_times, loaded_modules) = time_import(statement)
+        except RuntimeError, exc:
+            failures.append(str(exc))
+            continue
+        print "%7.1f ms: %s" % (total_time, statement)
+        if verbose:
+            print "cumulative (ms) | imported module"
+            for line in module_times:
+                print line
+            print
+        for module_name in forbidden_modules:
+            if module_name in loaded_modules:
+                failures.append("%r loads %s" % (statement, module_name))
+    
+    for failure in failures:
+        print "FAILURE: %s" % failure
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main("-v" in sys.argv[1:]))
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2009-2010 by Gustavo Narea <http://gustavonarea.net/>.
+#
+# This file is part of Booleano <http://booleano.efous.org/>.
+#
+# This program is Freedomware: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+Memory used by a large set of parse trees which repeat the same constants and
+clauses, with and without interning.
+
+Run it with Booleano in the Python path, with and without the
+``--interned`` option::
+
+    PYTHONPATH=src python benchmarks/interning_memory.py [tree_count]
+    PYTHONPATH=src python benchmarks/interning_memory.py --interned [tree_count]
+
+"""
+
+import sys
+from resource import getrusage, RUSAGE_SELF
+
+from booleano.nodes.constants import Number
+from booleano.nodes.interning import NodeInterner
+from booleano.nodes.operations import Or, And, LessThan, GreaterThan
+
+
+def make_tree(index, intern):
+    """
+    Return a parse tree built bottom-up, like the parser does, using a small
+    vocabulary of constants.
+    
+    """
+    number1 = intern(Number(index % 10))
+    number2 = intern(Number(index % 7))
+    number3 = intern(Number(100))
+    tree = intern(Or(
+        intern(And(intern(LessThan(number1, number2)),
+                   intern(GreaterThan(number1, number3)))),
+        intern(LessThan(number2, number3)),
+        ))
+    return tree
+
+
+def get_peak_memory():
+    """Return the peak memory used by the process, in KiB."""
+    return getrusage(RUSAGE_SELF).ru_maxrss
+
+
+def main(tree_count, interned):
+    if interned:
+        intern = NodeInterner().intern
+    else:
+        intern = lambda node: node
+    initial_memory = get_peak_memory()
+    trees = [make_tree(index, intern) for index in xrange(tree_count)]
+    used_memory = get_peak_memory() - initial_memory
+    
+    print "Trees: %s (%s)" % (len(trees),
+                              "interned" if interned else "not interned")
+    print "Memory: %.1f MiB" % (used_memory / 1024.0)
+
+
+if __name__ == "__main__":
+    # Each run must be made in a separate process because the peak memory is
+    # measured:
+    arguments = sys.argv[1:]
+    interned = "--interned" in arguments
+    if interned:
+        arguments.remove("--interned")
+    if arguments:
+        main(int(arguments[0]), interned)
+    else:
+        main(100000, interned)
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2009-2010 by Gustavo Narea <http://gustavonarea.net/>.
+#
+# This file is part of Booleano <http://booleano.efous.org/>.
+#
+# This program is Freedomware: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+Time taken to resolve identifiers in 6-level namespaces of a symbol table with
+50,000 bindings, while parsing and on their own.
+
+Run it with Booleano in the Python path::
+
+    PYTHONPATH=src python benchmarks/namespace_lookup.py [expression_count]
+
+"""
+
+import sys
+from time import time
+
+from booleano.nodes.constants import Number
+from booleano.parser import Bind, EvaluableParseManager, Grammar, SymbolTable
+
+
+BINDING_COUNT = 50000
+
+# The amount of sub-tables in each table, and the levels of sub-tables:
+BRANCHING = 2
+DEPTH = 6
+
+# The amount of identifiers in each expression:
+IDENTIFIERS_PER_EXPRESSION = 4
+
+
+def make_symbol_table():
+    """
+    Return a symbol table whose bindings are spread among the tables at the
+    deepest level, along with the paths to the bindings.
+    
+    """
+    leaf_paths = [()]
+    for level in xrange(DEPTH):
+        leaf_paths = [path + ("level%s_%s" % (level, branch), )
+                      for path in leaf_paths for branch in xrange(BRANCHING)]
+    
+    bindings_per_table = BINDING_COUNT // len(leaf_paths)
+    tables_by_path = {}
+    binding_paths = []
+    for path in leaf_paths:
+        objects = []
+        for index in xrange(bindings_per_table):
+            name = "var%s" % index
+            objects.append(Bind(name, Number(index)))
+            binding_paths.append(path + (name, ))
+        tables_by_path[path] = SymbolTable(path[-1], objects)
+    
+    # Building the ancestors, from the deepest level to the root table:
+    for level in reversed(xrange(DEPTH)):
+        parent_tables = {}
+        for (path, table) in sorted(tables_by_path.items()):
+            parent_path = path[:-1]
+            parent_tables.setdefault(parent_path, []).append(table)
+        tables_by_path = {}
+        for (parent_path, subtables) in parent_tables.items():
+            name = parent_path[-1] if parent_path else "root"
+            tables_by_path[parent_path] = SymbolTable(name, (), *subtables)
+    
+    return (tables_by_path[()], binding_paths)
+
+
+def make_expressions(binding_paths, expression_count):
+    """Return ``expression_count`` expressions using the ``binding_paths``."""
+    expressions = []
+    for index in xrange(expression_count):
+        identifiers = []
+        for offset in xrange(IDENTIFIERS_PER_EXPRESSION):
+            path = binding_paths[(index * 7919 + offset * 104729) %
+                                 len(binding_paths)]
+            identifiers.append("%s > %s" % (":".join(path), offset))
+        expressions.append(" & ".join(identifiers))
+    return expressions
+
+
+def main(expression_count):
+    (symbol_table, binding_paths) = make_symbol_table()
+    namespace = symbol_table.get_namespace()
+    
+    # The objects are resolved the first time they're requested and then
+    # cached, so both lookups are timed separately:
+    lookups = [(path[-1], list(path[:-1])) for path in binding_paths]
+    lookup_times = []
+    for round_ in ("first", "repeated"):
+        start_time = time()
+        for (object_name, namespace_parts) in lookups:
+            namespace.get_object(object_name, namespace_parts)
+        lookup_times.append(time() - start_time)
+    
+    expressions = make_expressions(binding_paths, expression_count)
+    parse_manager = EvaluableParseManager(symbol_table, Grammar())
+    start_time = time()
+    for expression in expressions:
+        parse_manager.parse(expression)
+    parse_time = time() - start_time
+    
+    print "Bindings: %s, in %s-level namespaces" % (len(binding_paths), DEPTH)
+    print "Lookups: %.2f us each the first time, %.2f us after that" % tuple(
+        lookup_time * 1000000 / len(lookups) for lookup_time in lookup_times)
+    print "Parsing: %.2f ms per expression (%s expressions with %s " \
+          "identifiers each)" % (parse_time * 1000 / expression_count,
+                                 expression_count, IDENTIFIERS_PER_EXPRESSION)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        main(int(sys.argv[1]))
+    else:
+        main(2000)
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2009-2010 by Gustavo Narea <http://gustavonarea.net/>.
+#
+# This file is part of Booleano <http://booleano.efous.org/>.
+#
+# This program is Freedomware: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+Memory used by a large set of parse trees.
+
+Run it with Booleano in the Python path::
+
+    PYTHONPATH=src python benchmarks/node_memory.py [node_count]
+
+"""
+
+import sys
+from resource import getrusage, RUSAGE_SELF
+
+from booleano.nodes.constants import Number
+from booleano.nodes.operations import Or, And, LessThan, GreaterThan
+
+
+# The amount of nodes in each tree made by make_tree():
+NODES_PER_TREE = 11
+
+
+def make_tree(index):
+    """Return a parse tree with :data:`NODES_PER_TREE` distinct nodes."""
+    tree = Or(
+        And(LessThan(Number(index), Number(index + 1)),
+            GreaterThan(Number(index), Number(index + 2))),
+        LessThan(Number(index), Number(index + 3)),
+        )
+    return tree
+
+
+def get_peak_memory():
+    """Return the peak memory used by the process, in KiB."""
+    return getrusage(RUSAGE_SELF).ru_maxrss
+
+
+def main(node_count):
+    tree_count = node_count // NODES_PER_TREE
+    initial_memory = get_peak_memory()
+    trees = [make_tree(index) for index in xrange(tree_count)]
+    used_memory = get_peak_memory() - initial_memory
+    
+    print "Trees: %s" % len(trees)
+    print "Nodes: %s" % (tree_count * NODES_PER_TREE)
+    print "Memory: %.1f MiB" % (used_memory / 1024.0)
+    print "Bytes per node: %.1f" % (used_memory * 1024.0 /
+                                    (tree_count * NODES_PER_TREE))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        main(int(sys.argv[1]))
+    else:
+        main(1000000)
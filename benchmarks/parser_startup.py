@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2009-2010 by Gustavo Narea <http://gustavonarea.net/>.
+#
+# This file is part of Booleano <http://booleano.efous.org/>.
+#
+# This program is Freedomware: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+Time taken by a new process to parse its first expression in each of 20
+locales, which includes building one parser per locale.
+
+Run it with Booleano in the Python path::
+
+    PYTHONPATH=src python benchmarks/parser_startup.py
+
+"""
+
+from time import time
+
+start_time = time()
+
+from booleano.parser import Grammar, ConvertibleParseManager
+
+
+LOCALES = ("ar", "de", "en", "es", "fa", "fr", "he", "hi", "it", "ja", "ko",
+           "nl", "pl", "pt", "ru", "sv", "th", "tr", "vi", "zh")
+
+EXPRESSION = u'today > yesterday & ns:day ∈ {"monday", "friday"}'
+
+
+def main():
+    import_time = time() - start_time
+    
+    grammars = dict((locale, Grammar()) for locale in LOCALES)
+    parse_manager = ConvertibleParseManager(Grammar(), **grammars)
+    parse_times = []
+    for locale in LOCALES:
+        locale_start_time = time()
+        parse_manager.parse(EXPRESSION, locale)
+        parse_times.append(time() - locale_start_time)
+    
+    print "Import: %.3f s" % import_time
+    print "First parse per locale: %.1f ms on average (%.1f ms max)" % (
+        sum(parse_times) * 1000 / len(parse_times), max(parse_times) * 1000)
+    print "Time to first parse in %s locales: %.3f s" % (len(LOCALES),
+                                                          time() - start_time)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2009-2010 by Gustavo Narea <http://gustavonarea.net/>.
+#
+# This file is part of Booleano <http://booleano.efous.org/>.
+#
+# This program is Freedomware: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+Time taken to build and validate a symbol table with 100,000 bindings named in
+12 locales, and to validate it again after adding one binding.
+
+Run it with Booleano in the Python path::
+
+    PYTHONPATH=src python benchmarks/scope_validation.py [binding_count]
+
+"""
+
+import sys
+from time import time
+
+from booleano.nodes.constants import Number
+from booleano.parser import Bind, SymbolTable
+
+
+LOCALES = ("de", "en_GB", "en_US", "es_ES", "es_VE", "fr", "it", "ja", "nl",
+           "pt_BR", "ru", "zh")
+
+TABLE_COUNT = 10
+
+
+def make_symbol_table(binding_count):
+    """Return a symbol table with ``binding_count`` localized bindings."""
+    subtables = []
+    bindings_per_table = binding_count // TABLE_COUNT
+    for table_index in xrange(TABLE_COUNT):
+        objects = []
+        for index in xrange(bindings_per_table):
+            names = dict((locale, "%s_%s" % (locale, index))
+                         for locale in LOCALES)
+            objects.append(Bind("var%s" % index, Number(index), **names))
+        subtables.append(SymbolTable("table%s" % table_index, objects))
+    return SymbolTable("root", (), *subtables)
+
+
+def main(binding_count):
+    start_time = time()
+    symbol_table = make_symbol_table(binding_count)
+    build_time = time() - start_time
+    
+    start_time = time()
+    symbol_table.validate_scope(full=True)
+    full_validation_time = time() - start_time
+    
+    subtable = sorted(symbol_table.subtables)[0]
+    subtable.add_object(Bind("new_var", Number(0), es_ES="nueva_variable"))
+    start_time = time()
+    symbol_table.validate_scope()
+    validation_time = time() - start_time
+    
+    print "Bindings: %s, named in %s locales" % (binding_count, len(LOCALES))
+    print "Building: %.2f s" % build_time
+    print "Full validation: %.2f s" % full_validation_time
+    print "Validation after adding a binding: %.2f ms" % (
+        validation_time * 1000)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        main(int(sys.argv[1]))
+    else:
+        main(100000)
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2009-2010 by Gustavo Narea <http://gustavonarea.net/>.
+#
+# This file is part of Booleano <http://booleano.efous.org/>.
+#
+# This program is Freedomware: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+Time taken to parse expressions with large set literals, like
+``sku ∈ {"sku0", "sku1", ...}``.
+
+Run it with Booleano in the Python path::
+
+    PYTHONPATH=src python benchmarks/set_literal_parsing.py [max_element_count]
+
+The time per element must remain constant as the sets grow. The general
+syntax definition for sets is measured with the smaller sets only, for
+comparison. The exit code is 1 if both definitions yield different parse
+trees.
+
+"""
+
+import sys
+from time import time
+
+from pyparsing import NoMatch
+
+from booleano.parser import Grammar
+from booleano.parser.parsers import ConvertibleParser
+
+
+class GeneralSetParser(ConvertibleParser):
+    """Convertible parser without the fast path for literal sets."""
+    
+    def define_literal_set(self):
+        return NoMatch()
+
+
+def make_expression(grammar, element_count, numeric):
+    """Return an expression with a set of ``element_count`` literals."""
+    if numeric:
+        elements = [str(index) for index in xrange(element_count)]
+    else:
+        elements = ['"sku%s"' % index for index in xrange(element_count)]
+    set_ = "%s%s%s" % (grammar.get_token("set_start"),
+                       ", ".join(elements),
+                       grammar.get_token("set_end"))
+    return u"sku %s %s" % (grammar.get_token("belongs_to"), set_)
+
+
+def time_parser(parser, expression):
+    """
+    Return the seconds taken by ``parser`` to parse ``expression``, along
+    with the resulting parse tree.
+    
+    """
+    parser.build_parser()
+    start_time = time()
+    tree = parser(expression)
+    return (time() - start_time, tree)
+
+
+def main(max_element_count):
+    grammar = Grammar()
+    trees_match = True
+    element_count = 100
+    while element_count <= max_element_count:
+        for numeric in (False, True):
+            expression = make_expression(grammar, element_count, numeric)
+            (elapsed_time, tree) = time_parser(ConvertibleParser(grammar),
+                                               expression)
+            line = "%7s %-7s: %8.3f s (%5.1f us/element)" % (
+                element_count, "numbers" if numeric else "strings",
+                elapsed_time, elapsed_time * 1000000 / element_count)
+            if element_count <= 1000:
+                (general_time, general_tree) = time_parser(
+                    GeneralSetParser(grammar), expression)
+                line += "; general syntax: %8.3f s" % general_time
+                if general_tree != tree:
+                    line += " (DIFFERENT TREE)"
+                    trees_match = False
+            print line
+        element_count *= 10
+    return trees_match
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        trees_match = main(int(sys.argv[1]))
+    else:
+        trees_match = main(100000)
+    sys.exit(0 if trees_match else 1)
@@ -52,7 +52,7 @@ setup(name="booleano",
       package_dir={'': "src"},
       packages=find_packages("src"),
       zip_safe=False,
-      tests_require = ["coverage >= 3.0", "nose >= 0.11.0"],
+      tests_require = ["coverage >= 3.0", "nose >= 0.11.0", "futures >= 2.1"],
       install_requires=["pyparsing >= 1.5.2, < 2.0"],
       test_suite="nose.collector",
       )
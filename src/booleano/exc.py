@@ -96,11 +96,33 @@ class BadExpressionError(ParsingException):
     pass
 
 
+class ExpressionTooComplexError(BadExpressionError):
+    """
+    Exception raised when an expression is rejected because it exceeds the
+    complexity limits of the parse manager.
+    
+    """
+    pass
+
+
 class ScopeError(ParsingException):
     """Exception raised when a scope-related item is defined incorrectly."""
     pass
 
 
+#{ Evaluation-related exceptions
+
+
+class BudgetExceededError(BooleanoException):
+    """
+    Exception raised when the evaluation of a parse tree is aborted because it
+    exceeded its budget (i.e., too many nodes were visited or it took too
+    long).
+    
+    """
+    pass
+
+
 #{ Conversion-related exceptions
 
 
@@ -24,7 +24,7 @@ They represent the parse tree when a boolean expression has been parsed.
 
 from abc import ABCMeta, abstractmethod, abstractproperty
 from collections import Mapping
-from sys import maxint
+from copy import copy
 
 from booleano.nodes.datatypes import Datatype
 from booleano.exc import BadCallError, BadFunctionError
@@ -37,10 +37,40 @@ class OperationNode(object):
     """
     Base class for the operation nodes.
     
+    Nodes use ``__slots__`` to keep large parse trees small in memory, so
+    built-in subclasses must define them too (user-defined nodes get a
+    ``__dict__`` unless they define ``__slots__`` as well).
+    
+    Nodes can be weakly referenced, so that they can be interned (see
+    :class:`booleano.nodes.interning.NodeInterner`).
+    
     """
     
     __metaclass__ = ABCMeta
     
+    __slots__ = ("__weakref__", )
+    
+    is_placeholder = False
+    """
+    Whether this node stands for an operand which is not evaluated by
+    Booleano, but handled by the converters.
+    
+    :type: :class:`bool`
+    
+    """
+    
+    is_stateless = False
+    """
+    Whether the instances of this class are interchangeable with a new one
+    built without arguments, so they can be rebuilt from their class alone
+    (e.g., by :class:`booleano.parser.snapshots.SymbolTableSnapshot`).
+    
+    Node equality can't tell this: Most nodes only compare their types.
+    
+    :type: :class:`bool`
+    
+    """
+    
     @abstractproperty
     def is_leaf(self):   #pragma: no cover
         """
@@ -84,6 +114,54 @@ class OperationNode(object):
     def __repr__(self):   #pragma: no cover
         pass
     
+    def get_children(self):
+        """
+        Return the nodes contained in this node.
+        
+        :rtype: tuple
+        
+        Leaf nodes don't contain other nodes, so this is empty by default.
+        Branch nodes must override it.
+        
+        """
+        return ()
+    
+    #{ Prefetching protocol
+    
+    def get_prefetch_keys(self):
+        """
+        Return the keys this node needs to be loaded into the context before
+        it's evaluated.
+        
+        :rtype: tuple
+        
+        Nodes whose values live in an external store (e.g., a key-value
+        database) should return the keys they'd otherwise request one at a
+        time. Evaluable parse trees collect these keys for all their nodes
+        and pass them to :meth:`prefetch` at once.
+        
+        """
+        return ()
+    
+    @classmethod
+    def prefetch(cls, context, keys):
+        """
+        Load all the ``keys`` into ``context`` with a single round trip.
+        
+        :param context: The context against which the nodes will be
+            evaluated.
+        :param keys: The keys requested by all the nodes of this class in a
+            parse tree, without duplicates.
+        :type keys: tuple
+        
+        It's called once per class and evaluation, before the tree is
+        evaluated. By default it does nothing.
+        
+        """
+        pass
+    
+    #}
+    
     def __hash__(self):
         """Return the hash of the current class."""
         hash_ = hash(self.__class__)
@@ -132,10 +210,19 @@ class _FunctionMeta(Datatype.__metaclass__, OperationNode.__metaclass__):
                                        'function %s is not a operation node' %
                                        (key, name))
         
-        # Merging all the arguments into a single list for convenience:
-        cls.all_args = tuple(rargs_set | oargs_set)
+        # Merging all the arguments into a single list for convenience; the
+        # required arguments come first, in the same order as they are
+        # passed:
+        cls.all_args = tuple(req_args) + tuple(sorted(oargs_set))
         cls.arity = len(cls.all_args)
         
+        # The arguments of each call are stored in a tuple, in the same order
+        # as in all_args, so their positions are computed once:
+        cls._argument_indexes = dict((arg_name, index) for (index, arg_name)
+                                     in enumerate(cls.all_args))
+        cls._default_argument_values = tuple(opt_args.get(arg_name) for
+                                             arg_name in cls.all_args)
+        
         # Checking that the argument datatypes are within the domain of the
         # arguments:
         if isinstance(cls.argument_types, Mapping):
@@ -153,6 +240,17 @@ class _FunctionMeta(Datatype.__metaclass__, OperationNode.__metaclass__):
         elif not issubclass(cls.argument_types, Datatype):
             raise BadFunctionError("Invalid argument types for function %r: "
                                    "%r" % (name, cls.argument_types))
+        
+        # The validation plan for the calls: The positions of the arguments
+        # whose datatype must be checked, along with the expected datatype:
+        if isinstance(cls.argument_types, Mapping):
+            type_checks = [(cls._argument_indexes[arg_name], expected_type)
+                           for (arg_name, expected_type) in
+                           cls.argument_types.items()]
+        else:
+            type_checks = [(arg_index, cls.argument_types) for arg_index in
+                           range(cls.arity)]
+        cls._argument_type_checks = tuple(sorted(type_checks))
 
 
 class Function(OperationNode):
@@ -170,6 +268,8 @@ class Function(OperationNode):
     
     __metaclass__ = _FunctionMeta
     
+    __slots__ = ("_argument_values", "_hash")
+    
     is_leaf = False
     
     required_arguments = ()
@@ -289,18 +389,18 @@ class Function(OperationNode):
         
         # Checking that all the arguments are operands:
         for argument in arguments:
-            if not isinstance(argument, OperationNode):
+            if (OperationNode not in type(argument).__mro__ and
+                not isinstance(argument, OperationNode)):
                 raise BadCallError("Argument %r is not an operation node" %
                                    argument)
         
         # Storing their values:
-        self.arguments = self.optional_arguments.copy()
-        for arg_pos in range(len(arguments)):
-            arg_name = self.all_args[arg_pos]
-            self.arguments[arg_name] = arguments[arg_pos]
+        self._argument_values = arguments + self._default_argument_values[argn:]
         
         # Finally, check that all the parameters are correct:
         self.check_arguments()
+        
+        self._hash = self._compute_hash()
     
     def check_arguments(self):
         """
@@ -309,37 +409,96 @@ class Function(OperationNode):
         :raises booleano.exc.BadCallError: If at least one of the arguments are
             incorrect.
         
+        The datatypes of the placeholder arguments are not checked, because
+        it's up to the converter to verify them.
+        
+        """
+        argument_values = self._argument_values
+        for (arg_index, expected_type) in self._argument_type_checks:
+            argument = argument_values[arg_index]
+            # The datatypes are abstract base classes, whose isinstance()
+            # checks are slow, so the MRO of the argument is looked up first:
+            if (expected_type not in type(argument).__mro__ and
+                not isinstance(argument, expected_type) and
+                not argument.is_placeholder):
+                raise BadCallError("Argument %r does not implement the %s "
+                                   "datatype" % (argument, expected_type))
+    
+    @classmethod
+    def _make_trusted(cls, *arguments):
         """
-        if isinstance(self.argument_types, Mapping):
-            # The argument types were set individually:
-            for (argument_name, expected_type) in self.argument_types.items():
-                argument = self.arguments[argument_name]
-                self.__check_argument_type(argument, expected_type)
+        Return a call of this function with ``arguments``, skipping the checks
+        which are redundant for the nodes built by the parser.
         
-        else:
-            # All the arguments must implement the same datatype:
-            for argument in self.arguments.values():
-                self.__check_argument_type(argument, self.argument_types)
+        :raises booleano.exc.BadCallError: If :meth:`check_arguments` finds
+            that the ``arguments`` are invalid.
+        
+        The ``arguments`` must be nodes and there must be enough of them,
+        because that's not checked. Their datatypes are still checked, so
+        this raises the same errors as the constructor for the expressions
+        with invalid operations.
+        
+        It must only be used with the functions which don't override the
+        constructor (e.g., the built-in operations).
+        
+        """
+        function_call = cls.__new__(cls)
+        function_call._argument_values = (
+            arguments + cls._default_argument_values[len(arguments):])
+        function_call.check_arguments()
+        function_call._hash = function_call._compute_hash()
+        return function_call
     
-    def __check_argument_type(self, argument, expected_type):
-        if not isinstance(argument, expected_type):
-            raise BadCallError("Argument %r does not implement the %s "
-                               "datatype" % (argument, expected_type))
+    @property
+    def arguments(self):
+        """
+        Return the arguments of this function call, by name.
+        
+        :rtype: :class:`collections.Mapping`
+        
+        This is a read-only view on the arguments, which are stored in a
+        tuple internally.
+        
+        """
+        return _ArgumentsView(self)
+    
+    def get_children(self):
+        """Return the arguments of this function call."""
+        return self._argument_values
+    
+    def _copy_with_arguments(self, arguments):
+        """
+        Return a shallow copy of this function call, using ``arguments``
+        instead of the current arguments.
+        
+        :param arguments: The new arguments, in the same order as
+            :attr:`all_args`.
+        :type arguments: tuple
+        
+        The arguments are not checked, so this must only be used internally
+        to instrument a parse tree (e.g., to wrap the arguments with proxies
+        which profile their evaluation).
+        
+        """
+        function_call = copy(self)
+        function_call._argument_values = tuple(arguments)
+        function_call._hash = function_call._compute_hash()
+        return function_call
     
     def __eq__(self, other):
         equals = False
         
         # If the functions are the same, check whether their arguments are the
-        # same as well:
-        if super(Function, self).__eq__(other):
+        # same as well (unless their hashes tell they are not):
+        if super(Function, self).__eq__(other) and self._hash == other._hash:
             # In commutative functions, the order of the arguments doesn't
             # affect the result:
             if self.is_commutative:
-                other_arguments = other.arguments.values()
-                self_arguments = self.arguments.values()
+                other_arguments = other._argument_values
+                self_arguments = self._argument_values
                 equals = set(other_arguments) == set(self_arguments)
             else:
-                equals = other.arguments == self.arguments
+                equals = other._argument_values == self._argument_values
         
         return equals
     
@@ -351,13 +510,52 @@ class Function(OperationNode):
                                                       args)
     
     def __hash__(self):
-        """Return the sum of the arguments' and function's hashes."""
-        class_hash = hash(self.__class__)
-        args_hash = sum(map(hash, self.arguments.values()))
+        """Return the hash of the function and its arguments."""
+        return self._hash
+    
+    def _compute_hash(self):
+        """
+        Return the hash of the function and its arguments.
         
-        hash_ = (class_hash + args_hash) % maxint
+        The order of the arguments is taken into account, unless the function
+        is commutative.
         
-        return hash_
+        Function calls are immutable, so this is computed once, when the call
+        is created. Because the same applies to the arguments, the hash of a
+        parse tree is computed in linear time and then reused.
+        
+        """
+        arguments = self._argument_values
+        if self.is_commutative:
+            arguments = frozenset(arguments)
+        return hash((self.__class__, arguments))
+
+
+class _ArgumentsView(Mapping):
+    """
+    Read-only mapping of the argument names of a function call to their
+    values.
+    
+    """
+    
+    __slots__ = ("_function", )
+    
+    def __init__(self, function):
+        self._function = function
+    
+    def __getitem__(self, arg_name):
+        function = self._function
+        arg_index = function._argument_indexes[arg_name]
+        return function._argument_values[arg_index]
+    
+    def __iter__(self):
+        return iter(self._function.all_args)
+    
+    def __len__(self):
+        return self._function.arity
+    
+    def __repr__(self):
+        return repr(dict(self.items()))
 
 
 #}
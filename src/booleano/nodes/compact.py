@@ -0,0 +1,589 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2009-2010 by Gustavo Narea <http://gustavonarea.net/>.
+#
+# This file is part of Booleano <http://booleano.efous.org/>.
+#
+# This program is Freedomware: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+Compact, array-backed storage for large amounts of parse trees.
+
+A :class:`CompactForest` stores the nodes of many parse trees in a few flat
+arrays (i.e., in struct-of-arrays form), instead of one Python object per
+node. It's frozen, it can be evaluated directly and it can be serialized as
+raw bytes which can be loaded back without copying them (e.g., from a memory
+mapped file).
+
+"""
+
+from array import array
+from mmap import mmap, ACCESS_READ
+from struct import Struct, error as StructError
+from sys import byteorder
+
+from booleano.nodes.constants import String, Number, Set
+from booleano.nodes.operations import (Not, And, Or, Xor, Equal, NotEqual,
+    LessThan, GreaterThan, LessEqual, GreaterEqual, BelongsTo, IsSubset)
+
+
+__all__ = ["CompactForest"]
+
+
+#{ Opcodes
+
+# These values are part of the serialization format, so they must never
+# change.
+
+_OPAQUE = 0
+_STRING = 1
+_NUMBER = 2
+_SET = 3
+_NOT = 4
+_AND = 5
+_OR = 6
+_XOR = 7
+_EQUAL = 8
+_NOT_EQUAL = 9
+_LESS_THAN = 10
+_GREATER_THAN = 11
+_LESS_EQUAL = 12
+_GREATER_EQUAL = 13
+_BELONGS_TO = 14
+_IS_SUBSET = 15
+
+_NODE_CLASSES = {
+    _STRING: String,
+    _NUMBER: Number,
+    _SET: Set,
+    _NOT: Not,
+    _AND: And,
+    _OR: Or,
+    _XOR: Xor,
+    _EQUAL: Equal,
+    _NOT_EQUAL: NotEqual,
+    _LESS_THAN: LessThan,
+    _GREATER_THAN: GreaterThan,
+    _LESS_EQUAL: LessEqual,
+    _GREATER_EQUAL: GreaterEqual,
+    _BELONGS_TO: BelongsTo,
+    _IS_SUBSET: IsSubset,
+}
+
+_OPCODES = dict((node_class, opcode) for (opcode, node_class) in
+                _NODE_CLASSES.items())
+
+#}
+
+
+class CompactForest(object):
+    """
+    Frozen collection of parse trees stored in flat arrays.
+    
+    Each node is represented by its position in the following arrays:
+    
+    - The opcode, which identifies the class of the node.
+    - The range of its children in the array of child indexes.
+    - Its operand: The position of its value in the pool of numbers or
+      strings if it's a constant, or its position in the operand table if
+      it's an opaque node.
+    
+    The children of a node are always stored before it, and the subtrees
+    shared by several trees (e.g., because they were interned) are stored
+    once.
+    
+    Only the built-in constants and operations are stored in the arrays. The
+    rest of the nodes (e.g., variables and user-defined functions) are
+    *opaque*: They are kept in the operand table as is, so they can't be
+    serialized; when a forest is loaded, the same operands must be passed in
+    the same order (see :attr:`operands`).
+    
+    """
+    
+    def __init__(self, opcodes, child_offsets, children, node_operands, roots,
+                 numbers, strings, operands):
+        """
+        
+        Use :meth:`from_nodes` or :meth:`from_bytes` instead.
+        
+        """
+        self._opcodes = opcodes
+        self._child_offsets = child_offsets
+        self._children = children
+        self._node_operands = node_operands
+        self._roots = roots
+        self._numbers = numbers
+        self._strings = strings
+        self.operands = tuple(operands)
+        """The opaque nodes used by the trees, in order."""
+        
+        # The nodes already built from the arrays, by position:
+        self._nodes = {}
+    
+    @classmethod
+    def from_nodes(cls, root_nodes):
+        """
+        Build a forest for the trees whose root nodes are ``root_nodes``.
+        
+        :param root_nodes: The root nodes of the trees.
+        :type root_nodes: iterable
+        :rtype: :class:`CompactForest`
+        
+        """
+        builder = _ForestBuilder()
+        for root_node in root_nodes:
+            builder.add_tree(root_node)
+        forest = cls(builder.opcodes, builder.child_offsets, builder.children,
+                     builder.node_operands, builder.roots, builder.numbers,
+                     builder.strings, builder.operands)
+        return forest
+    
+    def __len__(self):
+        """Return the amount of trees in the forest."""
+        return len(self._roots)
+    
+    @property
+    def node_count(self):
+        """
+        Return the amount of nodes stored.
+        
+        :rtype: int
+        
+        """
+        return len(self._opcodes)
+    
+    def get_root_node(self, tree_index):
+        """
+        Return the root node of the tree at ``tree_index``, built from the
+        arrays.
+        
+        :param tree_index: The position of the tree in the forest.
+        :type tree_index: int
+        :rtype: :class:`booleano.nodes.OperationNode`
+        
+        The nodes are built once and reused afterwards.
+        
+        """
+        return self._get_node(self._roots[tree_index])
+    
+    def evaluate(self, tree_index, context):
+        """
+        Evaluate the tree at ``tree_index`` with ``context``.
+        
+        :param tree_index: The position of the tree in the forest.
+        :type tree_index: int
+        :param context: The context against which the tree will be evaluated.
+        :return: The same result as the equivalent tree made up of objects.
+        :rtype: bool
+        
+        The logical connectives and the inequalities are evaluated directly on
+        the arrays; the rest of the nodes are built and evaluated as objects.
+        
+        """
+        return self._get_as_boolean(self._roots[tree_index], context)
+    
+    #{ Serialization
+    
+    def to_bytes(self):
+        """
+        Return the binary representation of the forest.
+        
+        :rtype: :class:`str`
+        
+        The operand table is not included.
+        
+        """
+        strings_data = [string.encode("utf-8") for string in self._strings]
+        string_offsets = [0]
+        for string_data in strings_data:
+            string_offsets.append(string_offsets[-1] + len(string_data))
+        strings_data = "".join(strings_data)
+        
+        header = _HEADER.pack(_MAGIC, _VERSION, len(self._opcodes),
+                              len(self._children), len(self._roots),
+                              len(self._numbers), len(self._strings),
+                              len(strings_data), len(self.operands))
+        sections = [
+            header,
+            _pack_column(self._opcodes, "B"),
+            _pack_column(self._child_offsets, "I"),
+            _pack_column(self._children, "I"),
+            _pack_column(self._node_operands, "i"),
+            _pack_column(self._roots, "I"),
+            _pack_column(self._numbers, "d"),
+            _pack_column(string_offsets, "I"),
+            strings_data,
+            ]
+        return "".join(_pad(section) for section in sections)
+    
+    @classmethod
+    def from_bytes(cls, buffer_, operands=()):
+        """
+        Load the forest represented by ``buffer_``, without copying it.
+        
+        :param buffer_: The binary representation of the forest, as returned
+            by :meth:`to_bytes`.
+        :type buffer_: :class:`str`, :class:`mmap.mmap` or any other object
+            which supports the buffer interface
+        :param operands: The opaque nodes used by the trees, in the same
+            order as in the original forest.
+        :type operands: iterable
+        :rtype: :class:`CompactForest`
+        :raises ValueError: If ``buffer_`` doesn't represent a forest, or
+            the amount of ``operands`` is wrong.
+        
+        The values are read from ``buffer_`` when they are needed, so it
+        must remain open while the forest is used.
+        
+        """
+        try:
+            (magic, version, node_count, child_count, root_count,
+             number_count, string_count, strings_size,
+             operand_count) = _HEADER.unpack_from(buffer_, 0)
+        except StructError:
+            raise ValueError("The buffer is too short to contain a forest")
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError("The buffer doesn't contain a forest")
+        operands = tuple(operands)
+        if len(operands) != operand_count:
+            raise ValueError("The forest requires %s operands, but %s were "
+                             "passed" % (operand_count, len(operands)))
+        
+        offset = _get_padded_size(_HEADER.size)
+        columns = []
+        for (typecode, length) in (("B", node_count), ("I", node_count + 1),
+                                   ("I", child_count), ("i", node_count),
+                                   ("I", root_count), ("d", number_count),
+                                   ("I", string_count + 1)):
+            column = _PackedArray(buffer_, offset, length, typecode)
+            columns.append(column)
+            offset += _get_padded_size(length * column.itemsize)
+        if offset + strings_size > len(buffer_):
+            raise ValueError("The buffer is too short to contain the forest")
+        
+        string_offsets = columns.pop()
+        strings = _PackedStrings(buffer_, offset, string_offsets)
+        forest = cls(*(columns + [strings, operands]))
+        return forest
+    
+    @classmethod
+    def from_file(cls, file_, operands=()):
+        """
+        Load the forest stored in ``file_`` by mapping it into memory.
+        
+        :param file_: The file which contains the binary representation of
+            the forest, opened for reading.
+        :type file_: :class:`file`
+        :param operands: The opaque nodes used by the trees, in the same
+            order as in the original forest.
+        :type operands: iterable
+        :rtype: :class:`CompactForest`
+        
+        """
+        buffer_ = mmap(file_.fileno(), 0, access=ACCESS_READ)
+        return cls.from_bytes(buffer_, operands)
+    
+    #{ Interpreter
+    
+    def _get_as_boolean(self, index, context):
+        """
+        Evaluate the node at ``index`` as a boolean.
+        
+        The logical connectives are evaluated with an explicit stack, so the
+        trees nested beyond the recursion limit can be evaluated too.
+        
+        """
+        opcodes = self._opcodes
+        # The connectives whose operands are being evaluated, along with the
+        # position of the right-hand operand while the left-hand one is
+        # evaluated, or with the result of the left-hand operand of a XOR
+        # while the right-hand one is evaluated:
+        pending_connectives = []
+        while index is not None:
+            opcode = opcodes[index]
+            while opcode == _NOT or _AND <= opcode <= _XOR:
+                children = self._get_children(index)
+                if opcode == _NOT:
+                    pending_connectives.append((opcode, None, None))
+                else:
+                    pending_connectives.append((opcode, children[1], None))
+                index = children[0]
+                opcode = opcodes[index]
+            result = self._get_operand_as_boolean(index, context)
+            
+            index = None
+            while pending_connectives and index is None:
+                (opcode, right, left_result) = pending_connectives.pop()
+                if opcode == _NOT:
+                    result = not result
+                elif right is None:
+                    result = left_result ^ result
+                elif opcode == _XOR:
+                    pending_connectives.append((opcode, None, result))
+                    index = right
+                elif (opcode == _AND) == bool(result):
+                    # The left-hand operand didn't decide the result, so the
+                    # result is the one of the right-hand operand:
+                    index = right
+        return result
+    
+    def _get_operand_as_boolean(self, index, context):
+        """
+        Evaluate the node at ``index``, which is not a logical connective, as
+        a boolean.
+        
+        """
+        opcode = self._opcodes[index]
+        if _LESS_THAN <= opcode <= _GREATER_EQUAL:
+            (left, right) = self._get_children(index)
+            left_value = self._get_as_number(left, context)
+            right_value = self._get_as_number(right, context)
+            if opcode == _LESS_THAN:
+                return left_value < right_value
+            if opcode == _GREATER_THAN:
+                return left_value > right_value
+            if opcode == _LESS_EQUAL:
+                return not left_value > right_value
+            return not left_value < right_value
+        return self._get_node(index).get_as_boolean(context)
+    
+    def _get_as_number(self, index, context):
+        """Evaluate the node at ``index`` as a number."""
+        if self._opcodes[index] == _NUMBER:
+            return self._numbers[self._node_operands[index]]
+        return self._get_node(index).get_as_number(context)
+    
+    def _get_children(self, index):
+        """Return the positions of the children of the node at ``index``."""
+        start = self._child_offsets[index]
+        end = self._child_offsets[index + 1]
+        children = self._children
+        return tuple(children[child] for child in xrange(start, end))
+    
+    def _get_node(self, index):
+        """
+        Return the node at ``index``, building it if necessary.
+        
+        The descendants are built with an explicit stack, so the trees nested
+        beyond the recursion limit can be built too.
+        
+        """
+        nodes = self._nodes
+        pending_indexes = [(index, False)]
+        while pending_indexes:
+            (current_index, children_built) = pending_indexes.pop()
+            if current_index in nodes:
+                continue
+            
+            opcode = self._opcodes[current_index]
+            operand = self._node_operands[current_index]
+            if opcode == _OPAQUE:
+                node = self.operands[operand]
+            elif opcode == _STRING:
+                node = String(self._strings[operand])
+            elif opcode == _NUMBER:
+                node = Number(self._numbers[operand])
+            elif children_built:
+                node_class = _NODE_CLASSES[opcode]
+                children = [nodes[child] for child in
+                            self._get_children(current_index)]
+                node = node_class(*children)
+            else:
+                pending_indexes.append((current_index, True))
+                for child in reversed(self._get_children(current_index)):
+                    pending_indexes.append((child, False))
+                continue
+            nodes[current_index] = node
+        return nodes[index]
+    
+    #}
+
+
+#{ Internal stuff
+
+
+_MAGIC = "BLNF"
+
+_VERSION = 1
+
+_HEADER = Struct("<4sB3xIIIIIII")
+
+_ALIGNMENT = 8
+
+
+class _ForestBuilder(object):
+    """
+    Flattener of parse trees into the arrays of a :class:`CompactForest`.
+    
+    """
+    
+    def __init__(self):
+        self.opcodes = array("B")
+        self.child_offsets = array("I", [0])
+        self.children = array("I")
+        self.node_operands = array("i")
+        self.roots = array("I")
+        self.numbers = array("d")
+        self.strings = []
+        self.operands = []
+        # The positions of the nodes, numbers, strings and operands already
+        # added, to store them once:
+        self._node_indexes = {}
+        self._number_indexes = {}
+        self._string_indexes = {}
+        self._operand_indexes = {}
+        # The nodes are referenced while the trees are being added, so that
+        # their ids remain valid:
+        self._nodes = []
+    
+    def add_tree(self, root_node):
+        """Add the tree whose root is ``root_node``."""
+        self.roots.append(self.add_node(root_node))
+    
+    def add_node(self, node):
+        """
+        Add ``node`` and its descendants, and return its position.
+        
+        The descendants are added with an explicit stack, so the trees nested
+        beyond the recursion limit can be added too.
+        
+        """
+        node_indexes = self._node_indexes
+        pending_nodes = [(node, False)]
+        while pending_nodes:
+            (current_node, children_added) = pending_nodes.pop()
+            node_id = id(current_node)
+            if node_id in node_indexes:
+                continue
+            
+            opcode = _OPCODES.get(current_node.__class__, _OPAQUE)
+            children = ()
+            if opcode == _OPAQUE:
+                operand = _add_to_pool(node_id, current_node, self.operands,
+                                       self._operand_indexes)
+            elif opcode == _STRING:
+                value = current_node._constant_value
+                operand = _add_to_pool(value, value, self.strings,
+                                       self._string_indexes)
+            elif opcode == _NUMBER:
+                value = current_node._constant_value
+                operand = _add_to_pool(value, value, self.numbers,
+                                       self._number_indexes)
+            elif children_added:
+                operand = -1
+                children = [node_indexes[id(child)] for child in
+                            current_node.get_children()]
+            else:
+                pending_nodes.append((current_node, True))
+                for child in reversed(current_node.get_children()):
+                    pending_nodes.append((child, False))
+                continue
+            
+            node_index = len(self.opcodes)
+            self.opcodes.append(opcode)
+            self.children.extend(children)
+            self.child_offsets.append(len(self.children))
+            self.node_operands.append(operand)
+            node_indexes[node_id] = node_index
+            self._nodes.append(current_node)
+        return node_indexes[id(node)]
+
+
+class _PackedArray(object):
+    """
+    Read-only array of numbers packed in a buffer, which is not copied.
+    
+    """
+    
+    def __init__(self, buffer_, offset, length, typecode):
+        self._buffer = buffer_
+        self._offset = offset
+        self._length = length
+        self._typecode = typecode
+        self._struct = Struct("<" + typecode)
+        self.itemsize = self._struct.size
+    
+    def __len__(self):
+        return self._length
+    
+    def __getitem__(self, index):
+        if not 0 <= index < self._length:
+            raise IndexError("Index %s out of range" % index)
+        offset = self._offset + index * self.itemsize
+        return self._struct.unpack_from(self._buffer, offset)[0]
+    
+    def tolist(self):
+        """Return all the numbers at once, in a list."""
+        end = self._offset + self._length * self.itemsize
+        column = array(self._typecode, self._buffer[self._offset:end])
+        if byteorder != "little":
+            column.byteswap()
+        return column.tolist()
+
+
+class _PackedStrings(object):
+    """
+    Read-only array of UTF-8 strings packed in a buffer, which are decoded
+    when they're accessed.
+    
+    """
+    
+    def __init__(self, buffer_, offset, string_offsets):
+        self._buffer = buffer_
+        self._offset = offset
+        self._string_offsets = string_offsets
+    
+    def __len__(self):
+        return len(self._string_offsets) - 1
+    
+    def __getitem__(self, index):
+        if not 0 <= index < len(self):
+            raise IndexError("Index %s out of range" % index)
+        start = self._offset + self._string_offsets[index]
+        end = self._offset + self._string_offsets[index + 1]
+        return self._buffer[start:end].decode("utf-8")
+    
+    def tolist(self):
+        """Return all the strings at once, decoded, in a list."""
+        string_offsets = self._string_offsets.tolist()
+        data = self._buffer[self._offset:self._offset + string_offsets[-1]]
+        return [data[start:end].decode("utf-8") for (start, end) in
+                zip(string_offsets, string_offsets[1:])]
+
+
+def _add_to_pool(key, value, pool, indexes):
+    """Add ``value`` to ``pool`` unless it's there, and return its index."""
+    if key not in indexes:
+        indexes[key] = len(pool)
+        pool.append(value)
+    return indexes[key]
+
+
+def _pack_column(column, typecode):
+    """Return the little-endian binary representation of ``column``."""
+    packed_column = array(typecode, column)
+    if byteorder != "little":
+        packed_column.byteswap()
+    return packed_column.tostring()
+
+
+def _get_padded_size(size):
+    """Return ``size`` rounded up to the alignment of the sections."""
+    return (size + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+
+def _pad(section):
+    """Return ``section`` padded to the alignment of the sections."""
+    return section + "\0" * (_get_padded_size(len(section)) - len(section))
+
+
+#}
@@ -22,7 +22,8 @@ Booleano constants.
 
 from booleano.exc import InvalidOperationError
 from booleano.nodes import OperationNode
-from booleano.nodes.datatypes import NumberType, SetType, StringType
+from booleano.nodes.datatypes import (NumberType, SetType, StringType,
+    get_native_value)
 
 
 __all__ = ["Constant", "String", "Number", "Set"]
@@ -48,6 +49,8 @@ class Constant(OperationNode):
     
     """
     
+    __slots__ = ("_constant_value", "_hash")
+    
     def __init__(self, constant_value):
         """
         
@@ -55,19 +58,27 @@ class Constant(OperationNode):
             constant.
         :type constant_value: :class:`object`
         
+        ``constant_value`` must be hashable, because the hash of the constant
+        is computed right away.
+        
         """
         self._constant_value = constant_value
+        self._hash = hash(constant_value)
     
     def __eq__(self, other):
         equivalent = False
-        if super(Constant, self).__eq__(other):
+        if super(Constant, self).__eq__(other) and self._hash == other._hash:
             equivalent = other._constant_value == self._constant_value
         return equivalent
     
     def __hash__(self):
         """Return the hash of the value represented."""
-        hash_ = hash(self._constant_value)
-        return hash_
+        return self._hash
+    
+    @property
+    def constant_value(self):
+        """The Python value represented by this constant."""
+        return self._constant_value
 
 
 class String(Constant, StringType):
@@ -76,6 +87,8 @@ class String(Constant, StringType):
     
     """
     
+    __slots__ = ()
+    
     is_leaf = True
     
     def __init__(self, string):
@@ -108,6 +121,8 @@ class Number(Constant, NumberType):
     
     """
     
+    __slots__ = ()
+    
     is_leaf = True
     
     def __init__(self, number):
@@ -139,6 +154,8 @@ class Set(Constant, SetType):
     
     """
     
+    __slots__ = ("_native_values", )
+    
     is_leaf = False
     
     def __init__(self, *items):
@@ -147,13 +164,41 @@ class Set(Constant, SetType):
         :raises booleano.exc.InvalidOperationError: If at least one of the 
             ``items`` is not an operand.
         
+        When all the ``items`` are constants, the Python values they represent
+        are computed right away, so that evaluating the set doesn't take
+        longer as it grows. Nested sets are only constant if their own items
+        are.
+        
         """
         for item in items:
-            if not isinstance(item, Operand):
+            if not isinstance(item, OperationNode):
                 raise InvalidOperationError('Item "%s" is not an operand, so '
                                             'it cannot be a member of a set' %
                                             item)
-        super(Set, self).__init__(set(items))
+        super(Set, self).__init__(frozenset(items))
+        
+        self._native_values = None
+        for item in self._constant_value:
+            if not isinstance(item, Constant) or \
+               (isinstance(item, Set) and item._native_values is None):
+                break
+        else:
+            self._native_values = self._get_native_values(None)
+    
+    def get_as_set(self, context):
+        """
+        Return the Python values of the members of this set.
+        
+        :rtype: :class:`frozenset`
+        
+        """
+        if self._native_values is not None:
+            return self._native_values
+        return self._get_native_values(context)
+    
+    def get_children(self):
+        """Return the members of this set."""
+        return tuple(self._constant_value)
     
     def to_python(self, context):
         """
@@ -161,12 +206,32 @@ class Set(Constant, SetType):
         contained in this set.
         
         """
-        items = set(item.to_python(context) for item in self._constant_value)
-        return items
+        return self.get_as_set(context)
+    
+    def _copy_with_members(self, members):
+        """
+        Return a copy of this set made up of ``members``, whose Python values
+        are not precomputed.
+        
+        The members are not checked, so this must only be used internally
+        to instrument a parse tree (see
+        :meth:`booleano.nodes.Function._copy_with_arguments`).
+        
+        """
+        set_ = self.__class__.__new__(self.__class__)
+        set_._constant_value = frozenset(members)
+        set_._hash = hash(set_._constant_value)
+        set_._native_values = None
+        return set_
+    
+    def _get_native_values(self, context):
+        values = frozenset(get_native_value(item, context) for item in
+                           self._constant_value)
+        return values
     
     def __repr__(self):
         """Return the representation for this constant set."""
-        elements = [repr(element) for element in self._constant_value]
+        elements = sorted(repr(element) for element in self._constant_value)
         elements = ", ".join(elements)
         if elements:
             elements = " " + elements
@@ -24,8 +24,7 @@ evaluable ones).
 from booleano.exc import ConversionError
 from booleano.nodes.constants import String, Number, Set
 from booleano.nodes.operations import (Not, And, Or, Xor, Equal, NotEqual,
-    LessThan, GreaterThan, LessEqual, GreaterEqual, BelongsTo, IsSubset,
-    UnaryOperation)
+    LessThan, GreaterThan, LessEqual, GreaterEqual, BelongsTo, IsSubset)
 from booleano.nodes.placeholders import PlaceholderVariable, PlaceholderFunction
 
 __all__ = ("BaseConverter", )
@@ -97,7 +96,7 @@ class BaseConverter(object):
         """
         convert = getattr(self, self.__converters__[node.__class__])
         
-        if node.is_leaf():
+        if node.is_leaf:
             if isinstance(node, PlaceholderVariable):
                 return convert(node.name, node.namespace_parts)
             # It's a string or a number
@@ -105,7 +104,7 @@ class BaseConverter(object):
         
         if isinstance(node, Set):
             elements = [self.convert(element) for element
-                        in node.constant_value]
+                        in node.get_children()]
             return convert(*elements)
         
         if isinstance(node, PlaceholderFunction):
@@ -114,8 +113,8 @@ class BaseConverter(object):
         
         # At this point, node must be an operator.
         
-        if isinstance(node, UnaryOperation):
-            operand = self.convert(node.operand)
+        if isinstance(node, Not):
+            operand = self.convert(node.arguments['operand'])
             return convert(operand)
         
         # It's a binary operator!
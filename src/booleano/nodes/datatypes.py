@@ -29,8 +29,8 @@ from abc import ABCMeta, abstractmethod
 from inspect import getmro
 
 
-__all__ = ["get_supertype", "Datatype", "BooleanType", "NumberType",
-           "StringType", "SetType"]
+__all__ = ["get_supertype", "get_native_value", "Datatype", "BooleanType",
+           "NumberType", "StringType", "SetType"]
 
 
 # TODO:
@@ -46,6 +46,37 @@ def get_supertype(*datatypes):
     pass
 
 
+def get_native_value(node, context):
+    """
+    Return the Python value of ``node`` evaluated against ``context``.
+    
+    :param node: The node to be evaluated.
+    :type node: :class:`booleano.nodes.OperationNode`
+    :param context: The context against which the node will be evaluated.
+    :return: The Python value of ``node``, which is always hashable.
+    :raises TypeError: If ``node`` doesn't implement any Booleano datatype.
+    
+    Nodes which implement more than one datatype are represented by their
+    set, number, string or boolean value, in that order of precedence. Sets
+    are represented by :class:`frozenset` instances, so that they can be
+    members of other sets.
+    
+    """
+    # The datatypes are abstract base classes, whose isinstance() checks are
+    # slow, so the MRO of the node is looked up first. isinstance() is still
+    # needed for the classes registered as implementations of a datatype:
+    node_types = type(node).__mro__
+    if SetType in node_types or isinstance(node, SetType):
+        return frozenset(node.get_as_set(context))
+    if NumberType in node_types or isinstance(node, NumberType):
+        return node.get_as_number(context)
+    if StringType in node_types or isinstance(node, StringType):
+        return node.get_as_string(context)
+    if BooleanType in node_types or isinstance(node, BooleanType):
+        return node.get_as_boolean(context)
+    raise TypeError("%r doesn't implement any Booleano datatype" % node)
+
+
 class _DatatypeMeta(ABCMeta):
     """
     Metaclass for Booleano datatypes.
@@ -77,6 +108,8 @@ class Datatype(object):
     
     __metaclass__ = _DatatypeMeta
     
+    __slots__ = ()
+    
     __booleano_base_types__ = None
 
 
@@ -86,6 +119,8 @@ class BooleanType(Datatype):
     
     """
     
+    __slots__ = ()
+    
     @abstractmethod
     def get_as_boolean(self, context):   #pragma: no cover
         """
@@ -98,6 +133,48 @@ class BooleanType(Datatype):
         """
         pass
     
+    def get_as_boolean_concurrently(self, context, executor):
+        """
+        Return the Python boolean equivalent for this node, evaluating its
+        independent branches concurrently.
+        
+        :param context: The context against which the node will be evaluated.
+        :param executor: The executor used to run the branches concurrently;
+            it must implement the :class:`concurrent.futures.Executor`
+            interface (i.e., ``submit()`` returning
+            :class:`concurrent.futures.Future` objects).
+        :return: The Python boolean equivalent.
+        :rtype: :class:`bool`
+        
+        By default, nodes are evaluated in the current thread with
+        :meth:`get_as_boolean`. Nodes with independent branches override it.
+        
+        """
+        return self.get_as_boolean(context)
+    
+    def get_as_boolean_partially(self, context):
+        """
+        Return the Python boolean equivalent for this node if ``context`` has
+        all the data required, or the node to be evaluated once the missing
+        data is available.
+        
+        :param context: The context against which the node will be evaluated,
+            which may not contain all the data required by the node.
+        :return: The Python boolean equivalent, or the residual node.
+        :rtype: :class:`bool` or :class:`booleano.nodes.OperationNode`
+        
+        Nodes are expected to raise a :class:`LookupError` (e.g., a
+        :class:`KeyError`) when a value is missing in the ``context``. By
+        default, the node is returned untouched in such a case; the logical
+        connectives override this to fold the operands which can be resolved.
+        
+        """
+        try:
+            result = bool(self.get_as_boolean(context))
+        except LookupError:
+            result = self
+        return result
+    
     def __call__(self, context):
         """Alias for :meth:`get_as_boolean`."""
         return self.get_as_boolean(context)
@@ -109,6 +186,8 @@ class NumberType(Datatype):
     
     """
     
+    __slots__ = ()
+    
     @abstractmethod
     def get_as_number(self, context):   #pragma: no cover
         """
@@ -128,6 +207,8 @@ class StringType(Datatype):
     
     """
     
+    __slots__ = ()
+    
     @abstractmethod
     def get_as_string(self, context):   #pragma: no cover
         """
@@ -150,6 +231,8 @@ class SetType(Datatype):
     
     """
     
+    __slots__ = ()
+    
     @abstractmethod
     def get_as_set(self, context):   #pragma: no cover
         """
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2009-2010 by Gustavo Narea <http://gustavonarea.net/>.
+#
+# This file is part of Booleano <http://booleano.efous.org/>.
+#
+# This program is Freedomware: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+Sharing of structurally equal nodes.
+
+Parse trees are immutable, so the identical constants and operations found
+in different trees (e.g., ``status == "active"`` in many cached expressions)
+can be represented by a single instance.
+
+"""
+
+from weakref import ref
+
+from booleano.nodes import Function
+from booleano.nodes.constants import Constant, Set
+
+
+__all__ = ["NodeInterner"]
+
+
+class NodeInterner(object):
+    """
+    Factory of canonical nodes for constants and function calls.
+    
+    It only keeps weak references to the nodes, so the nodes which are no
+    longer used by any parse tree can be garbage-collected.
+    
+    """
+    
+    def __init__(self):
+        # The weak references to the canonical nodes, by key:
+        self._nodes = {}
+    
+    def __len__(self):
+        """Return the amount of canonical nodes which are still alive."""
+        return len(self._nodes)
+    
+    def intern(self, node):
+        """
+        Return the canonical instance for ``node``.
+        
+        :param node: The node to be interned.
+        :type node: :class:`booleano.nodes.OperationNode`
+        :return: The node previously interned with the same structure as
+            ``node``, or ``node`` itself if there's none.
+        :rtype: :class:`booleano.nodes.OperationNode`
+        
+        Only constants and function calls are interned; other nodes (e.g.,
+        variables) are returned untouched.
+        
+        Function calls are interned by the identity of their arguments, so
+        their arguments must be interned first (i.e., trees must be interned
+        bottom-up). This way, the order of the arguments of commutative
+        functions is preserved.
+        
+        """
+        key = _get_key(node)
+        if key is None:
+            return node
+        
+        node_ref = self._nodes.get(key)
+        if node_ref is not None:
+            canonical_node = node_ref()
+            if canonical_node is not None:
+                return canonical_node
+        
+        self._nodes[key] = ref(node, self._make_callback(key))
+        return node
+    
+    def _make_callback(self, key):
+        """
+        Return the function which removes ``key`` when its node is collected.
+        
+        The callback doesn't reference the interner, so it can be collected
+        too.
+        
+        """
+        nodes = self._nodes
+        
+        def remove_node(node_ref):
+            if nodes.get(key) is node_ref:
+                del nodes[key]
+        
+        return remove_node
+
+
+#{ Internal stuff
+
+
+def _get_key(node):
+    """
+    Return the key which identifies the structure of ``node``, or ``None`` if
+    it cannot be interned.
+    
+    The key of a function call is made up of the identities of its arguments,
+    which remain valid while the function call is alive. So is the key of a
+    set with non-constant members, because operands which are equivalent may
+    still be evaluated differently (e.g., variables for different columns).
+    
+    """
+    node_class = node.__class__
+    if isinstance(node, Set) and node._native_values is None:
+        key = (node_class, frozenset(id(member) for member in
+                                     node.get_children()))
+    elif isinstance(node, Constant):
+        key = (node_class, node._constant_value)
+    elif isinstance(node, Function):
+        key = (node_class, tuple(id(argument) for argument in
+                                 node.get_children()))
+    else:
+        key = None
+    return key
+
+
+#}
@@ -49,13 +49,19 @@ Built-in operations.
 """
 
 from booleano.nodes import Function
-from booleano.nodes.datatypes import Datatype, BooleanType, NumberType, SetType
+from booleano.nodes.datatypes import (Datatype, BooleanType, NumberType,
+    SetType, get_native_value)
 
 
 __all__ = ["Not", "And", "Or", "Xor", "Equal", "NotEqual", "LessThan",
            "GreaterThan", "LessEqual", "GreaterEqual", "BelongsTo", "IsSubset"]
 
 
+# Seconds a connective gives the executor to start its operands before
+# evaluating the ones it didn't get to in the current thread:
+_STEAL_DELAY = 0.01
+
+
 #{ Unary operators
 
 
@@ -67,12 +73,27 @@ class Not(Function, BooleanType):
     
     """
     
+    __slots__ = ()
+    
     required_arguments = ("operand", )
     
     argument_types = BooleanType
     
     def get_as_boolean(self, context):
-        return not self.arguments['operand'].get_as_boolean(context)
+        return not self._argument_values[0].get_as_boolean(context)
+    
+    def get_as_boolean_concurrently(self, context, executor):
+        operand = self._argument_values[0]
+        return not operand.get_as_boolean_concurrently(context, executor)
+    
+    def get_as_boolean_partially(self, context):
+        operand = self._argument_values[0]
+        result = operand.get_as_boolean_partially(context)
+        if isinstance(result, bool):
+            return not result
+        if result is operand:
+            return self
+        return Not(result)
 
 
 #{ Binary operators
@@ -84,7 +105,21 @@ class BinaryOperation(Function, BooleanType):
     
     """
     
+    __slots__ = ()
+    
+    # The operands are stored in this order, so they can be accessed by
+    # position when the operation is evaluated:
     required_arguments = ("left_operand", "right_operand")
+    
+    @property
+    def master_operand(self):
+        """The left-hand operand."""
+        return self._argument_values[0]
+    
+    @property
+    def slave_operand(self):
+        """The right-hand operand."""
+        return self._argument_values[1]
 
 
 class _BinaryConnectiveOperation(BinaryOperation):
@@ -93,9 +128,106 @@ class _BinaryConnectiveOperation(BinaryOperation):
     
     """
     
+    __slots__ = ()
+    
     is_commutative = True
     
     argument_types = BooleanType
+    
+    def _get_operands_concurrently(self, context, executor, decisive_value):
+        """
+        Evaluate the left- and right-hand operands concurrently.
+        
+        :param decisive_value: The result of an operand which determines the
+            result of the whole operation, or ``None`` if both operands are
+            always required.
+        :return: The results of the left- and right-hand operands; the one
+            which wasn't required once the other was decisive is ``None``.
+        :rtype: tuple
+        
+        Both operands are submitted to the ``executor`` and their results are
+        collected in the order they complete, so whichever operand turns out
+        to be decisive first cancels the pending evaluation of the other one.
+        The pending evaluations are cancelled too if an operand raises an
+        exception.
+        
+        The operands the executor didn't start within a few milliseconds
+        (e.g., because the workers are busy waiting for other operations) are
+        evaluated in the current thread. Waiting is therefore limited to the
+        operands which are running, so nested operations can't exhaust the
+        executor.
+        
+        """
+        from concurrent.futures import wait, FIRST_COMPLETED
+        
+        operands = self._argument_values
+        futures = [executor.submit(operand.get_as_boolean_concurrently,
+                                   context, executor)
+                   for operand in operands]
+        results = [None, None]
+        unresolved_indexes = [0, 1]
+        try:
+            wait(futures, _STEAL_DELAY, FIRST_COMPLETED)
+            while unresolved_indexes:
+                completed_indexes = [index for index in unresolved_indexes
+                                     if futures[index].done()]
+                if completed_indexes:
+                    index = completed_indexes[0]
+                    result = futures[index].result()
+                else:
+                    index = _steal_future(futures, unresolved_indexes)
+                    if index is None:
+                        wait([futures[index] for index in unresolved_indexes],
+                             return_when=FIRST_COMPLETED)
+                        continue
+                    result = operands[index].get_as_boolean_concurrently(
+                        context, executor)
+                
+                unresolved_indexes.remove(index)
+                results[index] = bool(result)
+                if results[index] is decisive_value:
+                    break
+        finally:
+            # The operands which are no longer required, because the result
+            # is known or because an exception was raised:
+            for index in unresolved_indexes:
+                futures[index].cancel()
+        
+        return tuple(results)
+    
+    def _get_operands_partially(self, context, decisive_value=None):
+        """
+        Evaluate the left- and right-hand operands with the partial
+        ``context``.
+        
+        :param decisive_value: The result of an operand which determines the
+            result of the whole operation, or ``None`` if both operands are
+            always required.
+        :return: The Python boolean or the residual node for each operand;
+            the right-hand one is ``None`` if the left-hand one was decisive.
+        :rtype: tuple
+        
+        """
+        left_operand = self._argument_values[0]
+        left_result = left_operand.get_as_boolean_partially(context)
+        if left_result is decisive_value:
+            return (left_result, None)
+        right_operand = self._argument_values[1]
+        right_result = right_operand.get_as_boolean_partially(context)
+        return (left_result, right_result)
+    
+    def _make_residual(self, left_result, right_result):
+        """
+        Return the residual operation for the unresolved operands
+        ``left_result`` and ``right_result``.
+        
+        The current node is reused if none of its operands was folded.
+        
+        """
+        if (left_result is self._argument_values[0] and
+            right_result is self._argument_values[1]):
+            return self
+        return self.__class__(left_result, right_result)
 
 
 class And(_BinaryConnectiveOperation):
@@ -109,12 +241,32 @@ class And(_BinaryConnectiveOperation):
     
     """
     
+    __slots__ = ()
+    
     def get_as_boolean(self, context):
-        conjunction = (self.arguments['left_operand'].get_as_boolean(context)
+        conjunction = (self._argument_values[0].get_as_boolean(context)
                        and
-                       self.arguments['right_operand'].get_as_boolean(context))
+                       self._argument_values[1].get_as_boolean(context))
         
         return conjunction
+    
+    def get_as_boolean_concurrently(self, context, executor):
+        (left_result, right_result) = self._get_operands_concurrently(
+            context, executor, False)
+        return left_result is not False and right_result is not False
+    
+    def get_as_boolean_partially(self, context):
+        (left_result, right_result) = self._get_operands_partially(context,
+                                                                   False)
+        if left_result is False or right_result is False:
+            return False
+        # At this point, the resolved operands are true, so the result
+        # depends on the remaining ones only:
+        if left_result is True:
+            return right_result
+        if right_result is True:
+            return left_result
+        return self._make_residual(left_result, right_result)
 
 
 class Or(_BinaryConnectiveOperation):
@@ -129,12 +281,32 @@ class Or(_BinaryConnectiveOperation):
     
     """
     
+    __slots__ = ()
+    
     def get_as_boolean(self, context):
-        disjunction = (self.arguments['left_operand'].get_as_boolean(context)
+        disjunction = (self._argument_values[0].get_as_boolean(context)
                        or
-                       self.arguments['right_operand'].get_as_boolean(context))
+                       self._argument_values[1].get_as_boolean(context))
         
         return disjunction
+    
+    def get_as_boolean_concurrently(self, context, executor):
+        (left_result, right_result) = self._get_operands_concurrently(
+            context, executor, True)
+        return left_result is True or right_result is True
+    
+    def get_as_boolean_partially(self, context):
+        (left_result, right_result) = self._get_operands_partially(context,
+                                                                   True)
+        if left_result is True or right_result is True:
+            return True
+        # At this point, the resolved operands are false, so the result
+        # depends on the remaining ones only:
+        if left_result is False:
+            return right_result
+        if right_result is False:
+            return left_result
+        return self._make_residual(left_result, right_result)
 
 
 class Xor(_BinaryConnectiveOperation):
@@ -149,12 +321,30 @@ class Xor(_BinaryConnectiveOperation):
     
     """
     
+    __slots__ = ()
+    
     def get_as_boolean(self, context):
-        ex_disjunction = (self.arguments['left_operand'].get_as_boolean(context)
+        ex_disjunction = (self._argument_values[0].get_as_boolean(context)
             ^
-            self.arguments['right_operand'].get_as_boolean(context))
+            self._argument_values[1].get_as_boolean(context))
         
         return ex_disjunction
+    
+    def get_as_boolean_concurrently(self, context, executor):
+        (left_result, right_result) = self._get_operands_concurrently(
+            context, executor, None)
+        return left_result ^ right_result
+    
+    def get_as_boolean_partially(self, context):
+        (left_result, right_result) = self._get_operands_partially(context)
+        if isinstance(left_result, bool) and isinstance(right_result, bool):
+            return left_result ^ right_result
+        # (True ^ x) <=> ~x and (False ^ x) <=> x
+        if isinstance(left_result, bool):
+            return Not(right_result) if left_result else right_result
+        if isinstance(right_result, bool):
+            return Not(left_result) if right_result else left_result
+        return self._make_residual(left_result, right_result)
 
 
 class Equal(BinaryOperation):
@@ -167,6 +357,8 @@ class Equal(BinaryOperation):
     
     """
     
+    __slots__ = ()
+    
     is_commutative = True
     
     argument_types = Datatype
@@ -187,6 +379,8 @@ class NotEqual(Equal):
     
     """
     
+    __slots__ = ()
+    
     def get_as_boolean(self, context):
         equals = super(NotEqual, self).get_as_boolean(context)
         return not equals
@@ -198,7 +392,22 @@ class _InequalityOperation(BinaryOperation):
     
     """
     
+    __slots__ = ()
+    
     argument_types = NumberType
+    
+    def check_arguments(self):
+        """
+        Check the datatypes of the operands, unless one of them is a
+        placeholder.
+        
+        The operands compared with a placeholder take its datatype, which is
+        only known by the converter (e.g., ``today > "2009-07-17"`` compares
+        dates).
+        
+        """
+        if not any(operand.is_placeholder for operand in self._argument_values):
+            super(_InequalityOperation, self).check_arguments()
 
 
 class LessThan(_InequalityOperation):
@@ -209,9 +418,11 @@ class LessThan(_InequalityOperation):
     
     """
     
+    __slots__ = ()
+    
     def get_as_boolean(self, context):
-        left_operand = self.arguments['left_operand'].get_as_number(context)
-        right_operand = self.arguments['right_operand'].get_as_number(context)
+        left_operand = self._argument_values[0].get_as_number(context)
+        right_operand = self._argument_values[1].get_as_number(context)
         
         return left_operand < right_operand
 
@@ -224,9 +435,11 @@ class GreaterThan(_InequalityOperation):
     
     """
     
+    __slots__ = ()
+    
     def get_as_boolean(self, context):
-        left_operand = self.arguments['left_operand'].get_as_number(context)
-        right_operand = self.arguments['right_operand'].get_as_number(context)
+        left_operand = self._argument_values[0].get_as_number(context)
+        right_operand = self._argument_values[1].get_as_number(context)
         
         return left_operand > right_operand
 
@@ -240,6 +453,8 @@ class LessEqual(GreaterThan):
     
     """
     
+    __slots__ = ()
+    
     def get_as_boolean(self, context):
         return not super(LessEqual, self).get_as_boolean(context)
 
@@ -253,6 +468,8 @@ class GreaterEqual(LessThan):
     
     """
     
+    __slots__ = ()
+    
     def get_as_boolean(self, context):
         return not super(GreaterEqual, self).get_as_boolean(context)
 
@@ -265,11 +482,23 @@ class BelongsTo(BinaryOperation):
     
     """
     
+    __slots__ = ()
+    
     argument_types = {'left_operand': Datatype, 'right_operand': SetType}
     
+    @property
+    def master_operand(self):
+        """The set."""
+        return self._argument_values[1]
+    
+    @property
+    def slave_operand(self):
+        """The element."""
+        return self._argument_values[0]
+    
     def get_as_boolean(self, context):
-        value = self.slave_operand.to_python(context)
-        return self.master_operand.belongs_to(value, context)
+        value = get_native_value(self._argument_values[0], context)
+        return value in self._argument_values[1].get_as_set(context)
 
 
 class IsSubset(BinaryOperation):
@@ -280,14 +509,46 @@ class IsSubset(BinaryOperation):
     
     """
     
+    __slots__ = ()
+    
     argument_types = SetType
     
+    @property
+    def master_operand(self):
+        """The superset."""
+        return self._argument_values[1]
+    
+    @property
+    def slave_operand(self):
+        """The subset."""
+        return self._argument_values[0]
+    
     def get_as_boolean(self, context):
-        subset = self.arguments['left_operand'].get_as_set(context)
-        superset = self.arguments['right_operand'].get_as_set(context)
+        subset = self._argument_values[0].get_as_set(context)
+        superset = self._argument_values[1].get_as_set(context)
         
         is_subset = subset.issubset(superset)
         return is_subset
 
 
 #}
+
+
+#{ Utilities
+
+
+def _steal_future(futures, indexes):
+    """
+    Cancel the first future at ``indexes`` which the executor didn't start.
+    
+    :return: The index of the cancelled future, or ``None`` if they are all
+        running.
+    
+    """
+    for index in indexes:
+        if futures[index].cancel():
+            return index
+    return None
+
+
+#}
@@ -24,21 +24,31 @@ parser won't verify its existence.
 
 """
 
-from booleano.exc import BadCallError
-from booleano.nodes.constants import Operand
+from booleano.exc import BadCallError, InvalidOperationError
+from booleano.nodes import OperationNode
+from booleano.nodes.datatypes import (BooleanType, NumberType, StringType,
+    SetType)
 
 __all__ = ["PlaceholderVariable", "PlaceholderFunction"]
 
 
-class PlaceholderInstance(Operand):
+class PlaceholderInstance(OperationNode, BooleanType, NumberType, StringType,
+                          SetType):
     """
     Base class for placeholders of Booleano class instances.
     
     Initially, placeholder operands support all the operations. It's up to the
     converter to verify if the instance is used correctly.
     
+    Placeholders cannot be evaluated, because they are not bound to any
+    operand.
+    
     """
     
+    __slots__ = ("name", "namespace_parts")
+    
+    is_placeholder = True
+    
     def __init__(self, name, namespace_parts=None):
         """
         
@@ -61,6 +71,27 @@ class PlaceholderInstance(Operand):
                 )
         return equivalent
     
+    def get_as_boolean(self, context):
+        self._reject_evaluation()
+    
+    def get_as_number(self, context):
+        self._reject_evaluation()
+    
+    def get_as_string(self, context):
+        self._reject_evaluation()
+    
+    def get_as_set(self, context):
+        self._reject_evaluation()
+    
+    def _reject_evaluation(self):
+        """
+        :raises InvalidOperationError: Always, because placeholders are not
+            bound to any operand.
+        
+        """
+        raise InvalidOperationError("%r cannot be evaluated; it must be "
+                                    "converted" % self)
+    
     def _namespace_to_ascii(self):
         """Return the namespace as a single ASCII string."""
         parts = [part.encode("utf-8") for part in self.namespace_parts]
@@ -73,6 +104,8 @@ class PlaceholderVariable(PlaceholderInstance):
     
     """
     
+    __slots__ = ()
+    
     is_leaf = True
     
     def __repr__(self):
@@ -90,6 +123,8 @@ class PlaceholderFunction(PlaceholderInstance):
     
     """
     
+    __slots__ = ("arguments", )
+    
     is_leaf = False
     
     def __init__(self, function_name, namespace_parts=None, *arguments):
@@ -101,11 +136,11 @@ class PlaceholderFunction(PlaceholderInstance):
             the placeholder function.
         :type namespace_parts: tuple
         :raises BadCallError: If one of the ``arguments`` is not an
-            :class:`Operand`.
+            operation node.
         
         """
         for argument in arguments:
-            if not isinstance(argument, Operand):
+            if not isinstance(argument, OperationNode):
                 raise BadCallError(u'Placeholder function "%s" received a '
                                    'non-operand argument: %s' %
                                    (function_name, argument))
@@ -113,6 +148,10 @@ class PlaceholderFunction(PlaceholderInstance):
         super(PlaceholderFunction, self).__init__(function_name,
                                                   namespace_parts)
     
+    def get_children(self):
+        """Return the arguments of this placeholder function call."""
+        return self.arguments
+    
     def __eq__(self, other):
         equivalent = False
         if super(PlaceholderFunction, self).__eq__(other):
@@ -21,8 +21,11 @@ Parser of boolean expressions.
 """
 
 from logging import getLogger
+import sys
+from types import ModuleType
 
-from booleano.parser.parsers import EvaluableParser, ConvertibleParser
+from booleano.parser.streaming import DEFAULT_CHUNK_SIZE
+from booleano.nodes.constants import Constant, Set
 from booleano.exc import GrammarError
 
 __all__ = ("EvaluableParseManager", "ConvertibleParseManager", "Grammar",
@@ -42,7 +45,8 @@ class ParseManager(object):
     
     """
     
-    def __init__(self, generic_grammar, cache_limit=0, **localized_grammars):
+    def __init__(self, generic_grammar, cache_limit=0, parse_limits=None,
+                 interner=None, **localized_grammars):
         """
         
         :param generic_grammar: The default grammar.
@@ -50,13 +54,25 @@ class ParseManager(object):
         :param cache_limit: The maximum amount of expressions to be cached
             internally (use ``None`` for no limit or ``0`` to disable caching).
         :type cache_limit: int
+        :param parse_limits: The complexity limits for the expressions to be
+            parsed, if any.
+        :type parse_limits: :class:`booleano.parser.limits.ParseLimits`
+        :param interner: The factory of the canonical constants and
+            operations to be shared across the parse trees, if any.
+        :type interner: :class:`booleano.nodes.interning.NodeInterner`
         
         Additional keyword arguments, if any, will be used as custom grammars
         where each key represents the locale of the grammar in the value.
         
+        An interner reduces the memory used by the cache when the same
+        constants and operations are found in many expressions.
+        
         """
         self._cache = _Cache(cache_limit)
+        self._parse_limits = parse_limits
+        self._interner = interner
         self._generic_grammar = generic_grammar
+        self._grammars = {}
         self._parsers = {}
         for (locale, grammar) in localized_grammars.items():
             self.add_parser(locale, grammar)
@@ -78,6 +94,8 @@ class ParseManager(object):
             invalid operation.
         :raises booleano.exc.ScopeError: If ``expression`` contains unknown 
             identifiers.
+        :raises booleano.exc.ExpressionTooComplexError: If ``expression``
+            exceeds the parse limits.
         
         If caching is enabled and the ``expression`` was cached previously,
         ``expression`` won't be parsed again and its cached parse tree will
@@ -87,15 +105,66 @@ class ParseManager(object):
         be parsed and the resulting parse tree will be cached and finally
         returned.
         
+        If there are parse limits, ``expression`` will be checked before it's
+        parsed and its parse tree will be checked before it's cached.
+        
+        The same expression written in different grammars is cached once if
+        the parse manager can represent its parse trees regardless of the
+        locale (e.g., evaluable parse managers), and then the same parse tree
+        is returned for all of them.
+        
         """
         if self._cache.is_stored(locale, expression):
             parse_tree = self._cache.get_tree(locale, expression)
         else:
             parser = self._get_parser(locale)
-            parse_tree = parser(expression)
-            self._cache.store_tree(locale, expression, parse_tree)
+            if self._parse_limits:
+                self._parse_limits.check_expression(expression,
+                                                    self._grammars[locale])
+            (parse_tree, identifiers) = self._parse_expression(parser,
+                                                               expression)
+            if self._parse_limits:
+                self._parse_limits.check_tree(parse_tree)
+            # The canonical form is only useful to share the cached trees:
+            canonical_form = None
+            if self._cache.limit != 0:
+                canonical_form = self._get_canonical_form(locale, parse_tree,
+                                                          identifiers)
+            parse_tree = self._cache.store_tree(locale, expression,
+                                                parse_tree, identifiers,
+                                                canonical_form)
         return parse_tree
     
+    def _parse_expression(self, parser, expression):
+        """
+        Parse ``expression`` with ``parser``.
+        
+        :return: The parse tree for ``expression`` and the identifiers it
+            uses, if known.
+        :rtype: tuple
+        
+        """
+        return (parser(expression), ())
+    
+    def _get_canonical_form(self, locale, parse_tree, identifiers):
+        """
+        Return the representation of ``parse_tree`` which doesn't depend on
+        the ``locale``, if possible.
+        
+        :param locale: The locale of the grammar used by the expression.
+        :type locale: basestring
+        :param parse_tree: The parse tree of the expression.
+        :type parse_tree: :class:`booleano.parser.trees.ParseTree`
+        :param identifiers: The identifiers used by the expression.
+        :type identifiers: frozenset
+        :return: The canonical form of ``parse_tree``, or ``None`` if it
+            can't be shared across locales.
+        
+        By default, parse trees are not shared.
+        
+        """
+        return None
+    
     #{ Parser management
     
     def add_parser(self, locale, grammar):
@@ -112,6 +181,7 @@ class ParseManager(object):
             raise GrammarError("There is already a parser for grammar %s" %
                                locale)
         parser = self._define_parser(locale, grammar)
+        self._grammars[locale] = grammar
         self._parsers[locale] = parser
     
     def _get_parser(self, locale):
@@ -159,7 +229,7 @@ class EvaluableParseManager(ParseManager):
     """
     
     def __init__(self, symbol_table, generic_grammar, cache_limit=0,
-                 **localized_grammars):
+                 parse_limits=None, interner=None, **localized_grammars):
         """
         
         :param symbol_table: The symbol table for the supported expressions.
@@ -169,17 +239,27 @@ class EvaluableParseManager(ParseManager):
         :param cache_limit: The maximum amount of expressions to be cached
             internally (use ``None`` for no limit or ``0`` to disable caching).
         :type cache_limit: int
+        :param parse_limits: The complexity limits for the expressions to be
+            parsed, if any.
+        :type parse_limits: :class:`booleano.parser.limits.ParseLimits`
+        :param interner: The factory of the canonical constants and
+            operations to be shared across the parse trees, if any.
+        :type interner: :class:`booleano.nodes.interning.NodeInterner`
         
         Additional keyword arguments, if any, will be used as custom grammars
         where each key represents the locale of the grammar in the value.
         
         """
         self._symbol_table = symbol_table
+        self._symbol_table_versions = {}
+        symbol_table._observers.add(self)
         super(EvaluableParseManager, self).__init__(generic_grammar,
                                                     cache_limit,
+                                                    parse_limits,
+                                                    interner,
                                                     **localized_grammars)
     
-    def evaluate(self, expression, locale, context):
+    def evaluate(self, expression, locale, context, budget=None):
         """
         Parse ``expression`` and return its evaluation result with ``context``.
         
@@ -190,6 +270,8 @@ class EvaluableParseManager(ParseManager):
         :param context: The context under which the parse tree of ``expression``
             has to be evaluated.
         :type context: object
+        :param budget: The resources the evaluation may use, if limited.
+        :type budget: :class:`booleano.parser.budgets.EvaluationBudget`
         :return: The result of the evaluation of the parse tree for
             ``expression``.
         :rtype: bool
@@ -198,10 +280,162 @@ class EvaluableParseManager(ParseManager):
         :raises InvalidOperationError: If ``expression`` has an invalid
             operation.
         :raises ScopeError: If ``expression`` contains unknown identifiers.
+        :raises BudgetExceededError: If the evaluation exceeded the
+            ``budget``.
+        
+        """
+        tree = self.parse(expression, locale)
+        return tree(context, budget)
+    
+    def evaluate_concurrently(self, expression, locale, context, executor):
+        """
+        Parse ``expression`` and return its evaluation result with ``context``,
+        evaluating independent branches concurrently with ``executor``.
+        
+        :param expression: The expression to be parsed.
+        :type expression: basestring
+        :param locale: The locale of the grammar used by ``expression``.
+        :type locale: basestring
+        :param context: The context under which the parse tree of ``expression``
+            has to be evaluated.
+        :type context: object
+        :param executor: The executor used to run the branches concurrently;
+            it must implement the :class:`concurrent.futures.Executor`
+            interface.
+        :return: The result of the evaluation of the parse tree for
+            ``expression``.
+        :rtype: bool
+        :raises BadExpressionError: If ``expression`` is bad-formed
+            according to the ``locale`` grammar.
+        :raises InvalidOperationError: If ``expression`` has an invalid
+            operation.
+        :raises ScopeError: If ``expression`` contains unknown identifiers.
+        
+        This is a short-cut for
+        :meth:`booleano.parser.trees.EvaluableParseTree.evaluate_concurrently`.
+        
+        """
+        tree = self.parse(expression, locale)
+        return tree.evaluate_concurrently(context, executor)
+    
+    def evaluate_partially(self, expression, locale, context):
+        """
+        Parse ``expression`` and evaluate it as far as the partial ``context``
+        allows.
+        
+        :param expression: The expression to be parsed.
+        :type expression: basestring
+        :param locale: The locale of the grammar used by ``expression``.
+        :type locale: basestring
+        :param context: The context under which the parse tree of ``expression``
+            has to be evaluated, which may lack some of the data required.
+        :type context: object
+        :return: The result of the evaluation of the parse tree for
+            ``expression`` if it could be determined; otherwise, the residual
+            parse tree.
+        :rtype: bool or :class:`booleano.parser.trees.EvaluableParseTree`
+        :raises BadExpressionError: If ``expression`` is bad-formed
+            according to the ``locale`` grammar.
+        :raises InvalidOperationError: If ``expression`` has an invalid
+            operation.
+        :raises ScopeError: If ``expression`` contains unknown identifiers.
+        
+        This is a short-cut for
+        :meth:`booleano.parser.trees.EvaluableParseTree.evaluate_partially`.
+        
+        """
+        tree = self.parse(expression, locale)
+        return tree.evaluate_partially(context)
+    
+    def filter(self, expression, locale, contexts,
+               chunk_size=DEFAULT_CHUNK_SIZE, processes=None, statistics=None):
+        """
+        Parse ``expression`` and yield the ``contexts`` under which it
+        evaluates to True.
+        
+        :param expression: The expression to be parsed.
+        :type expression: basestring
+        :param locale: The locale of the grammar used by ``expression``.
+        :type locale: basestring
+        :param contexts: The contexts to be filtered.
+        :type contexts: iterable
+        :rtype: iterator
+        :raises BadExpressionError: If ``expression`` is bad-formed
+            according to the ``locale`` grammar.
+        :raises InvalidOperationError: If ``expression`` has an invalid
+            operation.
+        :raises ScopeError: If ``expression`` contains unknown identifiers.
+        
+        The rest of the arguments are those of
+        :meth:`booleano.parser.trees.EvaluableParseTree.filter`.
+        
+        """
+        tree = self.parse(expression, locale)
+        return tree.filter(contexts, chunk_size, processes, statistics)
+    
+    def partition(self, expression, locale, contexts,
+                  chunk_size=DEFAULT_CHUNK_SIZE, processes=None,
+                  statistics=None):
+        """
+        Parse ``expression`` and split the ``contexts`` into those under which
+        it evaluates to True and those under which it evaluates to False.
+        
+        :param expression: The expression to be parsed.
+        :type expression: basestring
+        :param locale: The locale of the grammar used by ``expression``.
+        :type locale: basestring
+        :param contexts: The contexts to be partitioned.
+        :type contexts: iterable
+        :return: The iterators for the matching and the non-matching contexts,
+            respectively.
+        :rtype: tuple
+        :raises BadExpressionError: If ``expression`` is bad-formed
+            according to the ``locale`` grammar.
+        :raises InvalidOperationError: If ``expression`` has an invalid
+            operation.
+        :raises ScopeError: If ``expression`` contains unknown identifiers.
+        
+        The rest of the arguments are those of
+        :meth:`booleano.parser.trees.EvaluableParseTree.partition`.
         
         """
         tree = self.parse(expression, locale)
-        return tree(context)
+        return tree.partition(contexts, chunk_size, processes, statistics)
+    
+    def bind(self, parse_tree, locale=None):
+        """
+        Resolve the placeholders in the convertible ``parse_tree`` with the
+        symbol table and return the equivalent evaluable parse tree.
+        
+        :param parse_tree: The parse tree to be bound, whose placeholders use
+            the names in ``locale``.
+        :type parse_tree: :class:`booleano.parser.trees.ConvertibleParseTree`
+        :param locale: The locale of the grammar used by the expression of
+            ``parse_tree`` (or ``None`` if it uses the generic grammar).
+        :type locale: basestring
+        :return: The evaluable parse tree.
+        :rtype: :class:`booleano.parser.trees.EvaluableParseTree`
+        :raises ScopeError: If ``parse_tree`` contains unknown identifiers.
+        :raises BadExpressionError: If a variable is used as a function or
+            vice versa.
+        :raises InvalidOperationError: If ``parse_tree`` has an invalid
+            operation.
+        :raises ExpressionTooComplexError: If the evaluable parse tree exceeds
+            the parse limits.
+        
+        This way, the expressions parsed by a :class:`ConvertibleParseManager`
+        (e.g., to convert them into SQL) can be evaluated too, without parsing
+        them again. The errors are the same as if they were parsed by this
+        parse manager.
+        
+        The evaluable parse tree is not cached.
+        
+        """
+        parser = self._get_parser(locale)
+        parse_tree = parser.bind(parse_tree)
+        if self._parse_limits:
+            self._parse_limits.check_tree(parse_tree)
+        return parse_tree
     
     def _define_parser(self, locale, grammar):
         """
@@ -215,9 +449,84 @@ class EvaluableParseManager(ParseManager):
         :rtype: EvaluableParser
         
         """
+        from booleano.parser.parsers import EvaluableParser
+        
         namespace = self._symbol_table.get_namespace(locale)
-        parser = EvaluableParser(grammar, namespace)
+        parser = EvaluableParser(grammar, namespace, self._interner)
+        self._symbol_table_versions[locale] = self._symbol_table.version
         return parser
+    
+    def _get_parser(self, locale):
+        """
+        Return the parser for the grammar identifier by ``locale``, with the
+        current namespace of the symbol table in ``locale``.
+        
+        If the symbol table has changed since the parser got its namespace,
+        the parser is given the new one.
+        
+        The parse trees cached already are kept, because adding objects or
+        sub-tables to a valid symbol table doesn't change the meaning of the
+        identifiers used before; those using the objects removed are
+        discarded by :meth:`_forget_object`.
+        
+        """
+        parser = super(EvaluableParseManager, self)._get_parser(locale)
+        if self._symbol_table_versions[locale] != self._symbol_table.version:
+            parser.set_namespace(self._symbol_table.get_namespace(locale))
+            self._symbol_table_versions[locale] = self._symbol_table.version
+        return parser
+    
+    def _parse_expression(self, parser, expression):
+        """
+        Parse ``expression`` with the evaluable ``parser``.
+        
+        :return: The parse tree for ``expression`` and the identifiers it
+            uses.
+        :rtype: tuple
+        
+        """
+        return parser.parse_with_identifiers(expression)
+    
+    def _get_canonical_form(self, locale, parse_tree, identifiers):
+        """
+        Return the representation of ``parse_tree`` where the objects are
+        identified by their global names.
+        
+        The objects are the same in all the locales, so the trees for an
+        expression written in different grammars have the same canonical
+        form.
+        
+        """
+        global_paths = {}
+        for path in identifiers:
+            items = self._symbol_table._resolve_path(locale or None, path)
+            global_path = tuple(item.global_name for item in items)
+            global_paths[id(items[-1].operand)] = global_path
+        return _get_canonical_form(parse_tree.root_node, global_paths)
+    
+    def _forget_object(self, subtables, obj):
+        """
+        Discard the cached parse trees which use the ``obj`` just removed from
+        the symbol table.
+        
+        :param subtables: The sub-tables of the symbol table that lead to
+            ``obj``, from the topmost one.
+        :type subtables: list
+        :param obj: The object removed.
+        :type obj: :class:`Bind`
+        
+        This is called by the symbol table, or any of its sub-tables, when
+        an object is removed or replaced.
+        
+        """
+        items = subtables + [obj]
+        for locale in self._cache.cache_by_locale.keys():
+            if locale:
+                names = [item.names.get(locale, item.global_name) for item
+                         in items]
+            else:
+                names = [item.global_name for item in items]
+            self._cache.remove_trees_using(locale, tuple(names))
 
 
 class ConvertibleParseManager(ParseManager):
@@ -242,7 +551,9 @@ class ConvertibleParseManager(ParseManager):
         Here the ``locale`` is not used.
         
         """
-        parser = ConvertibleParser(grammar)
+        from booleano.parser.parsers import ConvertibleParser
+        
+        parser = ConvertibleParser(grammar, self._interner)
         return parser
 
 
@@ -268,6 +579,13 @@ class _Cache(object):
         self.counter = 0
         self.cache_by_locale = {}
         self.latest_expressions = []
+        self.expressions_by_identifier = {}
+        self.identifiers_by_tree = {}
+        # The trees shared across locales, by their canonical forms, along
+        # with the amount of expressions which use them:
+        self.trees_by_canonical_form = {}
+        self.expression_counts = {}
+        self.canonical_forms_by_tree = {}
     
     def is_stored(self, locale, expression):
         """
@@ -306,7 +624,8 @@ class _Cache(object):
         self.touch_tree(locale, expression)
         return parse_tree
     
-    def store_tree(self, locale, expression, parse_tree):
+    def store_tree(self, locale, expression, parse_tree, identifiers=(),
+                   canonical_form=None):
         """
         Add the ``parse_tree`` of ``expression`` in ``locale`` to the cache.
         
@@ -316,20 +635,46 @@ class _Cache(object):
         :type expression: basestring
         :param parse_tree: The parse tree of ``expression`` in ``locale``.
         :type parse_tree: ParseTree
+        :param identifiers: The identifiers used by ``expression``, so the
+            tree can be removed when any of them changes.
+        :type identifiers: iterable
+        :param canonical_form: The representation of ``parse_tree`` which
+            doesn't depend on the ``locale``, if any.
+        :return: The parse tree cached, which is the one previously cached
+            with the same ``canonical_form`` in any locale, if there's one.
+        :rtype: ParseTree
         
         If caching is disabled, it won't do anything.
         
         """
         if self.limit == 0:
             # Cache is disabled.
-            return
+            return parse_tree
         # Cache is enabled, let's store it:
         self.remove_oldest()
         if locale not in self.cache_by_locale:
             self.cache_by_locale[locale] = {}
+        if canonical_form is not None:
+            if canonical_form in self.trees_by_canonical_form:
+                parse_tree = self.trees_by_canonical_form[canonical_form]
+                self.expression_counts[canonical_form] += 1
+            else:
+                self.trees_by_canonical_form[canonical_form] = parse_tree
+                self.expression_counts[canonical_form] = 1
+            self.canonical_forms_by_tree[(locale, expression)] = \
+                canonical_form
         self.cache_by_locale[locale][expression] = parse_tree
         self.counter += 1
         self.touch_tree(locale, expression)
+        # Indexing the tree by the identifiers it uses:
+        if identifiers:
+            self.identifiers_by_tree[(locale, expression)] = identifiers
+            for identifier in identifiers:
+                key = (locale, identifier)
+                if key not in self.expressions_by_identifier:
+                    self.expressions_by_identifier[key] = set()
+                self.expressions_by_identifier[key].add(expression)
+        return parse_tree
     
     def touch_tree(self, locale, expression):
         """
@@ -358,9 +703,101 @@ class _Cache(object):
         if (self.limit is None or self.counter < self.limit or
             not self.latest_expressions):
             return
-        (locale, expression) = self.latest_expressions.pop(-1)
+        (locale, expression) = self.latest_expressions[-1]
+        self.remove_tree(locale, expression)
+    
+    def remove_trees_using(self, locale, identifier):
+        """
+        Remove the parse trees in ``locale`` which use ``identifier``.
+        
+        :param locale: The locale of the grammar used by the expressions.
+        :type locale: basestring
+        :param identifier: The names of the namespaces of the identifier,
+            followed by its own name.
+        :type identifier: tuple
+        
+        """
+        expressions = self.expressions_by_identifier.get((locale, identifier))
+        for expression in list(expressions or ()):
+            self.remove_tree(locale, expression)
+    
+    def remove_tree(self, locale, expression):
+        """
+        Remove the parse tree for ``expression`` in ``locale``.
+        
+        :param locale: The locale of the grammar used by ``expression``.
+        :type locale: basestring
+        :param expression: The expression whose parse tree is being removed.
+        :type expression: basestring
+        :raises KeyError: If the ``expression`` isn't cached (use
+            :meth:`is_stored` first).
+        
+        """
+        tree_indexes = (locale, expression)
         del self.cache_by_locale[locale][expression]
+        self.latest_expressions.remove(tree_indexes)
         self.counter -= 1
+        # Removing the tree from the index of identifiers:
+        for identifier in self.identifiers_by_tree.pop(tree_indexes, ()):
+            key = (locale, identifier)
+            self.expressions_by_identifier[key].discard(expression)
+            if not self.expressions_by_identifier[key]:
+                del self.expressions_by_identifier[key]
+        # Removing the shared tree if no other expression uses it:
+        canonical_form = self.canonical_forms_by_tree.pop(tree_indexes, None)
+        if canonical_form is not None:
+            self.expression_counts[canonical_form] -= 1
+            if not self.expression_counts[canonical_form]:
+                del self.expression_counts[canonical_form]
+                del self.trees_by_canonical_form[canonical_form]
+
+
+def _get_canonical_form(root_node, global_paths):
+    """
+    Return the canonical form of the parse tree whose root is ``root_node``.
+    
+    :param global_paths: The global names of the objects used by the tree,
+        made up of the names of their namespaces followed by their own names,
+        by the identities of their operands.
+    :type global_paths: dict
+    :return: The nested tuples which represent the nodes.
+    
+    The bound operands and function calls are represented by their global
+    names, the other constants by their values, and the rest of the nodes by
+    their classes and their children. The order of the members of sets
+    doesn't matter.
+    
+    """
+    forms = []
+    # The nodes are visited in post-order: Each node is pushed along with
+    # the amount of its children once their forms have been computed.
+    pending_nodes = [(root_node, None)]
+    while pending_nodes:
+        (node, child_count) = pending_nodes.pop()
+        if child_count is None:
+            if id(node) in global_paths:
+                forms.append(global_paths[id(node)])
+                continue
+            children = node.get_children()
+            pending_nodes.append((node, len(children)))
+            for child in reversed(children):
+                pending_nodes.append((child, None))
+            continue
+        
+        first_child_index = len(forms) - child_count
+        children = tuple(forms[first_child_index:])
+        del forms[first_child_index:]
+        if id(node.__class__) in global_paths:
+            form = (global_paths[id(node.__class__)], children)
+        elif isinstance(node, Set):
+            form = (node.__class__, frozenset(children))
+        elif isinstance(node, Constant):
+            form = (node.__class__, node.constant_value)
+        else:
+            form = (node.__class__, children)
+        forms.append(form)
+    
+    return forms[0]
 
 
 #}
@@ -369,3 +806,57 @@ class _Cache(object):
 # Importing the objects to be available from this namespace:
 from booleano.parser.scope import Bind, SymbolTable
 from booleano.parser.grammar import Grammar
+
+
+#{ Lazy loading of the parsers
+
+
+_LAZY_OBJECTS = {
+    'EvaluableParser': "booleano.parser.parsers",
+    'ConvertibleParser': "booleano.parser.parsers",
+}
+"""The objects imported from other modules the first time they're requested."""
+
+
+class _LazyModule(ModuleType):
+    """
+    Proxy of this package which imports the objects in :data:`_LAZY_OBJECTS`
+    the first time they're requested.
+    
+    Python 2 has no module-level ``__getattr__``, so the proxy takes the
+    place of the package in ``sys.modules``. The attributes are read from and
+    written to the package itself, so the functions defined in it see the
+    changes made through the proxy (e.g., when they're monkeypatched).
+    
+    """
+    
+    def __init__(self, module):
+        ModuleType.__init__(self, module.__name__, module.__doc__)
+        self.__dict__['_module'] = module
+    
+    def __getattr__(self, name):
+        module = self.__dict__['_module']
+        if name in _LAZY_OBJECTS and name not in module.__dict__:
+            lazy_module = __import__(_LAZY_OBJECTS[name], fromlist=[name])
+            setattr(module, name, getattr(lazy_module, name))
+        return getattr(module, name)
+    
+    def __setattr__(self, name, value):
+        # The proxy has its own copy of the attributes once it's reloaded:
+        if name in self.__dict__:
+            self.__dict__[name] = value
+        setattr(self.__dict__['_module'], name, value)
+    
+    def __delattr__(self, name):
+        self.__dict__.pop(name, None)
+        delattr(self.__dict__['_module'], name)
+
+
+# The package is only replaced the first time it's imported; when it's
+# reloaded, its code is run again in the namespace of the proxy:
+if type(sys.modules[__name__]) is ModuleType:
+    sys.modules[__name__] = _LazyModule(sys.modules[__name__])
+
+
+#}
+
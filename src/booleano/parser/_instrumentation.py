@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2009-2010 by Gustavo Narea <http://gustavonarea.net/>.
+#
+# This file is part of Booleano <http://booleano.efous.org/>.
+#
+# This program is Freedomware: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+Instrumentation of parse trees.
+
+An instrumented copy of a parse tree evaluates each node through a proxy,
+which records the evaluation (e.g., to profile it or to enforce a budget)
+without slowing down the evaluation of the original tree.
+
+"""
+
+from booleano.nodes import Function
+from booleano.nodes.constants import Set
+from booleano.nodes.datatypes import (BooleanType, NumberType, StringType,
+    SetType)
+
+__all__ = ("InstrumentedNode", "instrument_node")
+
+
+class InstrumentedNode(object):
+    """
+    Base class for the proxies which record the evaluation of the node they
+    wrap.
+    
+    Subclasses must define :meth:`_evaluate`.
+    
+    """
+    
+    def __init__(self, node, recorder):
+        """
+        
+        :param node: The node to be wrapped.
+        :type node: :class:`booleano.nodes.OperationNode`
+        :param recorder: The object where the evaluation of ``node`` is
+            recorded.
+        
+        """
+        self._node = node
+        self._recorder = recorder
+    
+    def get_as_boolean(self, context):
+        return self._evaluate(self._node.get_as_boolean, context)
+    
+    def get_as_number(self, context):
+        return self._evaluate(self._node.get_as_number, context)
+    
+    def get_as_string(self, context):
+        return self._evaluate(self._node.get_as_string, context)
+    
+    def get_as_set(self, context):
+        return self._evaluate(self._node.get_as_set, context)
+    
+    def _evaluate(self, method, context):   #pragma: no cover
+        """
+        Return the value of the wrapped node, computed by its ``method`` with
+        ``context``, and record the evaluation.
+        
+        """
+        raise NotImplementedError
+    
+    def __getattr__(self, name):
+        return getattr(self._node, name)
+
+
+def instrument_node(node, proxy_class, recorder, make_child_recorder):
+    """
+    Return a proxy for ``node`` which records its evaluation in ``recorder``.
+    
+    :param node: The root node of the parse tree to be instrumented.
+    :type node: :class:`booleano.nodes.OperationNode`
+    :param proxy_class: The class of the proxies, which must extend
+        :class:`InstrumentedNode`.
+    :param recorder: The object where the evaluation of ``node`` is recorded.
+    :param make_child_recorder: The callable which returns the recorder of a
+        child of ``node``, given the recorder of ``node`` and the child node.
+    :return: The proxy for ``node``, which implements the same datatypes.
+    
+    The arguments of function calls and the members of sets are instrumented
+    recursively, in a copy of the node. The members of constant sets are
+    not, because their values are computed once and for all.
+    
+    """
+    if isinstance(node, Function) or \
+       (isinstance(node, Set) and node._native_values is None):
+        instrumented_children = []
+        for child in node.get_children():
+            child_recorder = make_child_recorder(recorder, child)
+            instrumented_children.append(instrument_node(
+                child, proxy_class, child_recorder, make_child_recorder))
+        if isinstance(node, Set):
+            node = node._copy_with_members(instrumented_children)
+        else:
+            node = node._copy_with_arguments(tuple(instrumented_children))
+    return _get_proxy_class(proxy_class, node)(node, recorder)
+
+
+#{ Internal stuff
+
+
+# The datatypes implemented by the proxies, when the wrapped nodes do:
+_DATATYPES = (BooleanType, NumberType, StringType, SetType)
+
+# The subclasses of the proxy classes by their datatypes:
+_PROXY_CLASSES = {}
+
+
+def _get_proxy_class(proxy_class, node):
+    """
+    Return the subclass of ``proxy_class`` which implements the same
+    datatypes as ``node``.
+    
+    This way, the proxies pass the datatype checks (e.g., in
+    :func:`booleano.nodes.datatypes.get_native_value`) like the nodes they
+    wrap.
+    
+    """
+    datatypes = tuple(datatype for datatype in _DATATYPES if
+                      isinstance(node, datatype))
+    key = (proxy_class, datatypes)
+    if key not in _PROXY_CLASSES:
+        namespace = {'__module__': proxy_class.__module__}
+        _PROXY_CLASSES[key] = type(proxy_class.__name__,
+                                   (proxy_class, ) + datatypes, namespace)
+    return _PROXY_CLASSES[key]
+
+
+#}
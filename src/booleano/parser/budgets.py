@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2009-2010 by Gustavo Narea <http://gustavonarea.net/>.
+#
+# This file is part of Booleano <http://booleano.efous.org/>.
+#
+# This program is Freedomware: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+Evaluation budgets for untrusted expressions.
+
+A budget limits the amount of nodes visited and/or the time spent while
+evaluating a parse tree, so a single expression cannot stall the process.
+
+"""
+
+from threading import local
+from timeit import default_timer
+from weakref import WeakKeyDictionary
+
+from booleano.exc import BudgetExceededError
+from booleano.parser._instrumentation import InstrumentedNode, instrument_node
+
+__all__ = ("EvaluationBudget", )
+
+
+class EvaluationBudget(object):
+    """
+    The maximum resources a parse tree may use in a single evaluation.
+    
+    The same budget can be used in any number of evaluations, because it's
+    enforced for each evaluation independently.
+    
+    The budget is checked every time a node is visited, so a single node
+    which takes too long (e.g., a function call) won't be interrupted, but
+    the evaluation will be aborted right after it. The time spent
+    prefetching the data for the parse tree counts too.
+    
+    Each parse tree is instrumented the first time it's evaluated within
+    the budget, and the instrumented copy is reused afterwards.
+    
+    """
+    
+    def __init__(self, max_visits=None, timeout=None):
+        """
+        
+        :param max_visits: The maximum amount of nodes to be visited, or
+            ``None`` for no limit.
+        :type max_visits: int
+        :param timeout: The maximum amount of seconds the evaluation may
+            take, or ``None`` for no limit.
+        :type timeout: float
+        
+        """
+        self.max_visits = max_visits
+        self.timeout = timeout
+        self._meter = _BudgetMeter(self)
+        # The instrumented root nodes, by parse tree:
+        self._instrumented_roots = WeakKeyDictionary()
+    
+    def evaluate(self, tree, context):
+        """
+        Evaluate ``tree`` with ``context`` within this budget.
+        
+        :param tree: The parse tree to be evaluated.
+        :type tree: :class:`booleano.parser.trees.EvaluableParseTree`
+        :param context: The context against which the tree will be evaluated.
+        :return: Whether the tree evaluates to True.
+        :rtype: bool
+        :raises booleano.exc.BudgetExceededError: If the evaluation exceeded
+            the budget.
+        
+        The data required by the tree is prefetched first (see
+        :meth:`booleano.parser.trees.EvaluableParseTree.prefetch`).
+        
+        """
+        meter = self._meter
+        meter.start()
+        tree.prefetch(context)
+        meter.check_time()
+        
+        instrumented_root = self._instrumented_roots.get(tree)
+        if instrumented_root is None:
+            instrumented_root = instrument_node(tree.root_node, _BudgetedNode,
+                                                meter, _get_meter)
+            self._instrumented_roots[tree] = instrumented_root
+        return instrumented_root.get_as_boolean(context)
+
+
+#{ Internal stuff
+
+
+class _BudgetMeter(local):
+    """
+    The resources used so far in the current evaluation.
+    
+    The meter is shared by all the trees evaluated within a budget, so its
+    state is kept per thread.
+    
+    """
+    
+    def __init__(self, budget):
+        self.budget = budget
+        self.max_visits = None
+        self.deadline = None
+        self.visits = 0
+    
+    def start(self):
+        """Start metering a new evaluation in the current thread."""
+        self.max_visits = self.budget.max_visits
+        if self.budget.timeout is None:
+            self.deadline = None
+        else:
+            self.deadline = default_timer() + self.budget.timeout
+        self.visits = 0
+    
+    def visit(self):
+        """
+        Record a node visit.
+        
+        :raises booleano.exc.BudgetExceededError: If the budget has been
+            exceeded.
+        
+        """
+        self.visits += 1
+        if self.max_visits is not None and self.visits > self.max_visits:
+            raise BudgetExceededError("More than %s nodes were visited" %
+                                      self.max_visits)
+        self.check_time()
+    
+    def check_time(self):
+        """
+        :raises booleano.exc.BudgetExceededError: If the evaluation is taking
+            too long.
+        
+        """
+        if self.deadline is not None and default_timer() > self.deadline:
+            raise BudgetExceededError("The evaluation took too long")
+
+
+class _BudgetedNode(InstrumentedNode):
+    """
+    Proxy which records the visits to the node it wraps.
+    
+    """
+    
+    def _evaluate(self, method, context):
+        self._recorder.visit()
+        return method(context)
+
+
+def _get_meter(meter, node):
+    """Return ``meter``, which is shared by all the nodes."""
+    return meter
+
+
+#}
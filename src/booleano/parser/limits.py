@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2009-2010 by Gustavo Narea <http://gustavonarea.net/>.
+#
+# This file is part of Booleano <http://booleano.efous.org/>.
+#
+# This program is Freedomware: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+Complexity limits for the expressions accepted by a parse manager.
+
+The expressions are checked with a cheap linear scan before they're parsed,
+so adversarial input (e.g., thousands of nested parentheses) is rejected
+before pyparsing starts backtracking on it. The resulting parse trees can be
+checked too, before they're cached.
+
+"""
+
+import re
+
+from booleano.exc import ExpressionTooComplexError
+
+__all__ = ("ParseLimits", )
+
+
+class ParseLimits(object):
+    """
+    The maximum complexity of the expressions accepted by a parse manager.
+    
+    Each limit is optional; use ``None`` to disable it.
+    
+    The scan is grammar-aware but approximate: Each operator, grouping mark,
+    string and identifier/number counts as a token, and each grouping mark,
+    set or function call opened counts as a nesting level.
+    
+    """
+    
+    def __init__(self, max_length=None, max_depth=None, max_tokens=None,
+                 max_nodes=None, max_tree_depth=None):
+        """
+        
+        :param max_length: The maximum amount of characters in an
+            expression.
+        :type max_length: int
+        :param max_depth: The maximum nesting depth of an expression.
+        :type max_depth: int
+        :param max_tokens: The maximum amount of tokens in an expression.
+        :type max_tokens: int
+        :param max_nodes: The maximum amount of nodes in a parse tree.
+        :type max_nodes: int
+        :param max_tree_depth: The maximum depth of a parse tree.
+        :type max_tree_depth: int
+        
+        """
+        self.max_length = max_length
+        self.max_depth = max_depth
+        self.max_tokens = max_tokens
+        self.max_nodes = max_nodes
+        self.max_tree_depth = max_tree_depth
+        # The scanners for the grammars used so far:
+        self._scanners = {}
+    
+    def check_expression(self, expression, grammar):
+        """
+        Make sure ``expression`` doesn't exceed the pre-parse limits.
+        
+        :param expression: The expression to be checked.
+        :type expression: basestring
+        :param grammar: The grammar used by ``expression``.
+        :type grammar: :class:`booleano.parser.Grammar`
+        :raises booleano.exc.ExpressionTooComplexError: If ``expression``
+            exceeds any of the limits.
+        
+        """
+        if self.max_length is not None and len(expression) > self.max_length:
+            raise ExpressionTooComplexError(
+                u"The expression is longer than %s characters" %
+                self.max_length)
+        
+        if self.max_depth is None and self.max_tokens is None:
+            return
+        
+        scanner = self._get_scanner(grammar)
+        scanner.scan(expression, self.max_depth, self.max_tokens)
+    
+    def check_tree(self, parse_tree):
+        """
+        Make sure ``parse_tree`` doesn't exceed the post-parse limits.
+        
+        :param parse_tree: The parse tree to be checked.
+        :type parse_tree: :class:`booleano.parser.trees.ParseTree`
+        :raises booleano.exc.ExpressionTooComplexError: If ``parse_tree``
+            exceeds any of the limits.
+        
+        """
+        if self.max_nodes is None and self.max_tree_depth is None:
+            return
+        
+        node_count = 0
+        pending_nodes = [(parse_tree.root_node, 1)]
+        while pending_nodes:
+            (node, depth) = pending_nodes.pop()
+            node_count += 1
+            if self.max_nodes is not None and node_count > self.max_nodes:
+                raise ExpressionTooComplexError(
+                    u"The expression has more than %s nodes" %
+                    self.max_nodes)
+            if self.max_tree_depth is not None and \
+               depth > self.max_tree_depth:
+                raise ExpressionTooComplexError(
+                    u"The expression is nested more than %s levels deep" %
+                    self.max_tree_depth)
+            for child in node.get_children():
+                pending_nodes.append((child, depth + 1))
+    
+    def _get_scanner(self, grammar):
+        """
+        Return the scanner for ``grammar``, creating it if necessary.
+        
+        :param grammar: The grammar whose scanner is requested.
+        :type grammar: :class:`booleano.parser.Grammar`
+        :rtype: _Scanner
+        
+        """
+        if grammar not in self._scanners:
+            self._scanners[grammar] = _Scanner(grammar)
+        return self._scanners[grammar]
+
+
+#{ Internal stuff
+
+
+class _Scanner(object):
+    """
+    Linear-time tokenizer for the expressions of a grammar.
+    
+    """
+    
+    operator_tokens = ("not", "and", "or", "xor", "eq", "ne", "lt", "gt",
+                       "le", "ge", "belongs_to", "is_subset",
+                       "element_separator", "arguments_separator",
+                       "positive_sign", "negative_sign")
+    
+    opening_tokens = ("group_start", "arguments_start", "set_start")
+    
+    closing_tokens = ("group_end", "arguments_end", "set_end")
+    
+    word_tokens = ("identifier_spacing", "namespace_separator",
+                   "decimal_separator")
+    
+    def __init__(self, grammar):
+        """
+        Build the tokenizer for ``grammar``.
+        
+        :param grammar: The grammar whose expressions will be scanned.
+        :type grammar: :class:`booleano.parser.Grammar`
+        
+        """
+        get_token = grammar.get_token
+        self.opening_marks = set(get_token(t) for t in self.opening_tokens)
+        self.closing_marks = set(get_token(t) for t in self.closing_tokens)
+        
+        # Strings may contain any token, so they're consumed as a whole; an
+        # unterminated string runs up to the end of the expression, so that
+        # it's never scanned twice:
+        string_start = re.escape(get_token("string_start"))
+        string_end = re.escape(get_token("string_end"))
+        string_pattern = u"%s(?:(?!%s).)*(?:%s|$)" % (string_start,
+                                                      string_end, string_end)
+        
+        # The longest marks must be tried first (e.g., "<=" before "<"):
+        marks = set(get_token(t) for t in self.operator_tokens)
+        marks.update(self.opening_marks, self.closing_marks)
+        marks = sorted(marks, key=len, reverse=True)
+        marks_pattern = u"|".join(re.escape(mark) for mark in marks)
+        
+        word_chars = u"".join(re.escape(get_token(t)) for t in
+                              self.word_tokens)
+        word_pattern = u"(?:\\w|[%s])+" % word_chars
+        
+        # Words are tried before the marks, so that the alphabetic operators
+        # of localized grammars (e.g., "y" and "o") aren't found inside
+        # identifiers; an alphabetic operator on its own is a single word:
+        self.token_re = re.compile(u"%s|%s|%s|\\S" % (string_pattern,
+                                                      word_pattern,
+                                                      marks_pattern),
+                                   re.UNICODE | re.DOTALL)
+    
+    def scan(self, expression, max_depth, max_tokens):
+        """
+        Make sure ``expression`` doesn't exceed ``max_depth`` or
+        ``max_tokens``.
+        
+        :raises booleano.exc.ExpressionTooComplexError: If ``expression``
+            exceeds any of the limits.
+        
+        """
+        depth = 0
+        token_count = 0
+        for match in self.token_re.finditer(expression):
+            token = match.group()
+            token_count += 1
+            if max_tokens is not None and token_count > max_tokens:
+                raise ExpressionTooComplexError(
+                    u"The expression has more than %s tokens" % max_tokens)
+            if token in self.opening_marks:
+                depth += 1
+                if max_depth is not None and depth > max_depth:
+                    raise ExpressionTooComplexError(
+                        u"The expression is nested more than %s levels deep"
+                        % max_depth)
+            elif token in self.closing_marks:
+                depth -= 1
+
+
+#}
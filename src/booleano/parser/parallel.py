@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2009-2010 by Gustavo Narea <http://gustavonarea.net/>.
+#
+# This file is part of Booleano <http://booleano.efous.org/>.
+#
+# This program is Freedomware: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+Parallel evaluation of parse trees in worker processes.
+
+Tree-walk evaluation is CPU-bound, so large batches of contexts can be split
+among several processes. Each worker receives the parse tree just once (or
+builds it by itself from a :class:`TreeSpec`), and then the contexts are sent
+to the workers in chunks.
+
+The evaluator is a :class:`booleano.parser.streaming.StreamEvaluator`, so it
+can be used with the streaming functions in
+:mod:`booleano.parser.streaming` too.
+
+"""
+
+from collections import deque
+
+from booleano.parser.streaming import (DEFAULT_CHUNK_SIZE, StreamEvaluator,
+    evaluate_chunk)
+
+__all__ = ("ParallelEvaluator", "TreeSpec", "ExpressionSpec")
+
+
+class TreeSpec(object):
+    """
+    Base class for picklable specifications of parse trees.
+    
+    Use them when the parse tree cannot (or should not) be pickled, e.g.,
+    because its operands hold database connections. Each worker builds its
+    own parse tree from the specification.
+    
+    """
+    
+    def make_tree(self):
+        """
+        Build the parse tree represented by this specification.
+        
+        :rtype: :class:`booleano.parser.trees.EvaluableParseTree`
+        
+        """
+        raise NotImplementedError("Tree specifications must build their "
+                                  "parse trees")
+
+
+class ExpressionSpec(TreeSpec):
+    """
+    Specification of a parse tree by its expression and symbol table.
+    
+    Workers build their own symbol table, so the operands are resolved in
+    the worker processes.
+    
+    """
+    
+    def __init__(self, symbol_table_factory, grammar, expression, locale=None):
+        """
+        
+        :param symbol_table_factory: Callable that returns the symbol table
+            used by ``expression``; it must be picklable (e.g., a module-level
+            function).
+        :type symbol_table_factory: callable
+        :param grammar: The grammar used by ``expression``.
+        :type grammar: :class:`booleano.parser.Grammar`
+        :param expression: The expression to be parsed.
+        :type expression: basestring
+        :param locale: The locale of the ``grammar``.
+        :type locale: basestring
+        
+        """
+        self.symbol_table_factory = symbol_table_factory
+        self.grammar = grammar
+        self.expression = expression
+        self.locale = locale
+    
+    def make_tree(self):
+        """
+        Parse the expression with a freshly built symbol table.
+        
+        :rtype: :class:`booleano.parser.trees.EvaluableParseTree`
+        :raises booleano.exc.ParsingException: If the expression is not
+            valid in the symbol table.
+        
+        """
+        # Imported here because the parser imports this module indirectly:
+        from booleano.parser import EvaluableParseManager
+        
+        symbol_table = self.symbol_table_factory()
+        manager = EvaluableParseManager(symbol_table, self.grammar)
+        return manager.parse(self.expression, self.locale)
+
+
+class ParallelEvaluator(StreamEvaluator):
+    """
+    Evaluator of a parse tree in a pool of worker processes.
+    
+    The workers are started once and reused across calls, until the
+    evaluator is closed. The contexts must be picklable. It can be used as a
+    context manager::
+    
+        with ParallelEvaluator(tree, processes=32) as evaluator:
+            for result in evaluator.evaluate(contexts):
+                ...
+    
+    """
+    
+    def __init__(self, tree, processes=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        
+        :param tree: The parse tree to be evaluated, or its specification.
+        :type tree: :class:`booleano.parser.trees.EvaluableParseTree` or
+            :class:`TreeSpec`
+        :param processes: The amount of worker processes (by default, one
+            per CPU).
+        :type processes: int
+        :param chunk_size: The amount of contexts sent to a worker at once.
+        :type chunk_size: int
+        
+        """
+        # Imported here so that multiprocessing is loaded only when needed:
+        from multiprocessing import Pool, cpu_count
+        
+        super(ParallelEvaluator, self).__init__(tree, chunk_size)
+        self.processes = processes or cpu_count()
+        self._pool = Pool(self.processes, _set_worker_tree, (tree, ))
+    
+    def iter_chunk_results(self, chunks):
+        """
+        Yield each chunk in ``chunks`` along with its results.
+        
+        :param chunks: The lists of contexts to be evaluated.
+        :type chunks: iterable
+        :rtype: iterator
+        
+        At most two chunks per worker are in flight at any time, so the
+        ``chunks`` are consumed lazily and the memory used doesn't depend on
+        their amount.
+        
+        """
+        pending_chunks = deque()
+        max_pending_chunks = self.processes * 2
+        for chunk in chunks:
+            async_result = self._pool.apply_async(_evaluate_chunk_in_worker,
+                                                  (chunk, ))
+            pending_chunks.append((chunk, async_result))
+            if len(pending_chunks) >= max_pending_chunks:
+                (pending_chunk, async_result) = pending_chunks.popleft()
+                yield (pending_chunk, async_result.get())
+        while pending_chunks:
+            (pending_chunk, async_result) = pending_chunks.popleft()
+            yield (pending_chunk, async_result.get())
+    
+    def close(self):
+        """Stop the worker processes."""
+        self._pool.terminate()
+        self._pool.join()
+
+
+#{ Internal stuff
+
+
+_WORKER_TREE = None
+"""The parse tree evaluated by the current worker process."""
+
+_WORKER_TREE_ERROR = None
+"""The exception raised while building the parse tree of this worker, if any."""
+
+
+def _set_worker_tree(tree):
+    """
+    Set ``tree`` as the parse tree to be evaluated by this worker, building it
+    first if it's a specification.
+    
+    If the specification cannot be built, the exception is raised when the
+    worker evaluates its first chunk, so that it gets to the parent process:
+    The pool would restart the worker over and over again if it were raised
+    here.
+    
+    """
+    global _WORKER_TREE, _WORKER_TREE_ERROR
+    if isinstance(tree, TreeSpec):
+        try:
+            tree = tree.make_tree()
+        except Exception, exc:
+            _WORKER_TREE_ERROR = exc
+            return
+    _WORKER_TREE = tree
+
+
+def _evaluate_chunk_in_worker(chunk):
+    """Return the results of the worker's parse tree under ``chunk``."""
+    if _WORKER_TREE_ERROR is not None:
+        raise _WORKER_TREE_ERROR
+    return evaluate_chunk(_WORKER_TREE, chunk)
+
+
+#}
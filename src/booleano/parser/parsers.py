@@ -25,13 +25,14 @@ import re
 from pyparsing import (Suppress, CaselessLiteral, Word, quotedString,
     nums, operatorPrecedence, opAssoc, Forward, removeQuotes,
     Optional, OneOrMore, Combine, StringStart, StringEnd, ZeroOrMore, Group,
-    Regex, Literal, delimitedList, ParserElement)
+    Regex, Literal, delimitedList, ParserElement, ParseException)
 
 from booleano.parser.trees import EvaluableParseTree, ConvertibleParseTree
+from booleano.nodes import Function
 from booleano.nodes.operations import (Not, And, Or, Xor, Equal, NotEqual, LessThan,
     GreaterThan, LessEqual, GreaterEqual, BelongsTo, IsSubset)
-from booleano.nodes.constants import (String, Number,
-    Set, Function, PlaceholderVariable, PlaceholderFunction)
+from booleano.nodes.constants import String, Number, Set
+from booleano.nodes.placeholders import PlaceholderVariable, PlaceholderFunction
 from booleano.exc import BadExpressionError
 
 
@@ -41,6 +42,19 @@ __all__ = ("EvaluableParser", "ConvertibleParser")
 ParserElement.enablePackrat()
 
 
+def _reject_leading_digit(string, location, tokens):
+    """
+    Make the identifier in ``tokens`` fail to match if it starts with a
+    number, in any numeral system.
+    
+    :raises ParseException: If the identifier starts with a number.
+    
+    """
+    if tokens[0][0].isdigit():
+        raise ParseException(string, location, "Identifiers cannot start "
+                             "with a number")
+
+
 class Parser(object):
     """
     Base class for parsers.
@@ -49,15 +63,21 @@ class Parser(object):
     
     parse_tree_class = None
     
-    def __init__(self, grammar):
+    def __init__(self, grammar, interner=None):
         """
         
         :param grammar: The grammar used by the parser.
         :type grammar: :class:`booleano.parser.Grammar`
+        :param interner: The factory of the canonical constants and
+            operations to be shared across parse trees, if any.
+        :type interner: :class:`booleano.nodes.interning.NodeInterner`
         
         """
         self._parser = None
+        self._literal_string = None
+        self._literal_number = None
         self._grammar = grammar
+        self._interner = interner
     
     def __call__(self, expression):
         """
@@ -195,7 +215,7 @@ class Parser(object):
         function.setParseAction(self.make_function)
         
         operand << (function | variable | self.define_number() | \
-                    self.define_string() | set_)
+                    self.define_string() | self.define_literal_set() | set_)
         
         return operand
     
@@ -247,20 +267,71 @@ class Parser(object):
         number.setName("number")
         return number
     
+    def define_literal_set(self):
+        """
+        Return the syntax definition for a non-empty set made up only of
+        strings or only of numbers.
+        
+        Such sets are matched with a single regular expression and built
+        straight into a constant :class:`booleano.nodes.constants.Set`, so
+        parsing them takes linear time even with thousands of elements. Any
+        other set is left to the general syntax definition, which supports all
+        the operands.
+        
+        **Do not override this method** unless you override
+        :meth:`define_string` or :meth:`define_number`, in which case it must
+        be overridden accordingly.
+        
+        """
+        whitespace = r"[ \t\n\r]*"
+        set_start = self.__get_regex_token__("set_start")
+        set_end = self.__get_regex_token__("set_end")
+        element_separator = self.__get_regex_token__("element_separator")
+        
+        # The same syntax as in define_number(); pyparsing doesn't backtrack,
+        # so neither must the regular expressions:
+        sign = "%s|%s" % (self.__get_regex_token__("positive_sign"),
+                          self.__get_regex_token__("negative_sign"))
+        thousands_sep = self.__get_regex_token__("thousands_separator")
+        decimal_sep = self.__get_regex_token__("decimal_separator")
+        thousands = r"[0-9]{1,3}(?![0-9])(?:%s[0-9]{3})+" % thousands_sep
+        number = r"(?:%s)?(?:%s|[0-9]+)(?:%s[0-9]+)?" % (sign, thousands,
+                                                          decimal_sep)
+        self._literal_number = re.compile(r"(?=(%s))\1" % number)
+        self._literal_string = re.compile(quotedString.pattern)
+        
+        literal_sets = []
+        for (literal, make_set) in ((quotedString.pattern,
+                                     self.make_string_set),
+                                    (number, self.make_number_set)):
+            first_element = r"(?=(%s))\1" % literal
+            next_element = r"%s%s%s(?=(%s))\2" % (whitespace,
+                                                   element_separator,
+                                                   whitespace, literal)
+            literal_set = Regex(r"%s%s%s(?:%s)*%s%s" % (set_start, whitespace,
+                                                        first_element,
+                                                        next_element,
+                                                        whitespace, set_end))
+            literal_set.setParseAction(make_set)
+            literal_sets.append(literal_set)
+        
+        literal_set = literal_sets[0] | literal_sets[1]
+        literal_set.setName("literal_set")
+        return literal_set
+    
     def define_identifier(self):
         """
         Return the syntax definition for an identifier.
         
         """
         # --- Defining the individual identifiers:
-        # Getting all the Unicode numbers in a single string:
-        unicode_numbers = "".join([unichr(n) for n in xrange(0x10000)
-                                   if unichr(n).isdigit()])
-        unicode_number_expr = Regex("[%s]" % unicode_numbers, re.UNICODE)
         space_char = re.escape(self._grammar.get_token("identifier_spacing"))
-        identifier0 = Regex("[\w%s]+" % space_char, re.UNICODE)
-        # Identifiers cannot start with a number:
-        identifier0 = Combine(~unicode_number_expr + identifier0)
+        # Identifiers cannot start with a number. Decimal digits are excluded
+        # by the regular expression, because parse actions are not run in
+        # lookaheads and "3.5" would look like the identifier "3" otherwise.
+        # The other digits (e.g., superscripts) are rejected afterwards:
+        identifier0 = Regex("(?!\d)[\w%s]+" % space_char, re.UNICODE)
+        identifier0.setParseAction(_reject_leading_digit)
         identifier0.setName("individual_identifier")
         
         # --- Defining the namespaces:
@@ -279,11 +350,11 @@ class Parser(object):
     
     def make_string(self, tokens):
         """Make a String constant using the token passed."""
-        return String(tokens[0])
+        return self._intern(String(tokens[0]))
     
     def make_number(self, tokens):
         """Make a Number constant using the token passed."""
-        return Number(tokens[0])
+        return self._intern(Number(tokens[0]))
     
     def make_variable(self, tokens):
         """Make a variable using the tokens passed."""
@@ -297,7 +368,37 @@ class Parser(object):
     
     def make_set(self, tokens):
         """Make a Set using the token passed."""
-        return Set(*tokens[0])
+        return self._intern(Set(*tokens[0]))
+    
+    def make_string_set(self, tokens):
+        """Make a Set of String constants using the token passed."""
+        strings = self._literal_string.findall(tokens[0])
+        items = [self._intern(String(string[1:-1])) for string in strings]
+        return self._intern(Set(*items))
+    
+    def make_number_set(self, tokens):
+        """Make a Set of Number constants using the token passed."""
+        negative_sign = self._grammar.get_token("negative_sign")
+        positive_sign = self._grammar.get_token("positive_sign")
+        thousands_sep = self._grammar.get_token("thousands_separator")
+        decimal_sep = self._grammar.get_token("decimal_separator")
+        
+        items = []
+        for number_match in self._literal_number.finditer(tokens[0]):
+            number = number_match.group()
+            sign = ""
+            if number.startswith(negative_sign):
+                sign = "-"
+                number = number[len(negative_sign):]
+            elif number.startswith(positive_sign):
+                number = number[len(positive_sign):]
+            (integers, decimal_sep_found, decimals) = \
+                number.partition(decimal_sep)
+            number = sign + integers.replace(thousands_sep, "")
+            if decimal_sep_found:
+                number += "." + decimals
+            items.append(self._intern(Number(number)))
+        return self._intern(Set(*items))
     
     def make_relational(self, tokens):
         """Make a relational operation using the tokens passed."""
@@ -307,7 +408,7 @@ class Parser(object):
         
         operation = self.__relationals__[operator]
         
-        return operation(left_op, right_op)
+        return self._intern(operation._make_trusted(left_op, right_op))
     
     def make_membership(self, tokens):
         """
@@ -319,11 +420,11 @@ class Parser(object):
         set_ = tokens[0][2]
         operation = self.__membership_operators__[operator]
         
-        return operation(element, set_)
+        return self._intern(operation._make_trusted(element, set_))
     
     def make_not(self, tokens):
         """Make an *Not* connective using the token passed."""
-        return Not(tokens[0][0])
+        return self._intern(Not._make_trusted(tokens[0][0]))
     
     def make_and(self, tokens):
         """Make an *And* connective using the tokens passed."""
@@ -343,19 +444,37 @@ class Parser(object):
         ``operation_class`` and its ``operands``.
         
         """
+        # The operands are nodes made by the other parse actions, so the
+        # operations can be built without checking that again:
+        make_operation = operation_class._make_trusted
         if len(operands) == 2:
-            operation = operation_class(operands[0], operands[1])
+            operation = self._intern(make_operation(operands[0], operands[1]))
         else:
             # We're going to build the operation from right to left, so it
             # can be evaluated from left to right (a LIFO approach).
-            operation = operation_class(operands[-2], operands[-1])
+            operation = self._intern(make_operation(operands[-2],
+                                                    operands[-1]))
             operands = operands[:-2]
             operands.reverse()
             for operand in operands:
-                operation = operation_class(operand, operation)
+                operation = self._intern(make_operation(operand, operation))
         
         return operation
     
+    def __get_regex_token__(self, token_name):
+        """Return the regular expression for the token ``token_name``."""
+        return re.escape(self._grammar.get_token(token_name))
+    
+    def _intern(self, node):
+        """
+        Return the canonical instance for ``node`` if there's an interner;
+        otherwise, return ``node`` itself.
+        
+        """
+        if self._interner is not None:
+            node = self._interner.intern(node)
+        return node
+    
     #}
 
 
@@ -367,7 +486,7 @@ class EvaluableParser(Parser):
     
     parse_tree_class = EvaluableParseTree
     
-    def __init__(self, grammar, namespace):
+    def __init__(self, grammar, namespace, interner=None):
         """
         
         :param grammar: The grammar used by the parser.
@@ -375,10 +494,76 @@ class EvaluableParser(Parser):
         :param namespace: The namespace that contains the objects used by the
             expressions to be parsed.
         :type namespace: :class:`booleano.parser.scope.Namespace`
+        :param interner: The factory of the canonical constants and
+            operations to be shared across parse trees, if any.
+        :type interner: :class:`booleano.nodes.interning.NodeInterner`
         
         """
         self._namespace = namespace
-        super(EvaluableParser, self).__init__(grammar)
+        self._identifiers = None
+        super(EvaluableParser, self).__init__(grammar, interner)
+    
+    def parse_with_identifiers(self, expression):
+        """
+        Parse ``expression`` and return its parse tree along with the
+        identifiers it uses.
+        
+        :param expression: The expression to be parsed.
+        :type expression: basestring
+        :return: The parse tree and the identifiers, where each identifier is
+            a tuple made up of the names of its namespaces followed by its own
+            name.
+        :rtype: tuple
+        
+        """
+        self._identifiers = set()
+        try:
+            parse_tree = self(expression)
+            identifiers = frozenset(self._identifiers)
+        finally:
+            self._identifiers = None
+        return (parse_tree, identifiers)
+    
+    def set_namespace(self, namespace):
+        """
+        Use ``namespace`` to resolve the identifiers from now on.
+        
+        :param namespace: The namespace that contains the objects used by the
+            expressions to be parsed.
+        :type namespace: :class:`booleano.parser.scope.Namespace`
+        
+        The parser doesn't have to be built again.
+        
+        """
+        self._namespace = namespace
+    
+    def bind(self, parse_tree):
+        """
+        Resolve the placeholders in the convertible ``parse_tree`` and return
+        the equivalent evaluable parse tree.
+        
+        :param parse_tree: The parse tree to be bound, whose placeholders use
+            the names in the namespace of this parser.
+        :type parse_tree: :class:`ConvertibleParseTree`
+        :return: The evaluable parse tree.
+        :rtype: :class:`EvaluableParseTree`
+        :raises ScopeError: If an identifier is not found (including its
+            parent namespace, if any).
+        :raises BadExpressionError: If a placeholder variable represents a
+            function, or a placeholder function doesn't represent a function.
+        :raises InvalidOperationError: If an object doesn't support the
+            operation it's used in, or the root node doesn't support logical
+            values.
+        
+        The placeholders are resolved like the identifiers in the expressions
+        parsed by this parser, so the result and the errors are the same as
+        if the original expression had been parsed again.
+        
+        The nodes without placeholders are reused.
+        
+        """
+        root_node = self._bind_node(parse_tree.root_node)
+        return self.parse_tree_class(root_node)
     
     def make_variable(self, tokens):
         """
@@ -392,13 +577,7 @@ class EvaluableParser(Parser):
             a function, not a variable.
         
         """
-        var = self._namespace.get_object(tokens.identifier,
-                                         tokens.namespace_parts)
-        if isinstance(var, type) and issubclass(var, Function):
-            orig_id = self.__get_original_identifier__(tokens)
-            raise BadExpressionError(u'"%s" represents a function, not a '
-                                     'variable' % orig_id)
-        return var
+        return self._make_variable(tokens.identifier, tokens.namespace_parts)
     
     def make_function(self, tokens):
         """
@@ -413,18 +592,109 @@ class EvaluableParser(Parser):
         
         """
         func_name = tokens.function_name
-        func = self._namespace.get_object(func_name.identifier,
-                                          func_name.namespace_parts)
+        return self._make_function(func_name.identifier,
+                                   func_name.namespace_parts, tokens.arguments)
+    
+    def _make_variable(self, identifier, namespace_parts):
+        """
+        Return the variable or constant called ``identifier`` in the
+        namespace whose names are ``namespace_parts``.
+        
+        See :meth:`make_variable`.
+        
+        """
+        var = self._get_object(identifier, namespace_parts)
+        if isinstance(var, type) and issubclass(var, Function):
+            orig_id = self.__get_original_identifier__(identifier,
+                                                       namespace_parts)
+            raise BadExpressionError(u'"%s" represents a function, not a '
+                                     'variable' % orig_id)
+        return var
+    
+    def _make_function(self, identifier, namespace_parts, arguments):
+        """
+        Return the call of the function called ``identifier`` in the
+        namespace whose names are ``namespace_parts``, with ``arguments``.
+        
+        See :meth:`make_function`.
+        
+        """
+        func = self._get_object(identifier, namespace_parts)
         if not (isinstance(func, type) and issubclass(func, Function)):
-            orig_id = self.__get_original_identifier__(func_name)
+            orig_id = self.__get_original_identifier__(identifier,
+                                                       namespace_parts)
             raise BadExpressionError(u'"%s" is not a function' % orig_id)
-        function_call = func(*tokens.arguments)
+        function_call = func(*arguments)
         return function_call
     
-    def __get_original_identifier__(self, tokens):
-        """Build the original identifier from a Pyparsing ``tokens``."""
+    def _bind_node(self, root_node):
+        """
+        Return ``root_node`` with its placeholders resolved.
+        
+        See :meth:`bind`. The tree is walked with an explicit stack, so trees
+        nested beyond the recursion limit can be bound too.
+        
+        """
+        bound_nodes = []
+        # The nodes are visited in post-order: Each node is pushed along with
+        # its children once they have been bound.
+        pending_nodes = [(root_node, None)]
+        while pending_nodes:
+            (node, children) = pending_nodes.pop()
+            if children is None:
+                if isinstance(node, PlaceholderVariable):
+                    bound_nodes.append(self._make_variable(
+                        node.name, node.namespace_parts))
+                    continue
+                children = node.get_children()
+                pending_nodes.append((node, children))
+                for child in reversed(children):
+                    pending_nodes.append((child, None))
+                continue
+            
+            first_child_index = len(bound_nodes) - len(children)
+            bound_children = tuple(bound_nodes[first_child_index:])
+            del bound_nodes[first_child_index:]
+            bound_nodes.append(self._rebuild_node(node, children,
+                                                  bound_children))
+        
+        return bound_nodes[0]
+    
+    def _rebuild_node(self, node, children, bound_children):
+        """
+        Return ``node`` with its ``children`` replaced by the
+        ``bound_children``, or ``node`` itself if none of them changed.
+        
+        """
+        if isinstance(node, PlaceholderFunction):
+            return self._make_function(node.name, node.namespace_parts,
+                                       list(bound_children))
+        if all(bound_child is child for (bound_child, child) in
+               zip(bound_children, children)):
+            # There are no placeholders under this node (e.g., a constant).
+            return node
+        if isinstance(node, Set):
+            return self._intern(Set(*bound_children))
+        # It's one of the built-in operations:
+        return self._intern(node.__class__._make_trusted(*bound_children))
+    
+    def _get_object(self, identifier, namespace_parts):
+        """
+        Return the object called ``identifier`` in the namespace whose names
+        are ``namespace_parts``, and record its path if requested by
+        :meth:`parse_with_identifiers`.
+        
+        """
+        obj = self._namespace.get_object(identifier, namespace_parts)
+        if self._identifiers is not None:
+            path = tuple(namespace_parts) + (identifier, )
+            self._identifiers.add(path)
+        return obj
+    
+    def __get_original_identifier__(self, identifier, namespace_parts):
+        """Build the original identifier from its names."""
         ns_sep = unicode(self._grammar.get_token("namespace_separator"))
-        id_parts = list(tokens.namespace_parts) + [tokens.identifier]
+        id_parts = list(namespace_parts) + [identifier]
         id_ = ns_sep.join(id_parts)
         return id_
 
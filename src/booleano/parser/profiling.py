@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2009-2010 by Gustavo Narea <http://gustavonarea.net/>.
+#
+# This file is part of Booleano <http://booleano.efous.org/>.
+#
+# This program is Freedomware: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+Profiling of the evaluation of parse trees.
+
+The profiler evaluates an instrumented copy of the parse tree, so the
+evaluation of the original parse tree is not slowed down at all.
+
+"""
+
+from timeit import default_timer
+
+from booleano.nodes import Function
+from booleano.parser._instrumentation import InstrumentedNode, instrument_node
+
+__all__ = ("EvaluationProfiler", "NodeProfile")
+
+
+class NodeProfile(object):
+    """
+    The evaluation statistics of a node in a parse tree.
+    
+    .. attribute:: node
+    
+        The node being profiled.
+    
+    .. attribute:: children
+    
+        The profiles of the nodes contained in :attr:`node`.
+    
+    .. attribute:: calls
+    
+        How many times the node was evaluated.
+    
+    .. attribute:: true_count
+    
+        How many times the node evaluated to True, if it was evaluated as a
+        logical value.
+    
+    .. attribute:: false_count
+    
+        How many times the node evaluated to False, if it was evaluated as a
+        logical value.
+    
+    .. attribute:: inclusive_time
+    
+        The seconds spent evaluating the node, including its children.
+    
+    """
+    
+    def __init__(self, node, parent=None):
+        """
+        
+        :param node: The node to be profiled.
+        :type node: :class:`booleano.nodes.OperationNode`
+        :param parent: The profile of the parent node, if any.
+        :type parent: :class:`NodeProfile`
+        
+        """
+        self.node = node
+        self.parent = parent
+        self.children = []
+        self.calls = 0
+        self.true_count = 0
+        self.false_count = 0
+        self.inclusive_time = 0.0
+    
+    def add_child(self, node):
+        """
+        Return the profile for ``node``, a child of the node being profiled.
+        
+        :rtype: :class:`NodeProfile`
+        
+        """
+        profile = NodeProfile(node, self)
+        self.children.append(profile)
+        return profile
+    
+    @property
+    def exclusive_time(self):
+        """
+        Return the seconds spent evaluating the node, excluding its children.
+        
+        :rtype: float
+        
+        """
+        children_time = sum(child.inclusive_time for child in self.children)
+        return self.inclusive_time - children_time
+    
+    @property
+    def skipped(self):
+        """
+        Return how many times the node was not evaluated while its parent was
+        (e.g., because of the short-circuit evaluation of a connective).
+        
+        :rtype: int
+        
+        """
+        if self.parent is None:
+            return 0
+        return self.parent.calls - self.calls
+    
+    def get_report_lines(self, depth=0):
+        """
+        Return the lines that make up the report for this node and its
+        children, indented by ``depth`` levels.
+        
+        :rtype: list
+        
+        The profiles are walked with an explicit stack, so the reports of
+        trees nested beyond the recursion limit can be made too.
+        
+        """
+        lines = []
+        pending_profiles = [(self, depth)]
+        while pending_profiles:
+            (profile, depth) = pending_profiles.pop()
+            if isinstance(profile.node, Function):
+                label = profile.node.__class__.__name__
+            else:
+                label = repr(profile.node)
+            line = "%s%s calls=%s true=%s false=%s skipped=%s incl=%.3fms " \
+                   "excl=%.3fms" % ("  " * depth, label, profile.calls,
+                                    profile.true_count, profile.false_count,
+                                    profile.skipped,
+                                    profile.inclusive_time * 1000,
+                                    profile.exclusive_time * 1000)
+            lines.append(line)
+            for child in reversed(profile.children):
+                pending_profiles.append((child, depth + 1))
+        return lines
+
+
+class EvaluationProfiler(object):
+    """
+    Profiler of the evaluation of an evaluable parse tree.
+    
+    It records the statistics of each node in the parse tree (see
+    :class:`NodeProfile`) across all the evaluations done by the profiler::
+    
+        profiler = EvaluationProfiler(tree)
+        for context in sample_contexts:
+            profiler(context)
+        print profiler.get_report()
+    
+    """
+    
+    def __init__(self, tree):
+        """
+        
+        :param tree: The parse tree to be profiled.
+        :type tree: :class:`booleano.parser.trees.EvaluableParseTree`
+        
+        """
+        self.tree = tree
+        self.root_profile = NodeProfile(tree.root_node)
+        self._instrumented_root = instrument_node(tree.root_node,
+                                                  _ProfiledNode,
+                                                  self.root_profile,
+                                                  NodeProfile.add_child)
+    
+    def __call__(self, context):
+        """
+        Evaluate the parse tree with ``context`` and record the statistics.
+        
+        :return: Whether the parse tree evaluates to True.
+        :rtype: bool
+        
+        """
+        self.tree.prefetch(context)
+        return self._instrumented_root.get_as_boolean(context)
+    
+    def get_report(self):
+        """
+        Return the parse tree annotated with the statistics of each node.
+        
+        :rtype: basestring
+        
+        Each line represents a node, indented under its parent node.
+        
+        """
+        return "\n".join(self.root_profile.get_report_lines())
+
+
+#{ Internal stuff
+
+
+class _ProfiledNode(InstrumentedNode):
+    """
+    Proxy which records the evaluation statistics of the node it wraps.
+    
+    """
+    
+    def get_as_boolean(self, context):
+        result = super(_ProfiledNode, self).get_as_boolean(context)
+        if result:
+            self._recorder.true_count += 1
+        else:
+            self._recorder.false_count += 1
+        return result
+    
+    def _evaluate(self, method, context):
+        profile = self._recorder
+        profile.calls += 1
+        start_time = default_timer()
+        try:
+            return method(context)
+        finally:
+            profile.inclusive_time += default_timer() - start_time
+
+
+#}
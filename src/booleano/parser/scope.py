@@ -21,11 +21,12 @@ Booleano scope handling.
 """
 
 from logging import getLogger
+from weakref import WeakSet
 
 from booleano.exc import ScopeError
 
 
-__all__ = ("Bind", "SymbolTable", "Namespace")
+__all__ = ("Bind", "SymbolTable", "Namespace", "LazyNamespace")
 
 
 LOGGER = getLogger(__name__)
@@ -96,10 +97,7 @@ class _Identifier(object):
         Make the identifier hashable based on its global name.
         
         """
-        first = ord(self.global_name[0])
-        last = ord(self.global_name[-1])
-        hash_ = first*2 + last*3 + len(self.global_name)
-        return hash_
+        return hash(self.global_name)
     
     def __eq__(self, other):
         """
@@ -211,6 +209,15 @@ class SymbolTable(_Identifier):
     
     Symbol tables wrap *bound* operands (aka, "bindings").
     
+    .. attribute:: version
+    
+        The amount of changes made to this symbol table or its sub-tables.
+        Its namespaces are cached until it changes.
+    
+    The parse managers which use a symbol table observe it, so they can
+    discard the parse trees which use the objects removed from it or from its
+    sub-tables.
+    
     """
     
     def __init__(self, global_name, objects, *subtables, **names):
@@ -234,6 +241,11 @@ class SymbolTable(_Identifier):
         super(SymbolTable, self).__init__(global_name, **names)
         self.objects = set()
         self.subtables = set()
+        self.version = 0
+        self._namespaces = {}
+        self._observers = WeakSet()
+        self._object_names = _NameIndex()
+        self._subtable_names = _NameIndex()
         for obj in objects:
             self.add_object(obj)
         for table in subtables:
@@ -260,6 +272,8 @@ class SymbolTable(_Identifier):
         # It's safe to include it!
         obj.symbol_table = self
         self.objects.add(obj)
+        self._object_names.add(obj)
+        self._mark_as_changed()
     
     def add_subtable(self, table):
         """
@@ -282,65 +296,75 @@ class SymbolTable(_Identifier):
         # It's safe to include it!
         table.symbol_table = self
         self.subtables.add(table)
+        self._subtable_names.add(table)
+        self._mark_as_changed()
     
-    def validate_scope(self):
+    def remove_object(self, obj):
         """
-        Make sure there's no name clash in the symbol table.
-        
-        :raise booleano.exc.ScopeError: If a name clash in found, either in the
-            global names or with the localized names.
+        Remove the ``obj`` object from this symbol table.
         
-        Users may want to run this in their test suite, instead of in
-        production, for performance reasons.
+        :param obj: The bound operand to be removed.
+        :type obj: :class:`Bind`
+        :raises booleano.exc.ScopeError: If ``obj`` doesn't belong to this
+            symbol table.
         
-        Note that it's perfectly valid for one object and one sub-table to
-        have the same name in the parent symbol table.
+        """
+        if obj.symbol_table is not self:
+            raise ScopeError(u"%s doesn't belong to %s" % (obj, self))
         
+        self.objects.remove(obj)
+        self._object_names.remove(obj)
+        obj.symbol_table = None
+        self._mark_as_changed(obj)
+    
+    def replace_object(self, old_obj, new_obj):
         """
-        # <--- Checking that there's no name clash among the global names
+        Replace the ``old_obj`` object in this symbol table with ``new_obj``.
         
-        unique_objects = set([obj.global_name for obj in self.objects])
-        if len(unique_objects) != len(self.objects):
-            raise ScopeError("Two or more objects in %s share the same global "
-                             "name" % self)
+        :param old_obj: The bound operand to be removed.
+        :type old_obj: :class:`Bind`
+        :param new_obj: The bound operand to be added.
+        :type new_obj: :class:`Bind`
+        :raises booleano.exc.ScopeError: If ``old_obj`` doesn't belong to this
+            symbol table, or if ``new_obj`` can't be added to it (see
+            :meth:`add_object`).
         
-        unique_tables = set([table.global_name for table in self.subtables])
-        if len(unique_tables) != len(self.subtables):
-            raise ScopeError("Two or more sub-tables in %s share the same "
-                             "global name" % self)
+        If ``new_obj`` can't be added, ``old_obj`` is kept.
         
-        # <--- Checking that there's no name clash in the sub-tables
-        for table in self.subtables:
-            table.validate_scope()
+        """
+        self.remove_object(old_obj)
+        try:
+            self.add_object(new_obj)
+        except ScopeError:
+            self.add_object(old_obj)
+            raise
+    
+    def validate_scope(self, full=False):
+        """
+        Make sure there's no name clash in the symbol table.
         
-        # <--- Checking that there's no name clash among the localized names
+        :param full: Whether the names of the objects and sub-tables should be
+            indexed again.
+        :type full: bool
+        :raise booleano.exc.ScopeError: If a name clash in found, either in the
+            global names or with the localized names.
         
-        # Collecting all the locales used:
-        locales = set()
-        for id_ in (self.objects | self.subtables):
-            locales |= set(id_.names.keys())
+        The names of the objects and sub-tables are indexed as they're added,
+        and the names which may clash are recorded then, so only those are
+        checked here. A full validation is only needed if the names of an
+        object or sub-table were changed after it was added.
         
-        # Now let's see if any of them are duplicate:
-        for locale in locales:
-            # Checking the objects:
-            used_object_names = set()
-            for obj in self.objects:
-                name = obj.get_localized_name(locale)
-                if name in used_object_names:
-                    raise ScopeError('The name "%s" is shared by two or more '
-                                     'bindings in %s (locale: %s)' %
-                                     (name, self, locale))
-                used_object_names.add(name)
-            
-            # Checking the sub-tables:
-            used_table_names = set()
-            for table in self.subtables:
-                name = table.get_localized_name(locale)
-                if name in used_table_names:
-                    raise ScopeError('The name "%s" is shared by two or more '
-                                     'sub-tables in %s (locale: %s)' %
-                                     (name, self, locale))
-                used_table_names.add(name)
+        Note that it's perfectly valid for one object and one sub-table to
+        have the same name in the parent symbol table.
+        
+        """
+        pending_tables = [self]
+        while pending_tables:
+            table = pending_tables.pop()
+            if full:
+                table._index_names()
+            table._check_names()
+            pending_tables.extend(table.subtables)
     
     def get_namespace(self, locale=None):
         """
@@ -352,10 +376,17 @@ class SymbolTable(_Identifier):
         :return: The namespace in ``locale``.
         :rtype: :class:`booleano.parser.scope.Namespace`
         
+        The namespace is cached until this symbol table changes, and so are
+        those of its sub-tables: Only the namespaces of the tables that
+        changed (and their ancestors) are created again.
+        
+        The objects are resolved on demand (see :class:`LazyNamespace`), so
+        creating a namespace doesn't depend on the size of the table.
+        
         """
-        objects = self._get_objects(locale)
-        subnamespaces = self._get_subnamespaces(locale)
-        return Namespace(objects, subnamespaces)
+        if locale not in self._namespaces:
+            self._namespaces[locale] = LazyNamespace(self, locale)
+        return self._namespaces[locale]
     
     def __unicode__(self):
         """
@@ -419,6 +450,36 @@ class SymbolTable(_Identifier):
         subnamespaces = self.__extract_items__(self.subtables, locale)
         return subnamespaces
     
+    def _resolve_path(self, locale, path):
+        """
+        Return the sub-tables and the object identified by ``path`` in
+        ``locale``.
+        
+        :param locale: The locale of the names in ``path``, or ``None`` for
+            the global names.
+        :type locale: basestring
+        :param path: The names of the namespaces of the object, followed by
+            its own name.
+        :type path: tuple
+        :return: The sub-tables that lead to the object, from the topmost one,
+            followed by the object.
+        :rtype: list
+        :raises KeyError: If there's no such object.
+        
+        """
+        identifiers = []
+        table = self
+        for table_name in path[:-1]:
+            table = table._subtable_names.get_identifier(locale, table_name)
+            if table is None:
+                raise KeyError(path)
+            identifiers.append(table)
+        obj = table._object_names.get_identifier(locale, path[-1])
+        if obj is None:
+            raise KeyError(path)
+        identifiers.append(obj)
+        return identifiers
+    
     def __extract_items__(self, items, locale):
         """
         Filter the contents of the ``items`` identifiers based on the
@@ -447,6 +508,95 @@ class SymbolTable(_Identifier):
         
         return extracted_items
     
+    def _add_trusted_contents(self, objects, subtables):
+        """
+        Add the ``objects`` and ``subtables`` to this table without checking
+        them first.
+        
+        :param objects: The bound operands to be added.
+        :type objects: list
+        :param subtables: The symbol tables to be added.
+        :type subtables: list
+        
+        This must only be used with the contents of a valid symbol table,
+        which are not in any table yet (e.g., those loaded from a snapshot).
+        Their names are indexed when they're first looked up.
+        
+        """
+        for obj in objects:
+            obj.symbol_table = self
+        self.objects.update(objects)
+        self._object_names.add_later(objects)
+        for table in subtables:
+            table.symbol_table = self
+        self.subtables.update(subtables)
+        self._subtable_names.add_later(subtables)
+        self._mark_as_changed()
+    
+    def _index_names(self):
+        """Index the names of the objects and sub-tables in this table again."""
+        self._object_names = _NameIndex()
+        for obj in self.objects:
+            self._object_names.add(obj)
+        self._subtable_names = _NameIndex()
+        for table in self.subtables:
+            self._subtable_names.add(table)
+    
+    def _check_names(self):
+        """
+        Make sure there's no name clash among the objects and sub-tables in
+        this table.
+        
+        :raise booleano.exc.ScopeError: If a name clash in found.
+        
+        """
+        object_clashes = dict(self._object_names.get_clashes())
+        table_clashes = dict(self._subtable_names.get_clashes())
+        
+        # <--- Checking that there's no name clash among the global names
+        if None in object_clashes:
+            raise ScopeError("Two or more objects in %s share the same global "
+                             "name" % self)
+        if None in table_clashes:
+            raise ScopeError("Two or more sub-tables in %s share the same "
+                             "global name" % self)
+        
+        # <--- Checking that there's no name clash among the localized names
+        if object_clashes:
+            (locale, name) = object_clashes.popitem()
+            raise ScopeError('The name "%s" is shared by two or more '
+                             'bindings in %s (locale: %s)' %
+                             (name, self, locale))
+        if table_clashes:
+            (locale, name) = table_clashes.popitem()
+            raise ScopeError('The name "%s" is shared by two or more '
+                             'sub-tables in %s (locale: %s)' %
+                             (name, self, locale))
+    
+    def _mark_as_changed(self, removed_object=None):
+        """
+        Increase the version of this symbol table and its ancestors, and
+        discard their cached namespaces.
+        
+        :param removed_object: The object just removed from this table, if
+            any.
+        :type removed_object: :class:`Bind`
+        
+        The observers of these tables are notified of the ``removed_object``,
+        along with the sub-tables under their tables that lead to the object.
+        
+        """
+        subtables = []
+        table = self
+        while table is not None:
+            table.version += 1
+            table._namespaces.clear()
+            if removed_object is not None:
+                for observer in list(table._observers):
+                    observer._forget_object(subtables, removed_object)
+            subtables = [table] + subtables
+            table = table.symbol_table
+    
     def _get_ancestors_global_names(self):
         """
         Return the global names for the ancestors **and** the current
@@ -475,6 +625,9 @@ class Namespace(object):
     
     A symbol table has one namespace per locale.
     
+    Namespaces must not be changed once objects have been retrieved from them,
+    because the objects are indexed by their full path at that moment.
+    
     """
     
     def __init__(self, objects, subnamespaces={}):
@@ -488,6 +641,7 @@ class Namespace(object):
         """
         self.objects = objects
         self.subnamespaces = subnamespaces
+        self._objects_by_path = None
     
     def get_object(self, object_name, namespace_parts=None):
         """
@@ -507,33 +661,314 @@ class Namespace(object):
             exist.
         
         """
-        ns = self._get_subnamespace(namespace_parts)
-        if ns is None or object_name not in ns.objects:
+        if namespace_parts:
+            path = tuple(namespace_parts) + (object_name, )
+        else:
+            path = (object_name, )
+        
+        try:
+            return self._get_object_by_path(path)
+        except KeyError:
             msg = u'No such object "%s"' % object_name
             if namespace_parts:
                 msg = u'%s in %s' % (msg, u":".join(namespace_parts))
             raise ScopeError(msg)
-        return ns.objects[object_name]
     
-    def _get_subnamespace(self, namespace_parts):
+    def _get_object_by_path(self, path):
         """
-        Return the sub-namespace represented by the names in
-        ``namespace_parts``.
+        Return the object whose full path is ``path``.
         
-        :param namespace_parts: The names that resolve a sub-namespace in this
-            namespace.
-        :type namespace_parts: list
-        :return: The namespace represented by the names in 
-            ``namespace_parts`` or ``None`` if it's not found.
-        :rtype: Namespace
-        
-        """
-        if not namespace_parts:
-            return self
-        current_part = namespace_parts.pop(0)
-        if current_part not in self.subnamespaces:
-            return None
-        # It's been found!
-        subnamespace = self.subnamespaces[current_part]
-        return subnamespace._get_subnamespace(namespace_parts)
+        :param path: The names of the namespaces of the object, followed by
+            its own name.
+        :type path: tuple
+        :raises KeyError: If there's no such object.
+        
+        """
+        if self._objects_by_path is None:
+            self._objects_by_path = self._index_objects()
+        return self._objects_by_path[path]
+    
+    def _index_objects(self):
+        """
+        Return all the objects under this namespace, including those in its
+        sub-namespaces.
+        
+        :return: The objects, in a dictionary whose keys are their paths:
+            The names of their namespaces followed by their own names.
+        :rtype: dict
+        
+        """
+        objects_by_path = {}
+        pending_namespaces = [((), self)]
+        while pending_namespaces:
+            (namespace_path, namespace) = pending_namespaces.pop()
+            for (object_name, obj) in namespace.objects.items():
+                objects_by_path[namespace_path + (object_name, )] = obj
+            for (name, subnamespace) in namespace.subnamespaces.items():
+                subnamespace_path = namespace_path + (name, )
+                pending_namespaces.append((subnamespace_path, subnamespace))
+        return objects_by_path
+
+
+class LazyNamespace(Namespace):
+    """
+    The namespace for a symbol table in a given locale, whose objects are
+    resolved on demand.
+    
+    The objects requested are looked up in the names indexed by the symbol
+    table and its sub-tables, and cached, so the memory used depends on the
+    identifiers used instead of the size of the table.
+    
+    The :attr:`objects` and :attr:`subnamespaces` are only extracted if
+    requested.
+    
+    """
+    
+    def __init__(self, symbol_table, locale=None):
+        """
+        
+        :param symbol_table: The symbol table whose objects are to be
+            resolved.
+        :type symbol_table: :class:`SymbolTable`
+        :param locale: The locale of the namespace; if ``None``, the global
+            names will be used instead.
+        :type locale: basestring
+        
+        """
+        self._symbol_table = symbol_table
+        self._locale = locale or None
+        self._objects = None
+        self._subnamespaces = None
+        self._objects_by_path = {}
+    
+    @property
+    def objects(self):
+        """The objects that belong to the table, by their names."""
+        if self._objects is None:
+            self._objects = self._symbol_table._get_objects(self._locale)
+        return self._objects
+    
+    @property
+    def subnamespaces(self):
+        """The namespaces of the sub-tables, by their names."""
+        if self._subnamespaces is None:
+            self._subnamespaces = \
+                self._symbol_table._get_subnamespaces(self._locale)
+        return self._subnamespaces
+    
+    def _get_object_by_path(self, path):
+        """
+        Return the object whose full path is ``path``, resolving it in the
+        symbol table if it hasn't been requested yet.
+        
+        :param path: The names of the namespaces of the object, followed by
+            its own name.
+        :type path: tuple
+        :raises KeyError: If there's no such object.
+        
+        """
+        if path in self._objects_by_path:
+            return self._objects_by_path[path]
+        
+        obj = self._symbol_table._resolve_path(self._locale, path)[-1]
+        contents = obj._get_contents(self._locale)
+        self._objects_by_path[path] = contents
+        return contents
+
+
+#{ Internal stuff
+
+
+class _NameIndex(object):
+    """
+    Index of the names of the objects, or the sub-tables, in a symbol table.
+    
+    An identifier without a name in a locale takes its global name there, so
+    the identifiers called the same in a locale are those with such a
+    localized name plus those with such a global name and no name in the
+    locale.
+    
+    The names which may clash are recorded as the identifiers are added, in
+    constant time for each locale.
+    
+    """
+    
+    def __init__(self):
+        # The identifiers by their global names:
+        self.global_names = {}
+        # The identifiers by their localized names, by locale:
+        self.localized_names = {}
+        # The names which may clash, made up of the locale (``None`` for the
+        # global names) and the name:
+        self.possible_clashes = set()
+        # The identifiers to be indexed when the index is used:
+        self._pending_identifiers = []
+    
+    def add(self, identifier):
+        """
+        Index the names of ``identifier`` and record those which may clash.
+        
+        :param identifier: The object or sub-table to be indexed.
+        :type identifier: :class:`_Identifier`
+        
+        """
+        self._index_pending_identifiers()
+        global_name = identifier.global_name
+        if global_name in self.global_names:
+            self.possible_clashes.add((None, global_name))
+        locales = set(self.localized_names) | set(identifier.names)
+        for locale in locales:
+            name = identifier.names.get(locale, global_name)
+            if self._is_used(locale, name):
+                self.possible_clashes.add((locale, name))
+        
+        self._index(identifier)
+    
+    def add_later(self, identifiers):
+        """
+        Index the names of the ``identifiers``, which are known not to clash,
+        the first time the index is used.
+        
+        :param identifiers: The objects or sub-tables to be indexed.
+        :type identifiers: list
+        
+        """
+        self._pending_identifiers.extend(identifiers)
+    
+    def _index(self, identifier):
+        """Index the names of ``identifier``."""
+        _add_identifier(self.global_names, identifier.global_name, identifier)
+        for (locale, name) in identifier.names.items():
+            localized_names = self.localized_names.setdefault(locale, {})
+            _add_identifier(localized_names, name, identifier)
+    
+    def remove(self, identifier):
+        """
+        Remove the names of ``identifier`` from the index.
+        
+        :param identifier: The object or sub-table to be removed.
+        :type identifier: :class:`_Identifier`
+        
+        """
+        self._index_pending_identifiers()
+        _remove_identifier(self.global_names, identifier.global_name,
+                           identifier)
+        for (locale, name) in identifier.names.items():
+            _remove_identifier(self.localized_names[locale], name, identifier)
+            if not self.localized_names[locale]:
+                del self.localized_names[locale]
+    
+    def get_identifier(self, locale, name):
+        """
+        Return the identifier called ``name`` in ``locale``.
+        
+        :param locale: The locale of the name, or ``None`` for the global
+            names.
+        :type locale: basestring
+        :param name: The name of the identifier.
+        :type name: basestring
+        :return: The identifier, or ``None`` if there's no such identifier.
+        :rtype: :class:`_Identifier`
+        
+        If the name clashes, any of the identifiers is returned.
+        
+        """
+        identifiers = self.get_identifiers(locale, name)
+        if identifiers:
+            return identifiers[0]
+        return None
+    
+    def get_identifiers(self, locale, name):
+        """
+        Return the identifiers called ``name`` in ``locale``.
+        
+        :param locale: The locale of the name, or ``None`` for the global
+            names.
+        :type locale: basestring
+        :param name: The name in question.
+        :type name: basestring
+        :rtype: list
+        
+        """
+        self._index_pending_identifiers()
+        identifiers = _get_identifiers(self.global_names, name)
+        if locale is not None:
+            identifiers = [identifier for identifier in identifiers
+                           if locale not in identifier.names]
+            if locale in self.localized_names:
+                localized_names = self.localized_names[locale]
+                identifiers = (_get_identifiers(localized_names, name) +
+                               identifiers)
+        return identifiers
+    
+    def _index_pending_identifiers(self):
+        """Index the identifiers whose indexing was deferred, if any."""
+        if self._pending_identifiers:
+            pending_identifiers = self._pending_identifiers
+            self._pending_identifiers = []
+            for identifier in pending_identifiers:
+                self._index(identifier)
+    
+    def _is_used(self, locale, name):
+        """Check whether any identifier is called ``name`` in ``locale``."""
+        localized_names = self.localized_names.get(locale)
+        if localized_names and name in localized_names:
+            return True
+        if name not in self.global_names:
+            return False
+        return bool(self.get_identifiers(locale, name))
+    
+    def get_clashes(self):
+        """
+        Return the names shared by two or more identifiers.
+        
+        :return: The locales (``None`` for the global names) and names which
+            clash.
+        :rtype: set
+        
+        The names which no longer clash are forgotten.
+        
+        """
+        self._index_pending_identifiers()
+        for (locale, name) in list(self.possible_clashes):
+            if len(self.get_identifiers(locale, name)) < 2:
+                self.possible_clashes.remove((locale, name))
+        return set(self.possible_clashes)
+
+
+# The identifiers are indexed by name on their own, and only those which share
+# their names are put in lists, to save memory in large symbol tables.
+
+
+def _add_identifier(identifiers_by_name, name, identifier):
+    """Index ``identifier`` under ``name`` in ``identifiers_by_name``."""
+    if name not in identifiers_by_name:
+        identifiers_by_name[name] = identifier
+    elif isinstance(identifiers_by_name[name], list):
+        identifiers_by_name[name].append(identifier)
+    else:
+        identifiers_by_name[name] = [identifiers_by_name[name], identifier]
+
+
+def _remove_identifier(identifiers_by_name, name, identifier):
+    """Remove ``identifier`` from ``name`` in ``identifiers_by_name``."""
+    identifiers = _get_identifiers(identifiers_by_name, name)
+    identifiers = [indexed_identifier for indexed_identifier in identifiers
+                   if indexed_identifier is not identifier]
+    if not identifiers:
+        del identifiers_by_name[name]
+    elif len(identifiers) == 1:
+        identifiers_by_name[name] = identifiers[0]
+    else:
+        identifiers_by_name[name] = identifiers
+
+
+def _get_identifiers(identifiers_by_name, name):
+    """Return the identifiers under ``name`` in ``identifiers_by_name``."""
+    identifiers = identifiers_by_name.get(name, [])
+    if not isinstance(identifiers, list):
+        identifiers = [identifiers]
+    return identifiers
+
 
+#}
@@ -0,0 +1,507 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2009-2010 by Gustavo Narea <http://gustavonarea.net/>.
+#
+# This file is part of Booleano <http://booleano.efous.org/>.
+#
+# This program is Freedomware: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+Snapshots of symbol tables, to load them without building them again.
+
+A :class:`SymbolTableSnapshot` stores the structure of a symbol table and the
+names of its bindings and sub-tables in a few flat arrays, which can be
+serialized as raw bytes and loaded back without copying them (e.g., from a
+memory mapped file).
+
+"""
+
+from array import array
+import gc
+from mmap import mmap, ACCESS_READ
+from struct import Struct, error as StructError
+import sys
+
+from booleano.nodes.compact import (_PackedArray, _PackedStrings,
+    _add_to_pool, _pack_column, _get_padded_size, _pad)
+from booleano.nodes.constants import String, Number
+from booleano.parser.scope import Bind, SymbolTable
+
+
+__all__ = ["SymbolTableSnapshot"]
+
+
+#{ Kinds of operands
+
+# These values are part of the serialization format, so they must never
+# change.
+
+_OPAQUE = 0
+_CLASS = 1
+_INSTANCE = 2
+_STRING = 3
+_NUMBER = 4
+
+#}
+
+
+class SymbolTableSnapshot(object):
+    """
+    Frozen representation of a symbol table, stored in flat arrays.
+    
+    The tables are stored so that each one comes after its parent, and the
+    bindings refer to the table they belong to. The names are stored in a
+    pool of strings.
+    
+    The operands are stored as follows:
+    
+    - Classes (e.g., functions) are stored as references to be imported.
+    - Instances of stateless classes (see
+      :attr:`booleano.nodes.OperationNode.is_stateless`) are stored as
+      references to their class, which is imported and instantiated without
+      arguments.
+    - Built-in string and number constants are stored by value.
+    - The rest of the operands are *opaque*: They are kept in the operand
+      table as is, so they can't be serialized; when a snapshot is loaded,
+      the same operands must be passed in the same order (see
+      :attr:`operands`).
+    
+    """
+    
+    def __init__(self, table_parents, table_global_names, table_name_offsets,
+                 binding_tables, binding_global_names, binding_name_offsets,
+                 binding_kinds, binding_operands, name_locales, name_values,
+                 numbers, strings, operands):
+        """
+        
+        Use :meth:`from_symbol_table` or :meth:`from_bytes` instead.
+        
+        """
+        self._table_parents = table_parents
+        self._table_global_names = table_global_names
+        self._table_name_offsets = table_name_offsets
+        self._binding_tables = binding_tables
+        self._binding_global_names = binding_global_names
+        self._binding_name_offsets = binding_name_offsets
+        self._binding_kinds = binding_kinds
+        self._binding_operands = binding_operands
+        self._name_locales = name_locales
+        self._name_values = name_values
+        self._numbers = numbers
+        self._strings = strings
+        self.operands = tuple(operands)
+        """The opaque operands bound in the symbol table, in order."""
+    
+    @classmethod
+    def from_symbol_table(cls, symbol_table):
+        """
+        Take a snapshot of ``symbol_table``.
+        
+        :param symbol_table: The symbol table, which should be valid (see
+            :meth:`booleano.parser.SymbolTable.validate_scope`).
+        :type symbol_table: :class:`booleano.parser.SymbolTable`
+        :rtype: :class:`SymbolTableSnapshot`
+        
+        """
+        builder = _SnapshotBuilder()
+        builder.add_symbol_table(symbol_table)
+        snapshot = cls(builder.table_parents, builder.table_global_names,
+                       builder.table_name_offsets, builder.binding_tables,
+                       builder.binding_global_names,
+                       builder.binding_name_offsets, builder.binding_kinds,
+                       builder.binding_operands, builder.name_locales,
+                       builder.name_values, builder.numbers, builder.strings,
+                       builder.operands)
+        return snapshot
+    
+    @property
+    def table_count(self):
+        """
+        Return the amount of symbol tables stored, including the root one.
+        
+        :rtype: int
+        
+        """
+        return len(self._table_parents)
+    
+    @property
+    def binding_count(self):
+        """
+        Return the amount of bindings stored.
+        
+        :rtype: int
+        
+        """
+        return len(self._binding_tables)
+    
+    def make_symbol_table(self):
+        """
+        Build the symbol table stored.
+        
+        :return: A new symbol table, equivalent to the original one.
+        :rtype: :class:`booleano.parser.SymbolTable`
+        :raises ImportError: If an operand can't be imported.
+        
+        The bindings and sub-tables are added to the tables without checking
+        them, and the scope doesn't have to be validated again.
+        
+        """
+        # Hundreds of thousands of objects are created below and none of them
+        # is garbage, so the cyclic garbage collector would only slow it down:
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            return self._make_symbol_table()
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+    
+    def _make_symbol_table(self):
+        """Build the symbol table stored, with the garbage collector off."""
+        # Each column is read at once, instead of one value at a time. The
+        # locales are used as keyword arguments, so they must be byte strings:
+        strings = _read_column(self._strings)
+        name_locales = [str(strings[index]) for index in
+                        _read_column(self._name_locales)]
+        name_values = [strings[index] for index in
+                       _read_column(self._name_values)]
+        
+        tables = []
+        table_global_names = _read_column(self._table_global_names)
+        table_name_offsets = _read_column(self._table_name_offsets)
+        for (index, global_name_index) in enumerate(table_global_names):
+            names = _get_names(name_locales, name_values, table_name_offsets,
+                               index)
+            tables.append(SymbolTable(strings[global_name_index], (),
+                                      **names))
+        
+        objects_by_table = [[] for table in tables]
+        binding_tables = _read_column(self._binding_tables)
+        binding_global_names = _read_column(self._binding_global_names)
+        binding_name_offsets = _read_column(self._binding_name_offsets)
+        operands = self._get_operands(strings)
+        for index in xrange(len(binding_tables)):
+            global_name = strings[binding_global_names[index]]
+            names = _get_names(name_locales, name_values,
+                               binding_name_offsets, index)
+            obj = Bind(global_name, operands[index], **names)
+            objects_by_table[binding_tables[index]].append(obj)
+        
+        subtables_by_table = [[] for table in tables]
+        table_parents = _read_column(self._table_parents)
+        for index in xrange(1, len(tables)):
+            subtables_by_table[table_parents[index]].append(tables[index])
+        
+        # The tables are filled from the last one, so each sub-table is
+        # complete by the time it's added to its parent:
+        for index in reversed(xrange(len(tables))):
+            tables[index]._add_trusted_contents(objects_by_table[index],
+                                                subtables_by_table[index])
+        return tables[0]
+    
+    def _get_operands(self, strings):
+        """
+        Return the operands of the bindings, using the pool of ``strings``.
+        
+        :raises ImportError: If an operand can't be imported.
+        
+        """
+        numbers = _read_column(self._numbers)
+        imported_objects = {}
+        operands = []
+        for (kind, value) in zip(_read_column(self._binding_kinds),
+                                 _read_column(self._binding_operands)):
+            if kind == _OPAQUE:
+                operand = self.operands[value]
+            elif kind == _STRING:
+                operand = String(strings[value])
+            elif kind == _NUMBER:
+                operand = Number(numbers[value])
+            else:
+                reference = strings[value]
+                if reference not in imported_objects:
+                    imported_objects[reference] = _import_reference(reference)
+                operand = imported_objects[reference]
+                if kind == _INSTANCE:
+                    operand = operand()
+            operands.append(operand)
+        return operands
+    
+    #{ Serialization
+    
+    def to_bytes(self):
+        """
+        Return the binary representation of the snapshot.
+        
+        :rtype: :class:`str`
+        
+        The operand table is not included.
+        
+        """
+        strings_data = [string.encode("utf-8") for string in self._strings]
+        string_offsets = [0]
+        for string_data in strings_data:
+            string_offsets.append(string_offsets[-1] + len(string_data))
+        strings_data = "".join(strings_data)
+        
+        header = _HEADER.pack(_MAGIC, _VERSION, len(self._table_parents),
+                              len(self._binding_tables),
+                              len(self._name_locales), len(self._numbers),
+                              len(self._strings), len(strings_data),
+                              len(self.operands))
+        sections = [
+            header,
+            _pack_column(self._table_parents, "i"),
+            _pack_column(self._table_global_names, "I"),
+            _pack_column(self._table_name_offsets, "I"),
+            _pack_column(self._binding_tables, "I"),
+            _pack_column(self._binding_global_names, "I"),
+            _pack_column(self._binding_name_offsets, "I"),
+            _pack_column(self._binding_kinds, "B"),
+            _pack_column(self._binding_operands, "i"),
+            _pack_column(self._name_locales, "I"),
+            _pack_column(self._name_values, "I"),
+            _pack_column(self._numbers, "d"),
+            _pack_column(string_offsets, "I"),
+            strings_data,
+            ]
+        return "".join(_pad(section) for section in sections)
+    
+    @classmethod
+    def from_bytes(cls, buffer_, operands=()):
+        """
+        Load the snapshot represented by ``buffer_``, without copying it.
+        
+        :param buffer_: The binary representation of the snapshot, as
+            returned by :meth:`to_bytes`.
+        :type buffer_: :class:`str`, :class:`mmap.mmap` or any other object
+            which supports the buffer interface
+        :param operands: The opaque operands bound in the symbol table, in the
+            same order as in the original snapshot.
+        :type operands: iterable
+        :rtype: :class:`SymbolTableSnapshot`
+        :raises ValueError: If ``buffer_`` doesn't represent a snapshot, or
+            the amount of ``operands`` is wrong.
+        
+        The values are read from ``buffer_`` when they are needed, so it
+        must remain open while the snapshot is used.
+        
+        """
+        try:
+            (magic, version, table_count, binding_count, name_count,
+             number_count, string_count, strings_size,
+             operand_count) = _HEADER.unpack_from(buffer_, 0)
+        except StructError:
+            raise ValueError("The buffer is too short to contain a snapshot")
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError("The buffer doesn't contain a snapshot")
+        operands = tuple(operands)
+        if len(operands) != operand_count:
+            raise ValueError("The snapshot requires %s operands, but %s were "
+                             "passed" % (operand_count, len(operands)))
+        
+        offset = _get_padded_size(_HEADER.size)
+        columns = []
+        for (typecode, length) in (("i", table_count), ("I", table_count),
+                                   ("I", table_count + 1),
+                                   ("I", binding_count), ("I", binding_count),
+                                   ("I", binding_count + 1),
+                                   ("B", binding_count), ("i", binding_count),
+                                   ("I", name_count), ("I", name_count),
+                                   ("d", number_count),
+                                   ("I", string_count + 1)):
+            column = _PackedArray(buffer_, offset, length, typecode)
+            columns.append(column)
+            offset += _get_padded_size(length * column.itemsize)
+        if offset + strings_size > len(buffer_):
+            raise ValueError("The buffer is too short to contain the snapshot")
+        
+        string_offsets = columns.pop()
+        strings = _PackedStrings(buffer_, offset, string_offsets)
+        snapshot = cls(*(columns + [strings, operands]))
+        return snapshot
+    
+    @classmethod
+    def from_file(cls, file_, operands=()):
+        """
+        Load the snapshot stored in ``file_`` by mapping it into memory.
+        
+        :param file_: The file which contains the binary representation of
+            the snapshot, opened for reading.
+        :type file_: :class:`file`
+        :param operands: The opaque operands bound in the symbol table, in the
+            same order as in the original snapshot.
+        :type operands: iterable
+        :rtype: :class:`SymbolTableSnapshot`
+        
+        """
+        buffer_ = mmap(file_.fileno(), 0, access=ACCESS_READ)
+        return cls.from_bytes(buffer_, operands)
+    
+    #}
+
+
+#{ Internal stuff
+
+
+_MAGIC = "BLNS"
+
+_VERSION = 1
+
+_HEADER = Struct("<4sB3xIIIIIII")
+
+
+class _SnapshotBuilder(object):
+    """
+    Flattener of symbol tables into the arrays of a
+    :class:`SymbolTableSnapshot`.
+    
+    """
+    
+    def __init__(self):
+        self.table_parents = array("i")
+        self.table_global_names = array("I")
+        self.table_name_offsets = array("I", [0])
+        self.binding_tables = array("I")
+        self.binding_global_names = array("I")
+        self.binding_name_offsets = array("I", [0])
+        self.binding_kinds = array("B")
+        self.binding_operands = array("i")
+        self.name_locales = array("I")
+        self.name_values = array("I")
+        self.numbers = array("d")
+        self.strings = []
+        self.operands = []
+        # The positions of the numbers, strings and operands already added,
+        # to store them once:
+        self._number_indexes = {}
+        self._string_indexes = {}
+        self._operand_indexes = {}
+    
+    def add_symbol_table(self, symbol_table):
+        """
+        Add ``symbol_table`` and its sub-tables, each one after its parent,
+        and then their bindings.
+        
+        The bindings and sub-tables are sorted by their global names, so the
+        same symbol table always results in the same snapshot.
+        
+        """
+        tables = []
+        pending_tables = [(symbol_table, -1)]
+        while pending_tables:
+            (table, parent_index) = pending_tables.pop()
+            table_index = len(tables)
+            tables.append(table)
+            self.table_parents.append(parent_index)
+            self.table_global_names.append(self.add_string(table.global_name))
+            self.add_names(table.names, self.table_name_offsets)
+            for subtable in reversed(_sort_identifiers(table.subtables)):
+                pending_tables.append((subtable, table_index))
+        
+        # The names of the bindings come after those of the tables:
+        self.binding_name_offsets[0] = len(self.name_locales)
+        for (table_index, table) in enumerate(tables):
+            for obj in _sort_identifiers(table.objects):
+                self.add_binding(obj, table_index)
+    
+    def add_binding(self, obj, table_index):
+        """Add the binding ``obj`` to the table at ``table_index``."""
+        self.binding_tables.append(table_index)
+        self.binding_global_names.append(self.add_string(obj.global_name))
+        self.add_names(obj.names, self.binding_name_offsets)
+        (kind, value) = self.add_operand(obj.operand)
+        self.binding_kinds.append(kind)
+        self.binding_operands.append(value)
+    
+    def add_names(self, names, name_offsets):
+        """Add the localized ``names`` and the end of their range."""
+        for locale in sorted(names):
+            self.name_locales.append(self.add_string(locale))
+            self.name_values.append(self.add_string(names[locale]))
+        name_offsets.append(len(self.name_locales))
+    
+    def add_operand(self, operand):
+        """Add ``operand`` and return its kind along with its position."""
+        if isinstance(operand, type):
+            reference = _get_reference(operand)
+            if reference:
+                return (_CLASS, self.add_string(reference))
+        elif operand.__class__ is String:
+            return (_STRING, self.add_string(operand._constant_value))
+        elif operand.__class__ is Number:
+            value = operand._constant_value
+            return (_NUMBER, _add_to_pool(value, value, self.numbers,
+                                          self._number_indexes))
+        else:
+            reference = _get_reference(operand.__class__)
+            if reference and getattr(operand, "is_stateless", False):
+                return (_INSTANCE, self.add_string(reference))
+        
+        operand_index = _add_to_pool(id(operand), operand, self.operands,
+                                     self._operand_indexes)
+        return (_OPAQUE, operand_index)
+    
+    def add_string(self, string):
+        """Add ``string`` to the pool if needed, and return its index."""
+        string = unicode(string)
+        return _add_to_pool(string, string, self.strings,
+                            self._string_indexes)
+
+
+def _read_column(column):
+    """Return all the values in ``column`` at once, in a list."""
+    if isinstance(column, list):
+        return column
+    return column.tolist()
+
+
+def _get_names(name_locales, name_values, name_offsets, index):
+    """
+    Return the localized names of the item at ``index``, whose names are in
+    the range given by ``name_offsets``.
+    
+    """
+    start = name_offsets[index]
+    end = name_offsets[index + 1]
+    return dict(zip(name_locales[start:end], name_values[start:end]))
+
+
+def _sort_identifiers(identifiers):
+    """Return the ``identifiers`` sorted by their global names."""
+    return sorted(identifiers, key=lambda identifier: identifier.global_name)
+
+
+def _get_reference(class_):
+    """
+    Return the reference to import ``class_``, or ``None`` if it can't be
+    imported by its name.
+    
+    """
+    module = sys.modules.get(class_.__module__)
+    if getattr(module, class_.__name__, None) is not class_:
+        return None
+    return "%s:%s" % (class_.__module__, class_.__name__)
+
+
+def _import_reference(reference):
+    """Import the object identified by ``reference``."""
+    (module_name, object_name) = reference.split(":")
+    module = __import__(module_name, fromlist=[object_name])
+    try:
+        return getattr(module, object_name)
+    except AttributeError:
+        raise ImportError("Cannot import name %s from %s" % (object_name,
+                                                             module_name))
+
+
+#}
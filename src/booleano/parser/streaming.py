@@ -0,0 +1,307 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2009-2010 by Gustavo Narea <http://gustavonarea.net/>.
+#
+# This file is part of Booleano <http://booleano.efous.org/>.
+#
+# This program is Freedomware: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+Lazy evaluation of parse trees over streams of contexts.
+
+The contexts are consumed in chunks, so the memory used doesn't depend on the
+size of the stream. The chunks are evaluated by a :class:`StreamEvaluator`
+in the current process, or by a
+:class:`booleano.parser.parallel.ParallelEvaluator` in worker processes.
+
+"""
+
+from itertools import islice, tee
+from time import time
+
+__all__ = ("StreamEvaluator", "StreamStatistics", "filter_contexts",
+           "partition_contexts", "iter_results")
+
+
+DEFAULT_CHUNK_SIZE = 1000
+"""The default amount of contexts evaluated at once."""
+
+
+class StreamEvaluator(object):
+    """
+    Evaluator of a parse tree over streams of contexts, in the current
+    process.
+    
+    The contexts are evaluated one chunk at a time. Subclasses may evaluate
+    the chunks elsewhere by overriding :meth:`iter_chunk_results`; it can be
+    used as a context manager in any case::
+    
+        with StreamEvaluator(tree, chunk_size=500) as evaluator:
+            for result in evaluator.evaluate(contexts):
+                ...
+    
+    """
+    
+    def __init__(self, tree, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        
+        :param tree: The parse tree to be evaluated.
+        :type tree: :class:`booleano.parser.trees.EvaluableParseTree`
+        :param chunk_size: The amount of contexts to be evaluated at once.
+        :type chunk_size: int
+        
+        """
+        self.tree = tree
+        self.chunk_size = chunk_size
+    
+    def evaluate(self, contexts):
+        """
+        Yield the result of the parse tree under each context in
+        ``contexts``.
+        
+        :param contexts: The contexts to be evaluated.
+        :type contexts: iterable
+        :rtype: iterator
+        
+        The results are yielded in the same order as the ``contexts``.
+        
+        """
+        for (context, result) in self.iter_results(contexts):
+            yield result
+    
+    def iter_results(self, contexts, statistics=None):
+        """
+        Yield each context in ``contexts`` along with the result of the parse
+        tree under it.
+        
+        :param contexts: The contexts to be evaluated.
+        :type contexts: iterable
+        :param statistics: The throughput counters to be updated, if any.
+        :type statistics: :class:`StreamStatistics`
+        :return: Pairs made up of the context and the result of the
+            evaluation.
+        :rtype: iterator
+        
+        """
+        chunks = iter_chunks(contexts, self.chunk_size)
+        if statistics is not None and statistics.start_time is None:
+            statistics.start_time = time()
+        for (chunk, results) in self.iter_chunk_results(chunks):
+            if statistics is not None:
+                statistics.evaluated += len(chunk)
+                statistics.matched += results.count(True)
+                statistics.chunks += 1
+            for item in zip(chunk, results):
+                yield item
+        if statistics is not None:
+            statistics.end_time = time()
+    
+    def iter_chunk_results(self, chunks):
+        """
+        Yield each chunk in ``chunks`` along with its results.
+        
+        :param chunks: The lists of contexts to be evaluated.
+        :type chunks: iterable
+        :rtype: iterator
+        
+        """
+        for chunk in chunks:
+            yield (chunk, evaluate_chunk(self.tree, chunk))
+    
+    def close(self):
+        """Release the resources used by this evaluator, if any."""
+        pass
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class StreamStatistics(object):
+    """
+    Throughput counters for the evaluation of a stream of contexts.
+    
+    The counters are updated once per chunk, while the stream is consumed.
+    
+    .. attribute:: evaluated
+    
+        The amount of contexts evaluated so far.
+    
+    .. attribute:: matched
+    
+        The amount of contexts under which the parse tree evaluated to True.
+    
+    .. attribute:: chunks
+    
+        The amount of chunks evaluated so far.
+    
+    """
+    
+    def __init__(self):
+        self.evaluated = 0
+        self.matched = 0
+        self.chunks = 0
+        self.start_time = None
+        self.end_time = None
+    
+    @property
+    def elapsed_time(self):
+        """
+        Return the seconds spent evaluating the stream so far.
+        
+        :rtype: float
+        
+        """
+        if self.start_time is None:
+            return 0.0
+        return (self.end_time or time()) - self.start_time
+    
+    @property
+    def throughput(self):
+        """
+        Return the amount of contexts evaluated per second.
+        
+        :rtype: float
+        
+        """
+        elapsed_time = self.elapsed_time
+        if not elapsed_time:
+            return 0.0
+        return self.evaluated / elapsed_time
+    
+    def __repr__(self):
+        return "<Stream statistics evaluated=%s matched=%s " \
+               "throughput=%.1f/s>" % (self.evaluated, self.matched,
+                                       self.throughput)
+
+
+def filter_contexts(tree, contexts, chunk_size=DEFAULT_CHUNK_SIZE,
+                    processes=None, statistics=None):
+    """
+    Yield the ``contexts`` under which ``tree`` evaluates to True.
+    
+    :param tree: The parse tree to be evaluated.
+    :type tree: :class:`booleano.parser.trees.EvaluableParseTree`
+    :param contexts: The contexts to be filtered.
+    :type contexts: iterable
+    
+    See :func:`iter_results` for the rest of the arguments.
+    
+    """
+    for (context, result) in iter_results(tree, contexts, chunk_size,
+                                          processes, statistics):
+        if result:
+            yield context
+
+
+def partition_contexts(tree, contexts, chunk_size=DEFAULT_CHUNK_SIZE,
+                       processes=None, statistics=None):
+    """
+    Split the ``contexts`` into those under which ``tree`` evaluates to True
+    and those under which it evaluates to False.
+    
+    :param tree: The parse tree to be evaluated.
+    :type tree: :class:`booleano.parser.trees.EvaluableParseTree`
+    :param contexts: The contexts to be partitioned.
+    :type contexts: iterable
+    :return: The iterators for the matching and the non-matching contexts,
+        respectively.
+    :rtype: tuple
+    
+    See :func:`iter_results` for the rest of the arguments.
+    
+    The memory used is constant only if both iterators are consumed in
+    parallel, because the items yielded by one of them are buffered until
+    the other one catches up.
+    
+    """
+    results = iter_results(tree, contexts, chunk_size, processes, statistics)
+    (results1, results2) = tee(results)
+    matches = (context for (context, result) in results1 if result)
+    non_matches = (context for (context, result) in results2 if not result)
+    return (matches, non_matches)
+
+
+def iter_results(tree, contexts, chunk_size=DEFAULT_CHUNK_SIZE, processes=None,
+                 statistics=None):
+    """
+    Yield each context in ``contexts`` along with the result of ``tree`` under
+    it.
+    
+    :param tree: The parse tree to be evaluated.
+    :type tree: :class:`booleano.parser.trees.EvaluableParseTree`
+    :param contexts: The contexts to be evaluated.
+    :type contexts: iterable
+    :param chunk_size: The amount of contexts to be evaluated at once.
+    :type chunk_size: int
+    :param processes: The amount of worker processes to evaluate the chunks,
+        or ``None`` to evaluate them in the current process.
+    :type processes: int
+    :param statistics: The throughput counters to be updated, if any.
+    :type statistics: :class:`StreamStatistics`
+    :return: Pairs made up of the context and the result of the evaluation.
+    :rtype: iterator
+    
+    Worker processes are useful with CPU-bound parse trees. The ``tree`` is
+    sent to each worker once, and the ``contexts`` must be picklable (see
+    :class:`booleano.parser.parallel.ParallelEvaluator`). The results are
+    yielded in the same order as the ``contexts``.
+    
+    To evaluate several streams with the same worker processes, use the
+    evaluator directly instead.
+    
+    """
+    if processes:
+        # Imported here so that multiprocessing is loaded only when needed:
+        from booleano.parser.parallel import ParallelEvaluator
+        evaluator = ParallelEvaluator(tree, processes, chunk_size)
+    else:
+        evaluator = StreamEvaluator(tree, chunk_size)
+    
+    with evaluator:
+        for item in evaluator.iter_results(contexts, statistics):
+            yield item
+
+
+def iter_chunks(contexts, chunk_size):
+    """
+    Yield the ``contexts`` in lists of ``chunk_size`` items at most.
+    
+    :param contexts: The contexts to be split.
+    :type contexts: iterable
+    :param chunk_size: The maximum amount of contexts per chunk.
+    :type chunk_size: int
+    :rtype: iterator
+    
+    """
+    contexts = iter(contexts)
+    while True:
+        chunk = list(islice(contexts, chunk_size))
+        if not chunk:
+            break
+        yield chunk
+
+
+def evaluate_chunk(tree, chunk):
+    """
+    Return the results of ``tree`` under each context in ``chunk``.
+    
+    :param tree: The parse tree to be evaluated.
+    :type tree: :class:`booleano.parser.trees.EvaluableParseTree`
+    :param chunk: The contexts to be evaluated.
+    :type chunk: list
+    :rtype: list
+    
+    """
+    return [bool(tree(context)) for context in chunk]
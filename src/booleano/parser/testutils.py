@@ -89,7 +89,7 @@ class BaseGrammarTest(object):
             # Making a Nose test generator:
             def check():
                 tree = self.parser(expression)
-                expected_node.check_equivalence(tree.root_node)
+                eq_(expected_node, tree.root_node)
             check.description = 'Operation "%s" should yield "%s"' % \
                                 (expression, expected_node)
             
@@ -120,9 +120,11 @@ class BaseGrammarTest(object):
             def check():
                 node = operand_parser(expression, parseAll=True)
                 eq_(1, len(node))
-                expected_operand.check_equivalence(node[0])
-            check.description = ('Single operand "%s" should return %s' %
-                                 (expression, expected_operand))
+                eq_(expected_operand, node[0])
+            # The representation of the nodes is encoded in UTF-8:
+            check.description = (u'Single operand "%s" should return %s' %
+                                 (expression,
+                                  repr(expected_operand).decode("utf-8")))
             
             yield check
     
@@ -27,6 +27,12 @@ Booleano supports two kinds of parse trees:
 
 """
 
+from booleano.exc import InvalidOperationError
+from booleano.nodes.datatypes import BooleanType
+from booleano.parser.profiling import EvaluationProfiler
+from booleano.parser.streaming import (DEFAULT_CHUNK_SIZE, filter_contexts,
+    partition_contexts)
+
 __all__ = ("EvaluableParseTree", "ConvertibleParseTree")
 
 
@@ -76,19 +82,163 @@ class EvaluableParseTree(ParseTree):
             operand that doesn't support logical values.
         
         """
-        root_node.check_logical_support()
+        if not isinstance(root_node, BooleanType):
+            raise InvalidOperationError("%r doesn't support logical values, "
+                                        "so it cannot be evaluated" %
+                                        root_node)
         super(EvaluableParseTree, self).__init__(root_node)
+        self._prefetch_plan = None
     
-    def __call__(self, context):
+    def __call__(self, context, budget=None):
         """
         Check if the parse tree evaluates to True with the context described by
         the ``context``.
         
+        :param budget: The resources the evaluation may use, if limited.
+        :type budget: :class:`booleano.parser.budgets.EvaluationBudget`
         :return: Whether the parse tree evaluates to True.
         :rtype: bool
+        :raises booleano.exc.BudgetExceededError: If the evaluation exceeded
+            the ``budget``.
+        
+        The data required by the nodes in the tree is prefetched first (see
+        :meth:`prefetch`).
+        
+        """
+        if budget is None:
+            self.prefetch(context)
+            return self.root_node(context)
+        return budget.evaluate(self, context)
+    
+    def evaluate_concurrently(self, context, executor):
+        """
+        Check if the parse tree evaluates to True with the ``context``,
+        evaluating independent branches concurrently with ``executor``.
+        
+        :param context: The context against which the tree will be evaluated.
+        :param executor: The executor used to run the branches concurrently;
+            it must implement the :class:`concurrent.futures.Executor`
+            interface.
+        :return: Whether the parse tree evaluates to True.
+        :rtype: bool
+        
+        This is useful when the nodes block on I/O. The short-circuit
+        semantics of the connectives are preserved as far as the result is
+        concerned: Once an operand decides the result, the pending evaluation
+        of the other operand is cancelled. However, an operand which was
+        already running won't be interrupted, so nodes evaluated this way
+        should be free of side effects.
+        
+        """
+        self.prefetch(context)
+        return self.root_node.get_as_boolean_concurrently(context, executor)
+    
+    def evaluate_partially(self, context):
+        """
+        Evaluate the parse tree as far as the partial ``context`` allows.
+        
+        :param context: The context against which the tree will be evaluated,
+            which may lack some of the data required by the tree.
+        :return: Whether the parse tree evaluates to True if the result could
+            be determined; otherwise, the residual parse tree to be evaluated
+            once the missing data is available.
+        :rtype: bool or :class:`EvaluableParseTree`
+        
+        The operands which can be resolved are folded using the truth tables
+        of the logical connectives, so the residual tree only contains the
+        branches that still matter. Nodes must raise a :class:`LookupError`
+        when the data they need is missing in the ``context`` (see
+        :meth:`booleano.nodes.datatypes.BooleanType.get_as_boolean_partially`).
+        
+        Nothing is prefetched, because the ``context`` is known to be
+        incomplete.
+        
+        """
+        result = self.root_node.get_as_boolean_partially(context)
+        if isinstance(result, bool):
+            return result
+        if result is self.root_node:
+            return self
+        return self.__class__(result)
+    
+    def filter(self, contexts, chunk_size=DEFAULT_CHUNK_SIZE, processes=None,
+               statistics=None):
+        """
+        Yield the ``contexts`` under which the parse tree evaluates to True.
+        
+        :param contexts: The contexts to be filtered.
+        :type contexts: iterable
+        :param chunk_size: The amount of contexts to be evaluated at once.
+        :type chunk_size: int
+        :param processes: The amount of worker processes to evaluate the
+            chunks, or ``None`` to evaluate them in the current process.
+        :type processes: int
+        :param statistics: The throughput counters to be updated, if any.
+        :type statistics: :class:`booleano.parser.streaming.StreamStatistics`
+        :rtype: iterator
+        
+        The ``contexts`` are consumed lazily, so the memory used doesn't
+        depend on their amount. See :mod:`booleano.parser.streaming`.
         
         """
-        return self.root_node(context)
+        return filter_contexts(self, contexts, chunk_size, processes,
+                               statistics)
+    
+    def partition(self, contexts, chunk_size=DEFAULT_CHUNK_SIZE, processes=None,
+                  statistics=None):
+        """
+        Split the ``contexts`` into those under which the parse tree evaluates
+        to True and those under which it evaluates to False.
+        
+        :return: The iterators for the matching and the non-matching contexts,
+            respectively.
+        :rtype: tuple
+        
+        The arguments are the same as in :meth:`filter`. Both iterators should
+        be consumed in parallel; otherwise, the items yielded by one of them
+        are buffered until the other one catches up.
+        
+        """
+        return partition_contexts(self, contexts, chunk_size, processes,
+                                  statistics)
+    
+    def profile(self, contexts):
+        """
+        Evaluate the parse tree with each context in ``contexts`` and return
+        the profiler with the statistics of each node.
+        
+        :param contexts: The contexts to be evaluated.
+        :type contexts: iterable
+        :rtype: :class:`booleano.parser.profiling.EvaluationProfiler`
+        
+        An instrumented copy of the parse tree is evaluated, so profiling
+        doesn't affect the regular evaluation of this tree. Use
+        :meth:`EvaluationProfiler.get_report
+        <booleano.parser.profiling.EvaluationProfiler.get_report>` to get the
+        annotated tree.
+        
+        """
+        profiler = EvaluationProfiler(self)
+        for context in contexts:
+            profiler(context)
+        return profiler
+    
+    def prefetch(self, context):
+        """
+        Warm up ``context`` with the data required by all the nodes in the
+        tree.
+        
+        :param context: The context against which the tree will be evaluated.
+        
+        The keys requested by the nodes are grouped by the class that
+        defines their bulk loader, so each loader is called just once (see
+        :meth:`booleano.nodes.OperationNode.prefetch`).
+        
+        """
+        if self._prefetch_plan is None:
+            self._prefetch_plan = _make_prefetch_plan(self.root_node)
+        for (loader_class, keys) in self._prefetch_plan:
+            loader_class.prefetch(context, keys)
     
     def __unicode__(self):
         """Return the Unicode representation for this tree."""
@@ -124,3 +274,62 @@ class ConvertibleParseTree(ParseTree):
     def __repr__(self):
         """Return the representation for this tree."""
         return "<Parse tree (convertible) %s>" % repr(self.root_node)
+
+
+#{ Internal stuff
+
+
+def _make_prefetch_plan(root_node):
+    """
+    Collect the keys to be prefetched by the nodes under ``root_node``.
+    
+    :param root_node: The root of the tree whose nodes should be inspected.
+    :type root_node: :class:`booleano.nodes.OperationNode`
+    :return: Pairs made up of the class that defines the bulk loader and the
+        keys it has to load, without duplicates.
+    :rtype: tuple
+    
+    """
+    keys_by_loader = {}
+    seen_keys_by_loader = {}
+    loaders = []
+    pending_nodes = [root_node]
+    while pending_nodes:
+        node = pending_nodes.pop()
+        pending_nodes.extend(reversed(node.get_children()))
+        
+        node_keys = node.get_prefetch_keys()
+        if not node_keys:
+            continue
+        loader_class = _get_prefetch_loader(node.__class__)
+        if loader_class not in keys_by_loader:
+            keys_by_loader[loader_class] = []
+            seen_keys_by_loader[loader_class] = set()
+            loaders.append(loader_class)
+        loader_keys = keys_by_loader[loader_class]
+        seen_keys = seen_keys_by_loader[loader_class]
+        for key in node_keys:
+            if key not in seen_keys:
+                seen_keys.add(key)
+                loader_keys.append(key)
+    
+    plan = tuple((loader, tuple(keys_by_loader[loader])) for loader in loaders)
+    return plan
+
+
+def _get_prefetch_loader(node_class):
+    """
+    Return the class in the MRO of ``node_class`` which defines the bulk loader
+    used by its instances.
+    
+    This way, all the sub-classes of a class sharing the same loader are
+    prefetched together.
+    
+    """
+    for base_class in node_class.__mro__:
+        if "prefetch" in base_class.__dict__:
+            return base_class
+    return node_class
+
+
+#}
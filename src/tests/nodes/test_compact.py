@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2009-2010 by Gustavo Narea <http://gustavonarea.net/>.
+#
+# This file is part of Booleano <http://booleano.efous.org/>.
+#
+# This program is Freedomware: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+Tests for the compact forests of parse trees.
+
+"""
+
+import os
+from sys import getrecursionlimit
+from tempfile import mkstemp
+
+from nose.tools import eq_, ok_, assert_raises
+
+from booleano.nodes.compact import CompactForest
+from booleano.nodes.constants import String, Number
+from booleano.nodes.interning import NodeInterner
+from booleano.nodes.operations import (Not, And, Or, Xor, LessThan,
+    GreaterThan, LessEqual, GreaterEqual)
+
+from tests.utils.mock_nodes import BoolVar, NumVar, PermissiveFunction
+
+
+class TestCompactForest(object):
+    """Tests for the :class:`CompactForest`."""
+    
+    bool_var = BoolVar()
+    
+    num_var = NumVar()
+    
+    trees = (
+        And(Not(bool_var), LessThan(num_var, Number(3))),
+        Or(bool_var, GreaterEqual(Number(2), num_var)),
+        Xor(bool_var, LessEqual(num_var, Number(2))),
+        GreaterThan(num_var, Number(-1.5)),
+        PermissiveFunction(String(u"carabobeño"), bool_var),
+        )
+    
+    contexts = (
+        {'bool': False, 'num': 1},
+        {'bool': True, 'num': 2},
+        {'bool': True, 'num': 5},
+        )
+    
+    def test_conversion_to_nodes(self):
+        forest = CompactForest.from_nodes(self.trees)
+        eq_(len(forest), len(self.trees))
+        for (tree_index, tree) in enumerate(self.trees):
+            eq_(forest.get_root_node(tree_index), tree)
+    
+    def test_evaluation(self):
+        forest = CompactForest.from_nodes(self.trees)
+        for context in self.contexts:
+            for (tree_index, tree) in enumerate(self.trees):
+                eq_(forest.evaluate(tree_index, context), tree(context))
+    
+    def test_opaque_nodes(self):
+        """Variables and user-defined functions are kept as is."""
+        forest = CompactForest.from_nodes(self.trees)
+        eq_(forest.operands, (self.bool_var, self.num_var, self.trees[-1]))
+        ok_(forest.get_root_node(4) is self.trees[-1])
+    
+    def test_shared_subtrees(self):
+        """The nodes shared by several trees are stored once."""
+        interner = NodeInterner()
+        intern = interner.intern
+        comparison = intern(LessThan(intern(Number(1)), intern(Number(2))))
+        tree1 = intern(Not(comparison))
+        tree2 = intern(And(comparison, self.bool_var))
+        forest = CompactForest.from_nodes((tree1, tree2, tree1))
+        eq_(len(forest), 3)
+        eq_(forest.node_count, 6)
+        root_node1 = forest.get_root_node(0)
+        root_node2 = forest.get_root_node(1)
+        ok_(root_node1.arguments['operand'] is
+            root_node2.arguments['left_operand'])
+        ok_(forest.get_root_node(2) is root_node1)
+    
+    def test_nested_connectives(self):
+        """The results of nested connectives are passed to their parents."""
+        operands = (self.bool_var, Not(self.bool_var))
+        connectives = [Not(operand) for operand in operands]
+        for connective_class in (And, Or, Xor):
+            for left_operand in operands:
+                for right_operand in operands:
+                    connectives.append(connective_class(left_operand,
+                                                        right_operand))
+        trees = [Not(connective) for connective in connectives]
+        for connective_class in (And, Or, Xor):
+            for left_operand in connectives:
+                for right_operand in connectives:
+                    trees.append(connective_class(left_operand,
+                                                  right_operand))
+        
+        forest = CompactForest.from_nodes(trees)
+        for context in ({'bool': True}, {'bool': False}):
+            for (tree_index, tree) in enumerate(trees):
+                eq_(forest.evaluate(tree_index, context), tree(context))
+    
+    def test_deep_trees(self):
+        """
+        Trees nested beyond the recursion limit can be stored, built and
+        evaluated.
+        
+        """
+        depth = getrecursionlimit() + 1
+        node = self.bool_var
+        for index in xrange(depth):
+            node = (Not(node), And(node, self.bool_var),
+                    Or(self.bool_var, node), Xor(node, self.bool_var),
+                    )[index % 4]
+        forest = CompactForest.from_nodes([node])
+        eq_(forest.node_count, depth + 1)
+        
+        for value in (True, False):
+            expected_result = value
+            for index in xrange(depth):
+                expected_result = (not expected_result,
+                                   expected_result and value,
+                                   value or expected_result,
+                                   expected_result ^ value,
+                                   )[index % 4]
+            eq_(forest.evaluate(0, {'bool': value}), expected_result)
+        
+        node = forest.get_root_node(0)
+        for index in reversed(xrange(depth)):
+            ok_(isinstance(node, (Not, And, Or, Xor)[index % 4]))
+            node = node.get_children()[1 if index % 4 == 2 else 0]
+        ok_(node is self.bool_var)
+    
+    def test_serialization(self):
+        forest = CompactForest.from_nodes(self.trees)
+        data = forest.to_bytes()
+        loaded_forest = CompactForest.from_bytes(data, forest.operands)
+        eq_(len(loaded_forest), len(self.trees))
+        eq_(loaded_forest.to_bytes(), data)
+        for context in self.contexts:
+            for (tree_index, tree) in enumerate(self.trees):
+                eq_(loaded_forest.get_root_node(tree_index), tree)
+                eq_(loaded_forest.evaluate(tree_index, context),
+                    tree(context))
+    
+    def test_memory_mapped_file(self):
+        forest = CompactForest.from_nodes(self.trees)
+        (file_descriptor, path) = mkstemp()
+        try:
+            os.write(file_descriptor, forest.to_bytes())
+            os.close(file_descriptor)
+            with open(path, "rb") as file_:
+                loaded_forest = CompactForest.from_file(file_,
+                                                        forest.operands)
+            for (tree_index, tree) in enumerate(self.trees):
+                eq_(loaded_forest.get_root_node(tree_index), tree)
+        finally:
+            os.remove(path)
+    
+    def test_invalid_buffers(self):
+        forest = CompactForest.from_nodes(self.trees)
+        data = forest.to_bytes()
+        assert_raises(ValueError, CompactForest.from_bytes, "", ())
+        assert_raises(ValueError, CompactForest.from_bytes, "X" + data[1:],
+                      forest.operands)
+        assert_raises(ValueError, CompactForest.from_bytes, data[:-8],
+                      forest.operands)
+        # The operands must be passed:
+        assert_raises(ValueError, CompactForest.from_bytes, data, ())
@@ -26,6 +26,8 @@ from booleano.exc import InvalidOperationError
 from booleano.nodes.datatypes import NumberType, SetType, StringType
 from booleano.nodes.constants import Constant, String, Number, Set
 
+from tests.utils.mock_nodes import NumVar
+
 
 #{ Constants
 
@@ -218,6 +220,34 @@ class TestSet(object):
         assert_false(set4 == set3)
         ok_(set4 == set4)
     
+    def test_hash(self):
+        """Equivalent sets have the same hash, regardless of the order."""
+        set1 = Set(String("hi"), Set(Number(3), String("hello")))
+        set2 = Set(Set(String("hello"), Number(3)), String("hi"))
+        eq_(hash(set1), hash(set2))
+        eq_(len(set([set1, set2])), 1)
+    
+    def test_native_values(self):
+        """The Python values of constant members are computed only once."""
+        set_ = Set(Number(3), String("hi"), Set(Number(3)))
+        values = set_.get_as_set(None)
+        eq_(values, frozenset([3.0, u"hi", frozenset([3.0])]))
+        ok_(values is set_.get_as_set({'num': 4}))
+        eq_(set_.to_python(None), values)
+    
+    def test_native_values_with_variables(self):
+        """Variable members are evaluated against each context."""
+        set_ = Set(Number(3), NumVar(), Set(NumVar()))
+        eq_(set_.get_as_set({'num': 4}),
+            frozenset([3.0, 4, frozenset([4])]))
+        eq_(set_.get_as_set({'num': 5}),
+            frozenset([3.0, 5, frozenset([5])]))
+    
+    def test_constant_members_with_variable_set(self):
+        """Sets with variable members are not constant members."""
+        set_ = Set(Number(1), Set(NumVar()))
+        eq_(set_.get_as_set({'num': 4}), frozenset([1.0, frozenset([4])]))
+    
     def test_representation(self):
         set1 = Set(Number(3), Number(5))
         eq_(repr(set1), "<Set <Number 3.0>, <Number 5.0>>")
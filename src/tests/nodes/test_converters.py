@@ -24,8 +24,8 @@ from nose.tools import eq_, assert_raises, raises
 from booleano.nodes.converters import BaseConverter
 from booleano.nodes.operations import (Not, And, Or, Xor, Equal, NotEqual,
     LessThan, GreaterThan, LessEqual, GreaterEqual, BelongsTo, IsSubset)
-from booleano.nodes.constants import (String, Number, Set, PlaceholderVariable,
-    PlaceholderFunction)
+from booleano.nodes.constants import String, Number, Set
+from booleano.nodes.placeholders import PlaceholderVariable, PlaceholderFunction
 from booleano.exc import ConversionError
 
 from tests.utils.mock_converters import AntiConverter
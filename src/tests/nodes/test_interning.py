@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2009-2010 by Gustavo Narea <http://gustavonarea.net/>.
+#
+# This file is part of Booleano <http://booleano.efous.org/>.
+#
+# This program is Freedomware: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+Tests for the interning of nodes.
+
+"""
+
+import gc
+
+from nose.tools import eq_, ok_, assert_false
+
+from booleano.nodes.interning import NodeInterner
+from booleano.nodes.operations import Not, And, Or, LessThan
+from booleano.nodes.constants import String, Number, Set
+
+from tests.utils.mock_nodes import BoolVar, ColumnVar, PermissiveFunction
+
+
+class TestNodeInterner(object):
+    """Tests for the :class:`NodeInterner`."""
+    
+    def test_constants(self):
+        interner = NodeInterner()
+        string = interner.intern(String("active"))
+        ok_(interner.intern(String("active")) is string)
+        ok_(interner.intern(String("inactive")) is not string)
+        number = interner.intern(Number(0))
+        ok_(interner.intern(Number("0")) is number)
+    
+    def test_constants_of_different_types(self):
+        """Constants with the same value but different types are distinct."""
+        interner = NodeInterner()
+        string = interner.intern(String("1.0"))
+        ok_(interner.intern(Number(1)) is not string)
+    
+    def test_function_calls(self):
+        interner = NodeInterner()
+        intern = interner.intern
+        operation = intern(LessThan(intern(Number(1)), intern(Number(2))))
+        same_operation = intern(LessThan(intern(Number(1)),
+                                         intern(Number(2))))
+        ok_(same_operation is operation)
+        ok_(intern(LessThan(intern(Number(2)), intern(Number(1)))) is not
+            operation)
+    
+    def test_commutative_function_calls(self):
+        """The order of the arguments is preserved in commutative functions."""
+        interner = NodeInterner()
+        bool_var = BoolVar()
+        negation = interner.intern(Not(bool_var))
+        conjunction1 = interner.intern(And(bool_var, negation))
+        conjunction2 = interner.intern(And(negation, bool_var))
+        ok_(conjunction1 is not conjunction2)
+        ok_(conjunction2.arguments['left_operand'] is negation)
+    
+    def test_sets(self):
+        interner = NodeInterner()
+        set_ = interner.intern(Set(Number(1), String("a")))
+        ok_(interner.intern(Set(String("a"), Number(1))) is set_)
+        ok_(interner.intern(Set(Number(1))) is not set_)
+    
+    def test_sets_of_variables(self):
+        """
+        Sets with non-constant members are interned by the identity of their
+        members, even if the members are equivalent to other operands.
+        
+        """
+        interner = NodeInterner()
+        height = ColumnVar("height")
+        width = ColumnVar("width")
+        eq_(height, width)
+        heights = interner.intern(Set(height))
+        widths = interner.intern(Set(width))
+        ok_(widths is not heights)
+        eq_(widths.get_as_set({'height': 1, 'width': 2}), set([2]))
+        ok_(interner.intern(Set(height)) is heights)
+    
+    def test_other_nodes(self):
+        """Nodes other than constants and function calls are not interned."""
+        interner = NodeInterner()
+        bool_var = BoolVar()
+        ok_(interner.intern(bool_var) is bool_var)
+        ok_(interner.intern(BoolVar()) is not bool_var)
+        eq_(len(interner), 0)
+    
+    def test_arguments_not_interned(self):
+        """
+        Function calls whose arguments weren't interned are not shared.
+        
+        """
+        interner = NodeInterner()
+        function_call = interner.intern(PermissiveFunction(String("foo")))
+        ok_(interner.intern(PermissiveFunction(String("foo"))) is not
+            function_call)
+    
+    def test_unused_nodes_are_collected(self):
+        interner = NodeInterner()
+        operation = interner.intern(Or(BoolVar(), interner.intern(
+            Not(BoolVar()))))
+        eq_(len(interner), 2)
+        del operation
+        gc.collect()
+        eq_(len(interner), 0)
+        # The node can be interned again:
+        string = interner.intern(String("foo"))
+        ok_(interner.intern(String("foo")) is string)
+        assert_false(interner.intern(String("bar")) is string)
@@ -237,6 +237,32 @@ class TestFunction(object):
         }
         eq_(func.arguments, args)
     
+    def test_arguments_order(self):
+        """
+        The required arguments come first, in the order they are defined,
+        followed by the optional ones.
+        
+        """
+        class OrderedFunction(Function):
+            required_arguments = ("b", "a")
+            optional_arguments = {'d': LeafNode(), 'c': LeafNode()}
+        
+        eq_(OrderedFunction.all_args, ("b", "a", "c", "d"))
+    
+    def test_arguments_view(self):
+        """The arguments are available as a read-only mapping."""
+        func = PermissiveFunction(LeafNode("baz"))
+        eq_(len(func.arguments), 3)
+        eq_(set(func.arguments.keys()), set(("arg0", "oarg0", "oarg1")))
+        eq_(func.arguments['arg0'], LeafNode("baz"))
+        eq_(func.arguments.get("non-existing"), None)
+        eq_(func.get_children(), tuple(func.arguments[arg_name] for arg_name
+                                       in func.all_args))
+        
+        def replace_argument():
+            func.arguments['arg0'] = LeafNode()
+        assert_raises(TypeError, replace_argument)
+    
     @raises(BadCallError)
     def test_constructor_with_few_arguments(self):
         PermissiveFunction()
@@ -275,6 +301,44 @@ class TestFunction(object):
         assert_raises(BadCallError, StronglyTypedFunction, NumVar(), NumVar())
         assert_raises(BadCallError, StronglyTypedFunction, NumVar(), BoolVar())
     
+    def test_validation_plan(self):
+        """The datatypes to be checked are computed when the class is made."""
+        class StronglyTypedFunction(Function):
+            required_arguments = ("arg1", "arg2")
+            optional_arguments = {'oarg': LeafNode()}
+            argument_types = {'arg2': NumberType, 'arg1': BooleanType}
+        
+        class HomogeneousFunction(Function):
+            required_arguments = ("arg1", "arg2")
+            argument_types = BooleanType
+        
+        eq_(StronglyTypedFunction._argument_type_checks,
+            ((0, BooleanType), (1, NumberType)))
+        eq_(StronglyTypedFunction._default_argument_values,
+            (None, None, LeafNode()))
+        eq_(HomogeneousFunction._argument_type_checks,
+            ((0, BooleanType), (1, BooleanType)))
+    
+    def test_trusted_construction(self):
+        """
+        Trusted function calls are equivalent to those made with the
+        constructor, and the datatypes of their arguments are checked too.
+        
+        """
+        class StronglyTypedFunction(Function):
+            required_arguments = ("arg1", "arg2")
+            argument_types = {'arg1': BooleanType, 'arg2': NumberType}
+        
+        func = StronglyTypedFunction._make_trusted(BoolVar(), NumVar())
+        expected_func = StronglyTypedFunction(BoolVar(), NumVar())
+        eq_(func, expected_func)
+        eq_(hash(func), hash(expected_func))
+        assert_raises(BadCallError, StronglyTypedFunction._make_trusted,
+                      NumVar(), NumVar())
+        # The default values are used too:
+        eq_(PermissiveFunction._make_trusted(LeafNode("baz")),
+            PermissiveFunction(LeafNode("baz")))
+    
     def test_homogeneouos_argument_types(self):
         """
         The argument types can be set just once if it's the same for all the
@@ -354,10 +418,41 @@ class TestFunction(object):
         arg3 = LeafNode("bar")
         func = PermissiveFunction(arg1, arg2, arg3)
         
-        args_hash = hash(arg1) + hash(arg2) + hash(arg3)
-        expected_hash = hash(PermissiveFunction) + args_hash
+        expected_hash = hash((PermissiveFunction, (arg1, arg2, arg3)))
         
         eq_(hash(func), expected_hash)
+    
+    def test_hash_argument_order(self):
+        """
+        The order of the arguments changes the hash, unless the function is
+        commutative.
+        
+        """
+        class CommutativeFunction(Function):
+            required_arguments = range(2)
+            argument_types = BooleanType
+            is_commutative = True
+        
+        arg1 = BoolVar()
+        arg2 = TrafficLightVar()
+        ok_(hash(PermissiveFunction(arg1, arg2)) !=
+            hash(PermissiveFunction(arg2, arg1)))
+        eq_(hash(CommutativeFunction(arg1, arg2)),
+            hash(CommutativeFunction(arg2, arg1)))
+    
+    def test_hash_is_cached(self):
+        """The hash of a function call is computed once, on construction."""
+        class CountingNode(LeafNode):
+            hash_calls = 0
+            def __hash__(self):
+                CountingNode.hash_calls += 1
+                return super(CountingNode, self).__hash__()
+        
+        func = PermissiveFunction(PermissiveFunction(CountingNode()))
+        eq_(CountingNode.hash_calls, 1)
+        hash(func)
+        hash(func)
+        eq_(CountingNode.hash_calls, 1)
 
 
 #}
@@ -20,6 +20,9 @@ Tests for the operators.
 
 """
 
+from threading import Event
+
+from concurrent.futures import ThreadPoolExecutor
 from nose.tools import eq_, ok_, assert_false, assert_raises
 
 from booleano.nodes.operations import (Not, And, Or, Xor, Equal,
@@ -30,10 +33,21 @@ from booleano.nodes.datatypes import BooleanType
 from booleano.exc import  InvalidOperationError
 
 from tests.nodes import assert_node_equivalence
+from tests.utils import MockExecutor
 from tests.utils.mock_nodes import (BoolVar, DriversAwaitingGreenLightVar,
     NumVar, PedestriansCrossingRoad, TrafficLightVar)
 
 
+def test_compact_storage():
+    """Built-in nodes don't have a ``__dict__``."""
+    operation = Or(And(BoolVar(), Not(BoolVar())),
+                   LessThan(Number(1), Number(2)))
+    for node in (operation, operation.arguments['left_operand'],
+                 operation.arguments['right_operand'], Number(1),
+                 String("foo")):
+        assert_false(hasattr(node, "__dict__"))
+
+
 class TestNot(object):
     """Tests for the :class:`Not`."""
     
@@ -186,6 +200,271 @@ class TestXor(object):
             )
 
 
+class TestConcurrentEvaluation(object):
+    """Tests for the concurrent evaluation of the logical connectives."""
+    
+    def test_not(self):
+        operation = Not(And(BoolVar(), TrafficLightVar()))
+        executor = MockExecutor()
+        context = dict(bool=True, traffic_light="")
+        ok_(operation.get_as_boolean_concurrently(context, executor))
+    
+    def test_decisive_left_operand(self):
+        """
+        The evaluation of the right-hand operand must be cancelled if the
+        left-hand one decides the result.
+        
+        """
+        left_operand = BoolVar()
+        right_operand = BoolVar()
+        executor = MockExecutor()
+        
+        operation = And(left_operand, right_operand)
+        context = {'bool': False}
+        assert_false(operation.get_as_boolean_concurrently(context, executor))
+        ok_(executor.futures[1].cancelled())
+        assert_false(right_operand.evaluated)
+        
+        operation = Or(left_operand, right_operand)
+        context = {'bool': True}
+        ok_(operation.get_as_boolean_concurrently(context, executor))
+        ok_(executor.futures[3].cancelled())
+        assert_false(right_operand.evaluated)
+    
+    def test_decisive_right_operand(self):
+        """
+        The evaluation of the left-hand operand must be cancelled if the
+        right-hand one decides the result first.
+        
+        """
+        executor = RightFirstExecutor()
+        left_operand = BoolVar()
+        
+        operation = And(left_operand, TrafficLightVar())
+        context = dict(bool=True, traffic_light=None)
+        assert_false(operation.get_as_boolean_concurrently(context, executor))
+        ok_(executor.futures[0].cancelled())
+        assert_false(left_operand.evaluated)
+        
+        operation = Or(left_operand, TrafficLightVar())
+        context = dict(bool=False, traffic_light="red")
+        ok_(operation.get_as_boolean_concurrently(context, executor))
+        ok_(executor.futures[2].cancelled())
+        assert_false(left_operand.evaluated)
+    
+    def test_pending_operands(self):
+        """
+        The operands are evaluated in the current thread if the executor
+        didn't get to them.
+        
+        """
+        right_operand = BoolVar()
+        executor = MockExecutor()
+        operation = And(TrafficLightVar(), right_operand)
+        context = dict(bool=True, traffic_light="red")
+        ok_(operation.get_as_boolean_concurrently(context, executor))
+        ok_(executor.futures[0].cancelled())
+        ok_(executor.futures[1].cancelled())
+        ok_(right_operand.evaluated)
+    
+    def test_running_operands(self):
+        """The results of the running operands are waited for."""
+        class RunningExecutor(MockExecutor):
+            def submit(self, function, *args, **kwargs):
+                future = super(RunningExecutor, self).submit(function, *args,
+                                                             **kwargs)
+                future.run()
+                return future
+        
+        executor = RunningExecutor()
+        operation = Xor(TrafficLightVar(), BoolVar())
+        context = dict(bool=True, traffic_light="red")
+        assert_false(operation.get_as_boolean_concurrently(context, executor))
+        assert_false(executor.futures[0].cancelled())
+        assert_false(executor.futures[1].cancelled())
+    
+    def test_non_connectives(self):
+        """Other nodes are evaluated in the current thread."""
+        executor = MockExecutor()
+        operation = LessThan(NumVar(), Number(3))
+        ok_(operation.get_as_boolean_concurrently({'num': 2}, executor))
+        eq_(executor.futures, [])
+    
+    def test_thread_pool(self):
+        """
+        A slow operand doesn't hold up the result if the other one decides
+        it.
+        
+        """
+        left_operand = BlockingBoolVar()
+        operation = And(left_operand, TrafficLightVar())
+        context = dict(bool=True, traffic_light=None)
+        executor = ThreadPoolExecutor(max_workers=2)
+        try:
+            assert_false(operation.get_as_boolean_concurrently(context,
+                                                               executor))
+            assert_false(left_operand.evaluated)
+        finally:
+            left_operand.release()
+            executor.shutdown()
+    
+    def test_busy_thread_pool(self):
+        """
+        Nested connectives don't deadlock when they outnumber the workers.
+        
+        """
+        operation = Xor(
+            And(Or(BoolVar(), TrafficLightVar()), Not(BoolVar())),
+            Or(And(TrafficLightVar(), BoolVar()), TrafficLightVar()),
+            )
+        context = dict(bool=False, traffic_light="red")
+        executor = ThreadPoolExecutor(max_workers=1)
+        try:
+            assert_false(operation.get_as_boolean_concurrently(context,
+                                                               executor))
+        finally:
+            executor.shutdown()
+    
+    def test_exception_in_current_thread(self):
+        """
+        The pending operands are cancelled if an operand evaluated in the
+        current thread raises an exception.
+        
+        """
+        right_operand = BoolVar()
+        executor = MockExecutor()
+        operation = And(BoolVar(), right_operand)
+        assert_raises(KeyError, operation.get_as_boolean_concurrently, {},
+                      executor)
+        ok_(executor.futures[1].cancelled())
+        assert_false(right_operand.evaluated)
+    
+    def test_exception_in_executor(self):
+        """
+        The pending operands are cancelled if an operand evaluated by the
+        executor raises an exception.
+        
+        """
+        left_operand = BoolVar()
+        executor = RightFirstExecutor()
+        operation = Or(left_operand, BoolVar())
+        assert_raises(KeyError, operation.get_as_boolean_concurrently, {},
+                      executor)
+        ok_(executor.futures[0].cancelled())
+        assert_false(left_operand.evaluated)
+
+
+class RightFirstExecutor(MockExecutor):
+    """
+    Mock executor which only gets to the right-hand operands of the
+    connectives.
+    
+    """
+    
+    def submit(self, function, *args, **kwargs):
+        future = super(RightFirstExecutor, self).submit(function, *args,
+                                                        **kwargs)
+        if len(self.futures) % 2 == 0:
+            future.run()
+        return future
+
+
+class BlockingBoolVar(BoolVar):
+    """Mock ``bool`` variable whose evaluation blocks until it's released."""
+    
+    def __init__(self):
+        self._released = Event()
+        super(BlockingBoolVar, self).__init__()
+    
+    def release(self):
+        self._released.set()
+    
+    def get_as_boolean(self, context):
+        self._released.wait(10)
+        return super(BlockingBoolVar, self).get_as_boolean(context)
+
+
+class TestPartialEvaluation(object):
+    """Tests for the partial evaluation of the logical connectives."""
+    
+    def test_resolved_operand(self):
+        operation = LessThan(NumVar(), Number(3))
+        eq_(operation.get_as_boolean_partially({'num': 2}), True)
+        eq_(operation.get_as_boolean_partially({'num': 4}), False)
+    
+    def test_unresolved_operand(self):
+        """Operands whose data is missing are returned untouched."""
+        operation = LessThan(NumVar(), Number(3))
+        ok_(operation.get_as_boolean_partially({}) is operation)
+    
+    def test_not(self):
+        operation = Not(BoolVar())
+        eq_(operation.get_as_boolean_partially({'bool': True}), False)
+        ok_(operation.get_as_boolean_partially({}) is operation)
+        
+        operation = Not(And(BoolVar(), TrafficLightVar()))
+        residual = operation.get_as_boolean_partially({'bool': True})
+        eq_(residual, Not(TrafficLightVar()))
+    
+    def test_and(self):
+        operation = And(BoolVar(), TrafficLightVar())
+        eq_(operation.get_as_boolean_partially({'bool': False}), False)
+        eq_(operation.get_as_boolean_partially({'traffic_light': ""}), False)
+        eq_(operation.get_as_boolean_partially({'bool': True}),
+            TrafficLightVar())
+        eq_(operation.get_as_boolean_partially({'traffic_light': "red"}),
+            BoolVar())
+        ok_(operation.get_as_boolean_partially({}) is operation)
+    
+    def test_or(self):
+        operation = Or(BoolVar(), TrafficLightVar())
+        eq_(operation.get_as_boolean_partially({'bool': True}), True)
+        eq_(operation.get_as_boolean_partially({'traffic_light': "red"}), True)
+        eq_(operation.get_as_boolean_partially({'bool': False}),
+            TrafficLightVar())
+        eq_(operation.get_as_boolean_partially({'traffic_light': ""}),
+            BoolVar())
+        ok_(operation.get_as_boolean_partially({}) is operation)
+    
+    def test_xor(self):
+        operation = Xor(BoolVar(), TrafficLightVar())
+        context = {'bool': True, 'traffic_light': "red"}
+        eq_(operation.get_as_boolean_partially(context), False)
+        eq_(operation.get_as_boolean_partially({'bool': True}),
+            Not(TrafficLightVar()))
+        eq_(operation.get_as_boolean_partially({'bool': False}),
+            TrafficLightVar())
+        eq_(operation.get_as_boolean_partially({'traffic_light': "red"}),
+            Not(BoolVar()))
+        ok_(operation.get_as_boolean_partially({}) is operation)
+    
+    def test_decisive_left_operand(self):
+        """
+        The right-hand operand isn't evaluated if the left-hand one decides
+        the result.
+        
+        """
+        right_operand = BoolVar()
+        operation = And(TrafficLightVar(), right_operand)
+        context = {'traffic_light': "", 'bool': True}
+        eq_(operation.get_as_boolean_partially(context), False)
+        assert_false(right_operand.evaluated)
+        
+        operation = Or(TrafficLightVar(), right_operand)
+        context = {'traffic_light': "red", 'bool': False}
+        eq_(operation.get_as_boolean_partially(context), True)
+        assert_false(right_operand.evaluated)
+    
+    def test_nested_operations(self):
+        """Only the unresolved branches are kept in the residual node."""
+        operation = Or(
+            And(LessThan(NumVar(), Number(3)), BoolVar()),
+            And(TrafficLightVar(), BoolVar()),
+            )
+        residual = operation.get_as_boolean_partially({'num': 2})
+        eq_(residual, Or(BoolVar(), And(TrafficLightVar(), BoolVar())))
+
+
 class TestEqual(object):
     """Tests for the Equality operator."""
     
@@ -396,6 +675,15 @@ class TestBelongsTo(object):
         set_ = Set(Number(1), Number(3), Number(5), Number(7), Number(11))
         operation = BelongsTo(item, set_)
         ok_(operation(None))
+        # Now with an item which doesn't belong to the set:
+        assert_false(BelongsTo(Number(4), set_)(None))
+    
+    def test_variable_item_and_constant_set(self):
+        """Multi-type items are looked up by their string value."""
+        set_ = Set(*[String(color) for color in TrafficLightVar.valid_colors])
+        operation = BelongsTo(TrafficLightVar(), set_)
+        ok_(operation({'traffic_light': u"amber"}))
+        assert_false(operation({'traffic_light': u"blue"}))
     
     def test_variable_evaluation(self):
         item = NumVar()
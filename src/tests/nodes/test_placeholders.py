@@ -23,6 +23,7 @@ from nose.tools import eq_, ok_, assert_false, assert_raises
 
 from booleano.exc import BadCallError
 from booleano.nodes.constants import String, Number
+from booleano.nodes.operations import And, GreaterThan
 from booleano.nodes.placeholders import PlaceholderVariable, PlaceholderFunction
 
 
@@ -281,3 +282,25 @@ class TestPlaceholderFunction(object):
             'at namespace="a:d">',
             repr(func))
 
+
+class TestPlaceholderArguments(object):
+    """Tests for the calls with placeholder arguments."""
+    
+    def test_placeholder_argument(self):
+        """Placeholders are accepted whatever datatype is expected."""
+        operation = And(PlaceholderVariable("foo"), PlaceholderVariable("bar"))
+        eq_(operation.master_operand, PlaceholderVariable("foo"))
+    
+    def test_mistyped_argument_next_to_placeholder(self):
+        """The arguments next to a placeholder are still checked."""
+        assert_raises(BadCallError, And, PlaceholderVariable("foo"),
+                      String("bar"))
+        assert_raises(BadCallError, And, String("bar"),
+                      PlaceholderVariable("foo"))
+    
+    def test_inequality_with_placeholder(self):
+        """The operands compared with a placeholder are left to converters."""
+        operation = GreaterThan(PlaceholderVariable("today"),
+                                String("2009-07-17"))
+        eq_(operation.slave_operand, String("2009-07-17"))
+        assert_raises(BadCallError, GreaterThan, Number(1), String("bar"))
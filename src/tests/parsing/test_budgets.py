@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2009-2010 by Gustavo Narea <http://gustavonarea.net/>.
+#
+# This file is part of Booleano <http://booleano.efous.org/>.
+#
+# This program is Freedomware: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+Tests for the evaluation budgets.
+
+"""
+
+from time import sleep
+
+from nose.tools import eq_, ok_, assert_false, assert_raises
+
+from booleano.exc import BudgetExceededError
+from booleano.nodes import Function
+from booleano.nodes.constants import Number, Set
+from booleano.nodes.datatypes import BooleanType
+from booleano.nodes.operations import And, Or, Not, BelongsTo
+from booleano.parser.budgets import EvaluationBudget
+from booleano.parser.trees import EvaluableParseTree
+
+from tests.utils.mock_nodes import (BoolVar, NumVar, TrafficLightVar,
+    StoredBoolVar, MockKeyValueStore)
+
+
+class SlowFunction(Function, BooleanType):
+    """Mock function which takes a while to be evaluated."""
+    
+    def get_as_boolean(self, context):
+        sleep(0.01)
+        return True
+
+
+class SlowStoredBoolVar(StoredBoolVar):
+    """Mock stored variable which takes a while to be prefetched."""
+    
+    @classmethod
+    def prefetch(cls, context, keys):
+        sleep(0.01)
+        super(SlowStoredBoolVar, cls).prefetch(context, keys)
+
+
+class TestEvaluationBudget(object):
+    """Tests for the :class:`EvaluationBudget`."""
+    
+    def test_unlimited_budget(self):
+        budget = EvaluationBudget()
+        tree = EvaluableParseTree(And(BoolVar(), Not(TrafficLightVar())))
+        ok_(tree({'bool': True, 'traffic_light': ""}, budget))
+    
+    def test_max_visits(self):
+        # The conjunction, its operands and the operand of the negation are
+        # visited:
+        tree = EvaluableParseTree(And(BoolVar(), Not(TrafficLightVar())))
+        context = {'bool': True, 'traffic_light': ""}
+        ok_(tree(context, EvaluationBudget(max_visits=4)))
+        assert_raises(BudgetExceededError, tree, context,
+                      EvaluationBudget(max_visits=3))
+    
+    def test_short_circuit_visits(self):
+        """Nodes skipped by short-circuit evaluation are not visited."""
+        tree = EvaluableParseTree(Or(BoolVar(), Not(TrafficLightVar())))
+        ok_(tree({'bool': True}, EvaluationBudget(max_visits=2)))
+    
+    def test_timeout(self):
+        tree = EvaluableParseTree(And(SlowFunction(), SlowFunction()))
+        ok_(tree(None, EvaluationBudget(timeout=10)))
+        assert_raises(BudgetExceededError, tree, None,
+                      EvaluationBudget(timeout=0.005))
+    
+    def test_reusable_budget(self):
+        """Budgets are enforced for each evaluation independently."""
+        budget = EvaluationBudget(max_visits=3)
+        tree = EvaluableParseTree(Not(BoolVar()))
+        for result in (True, False, True):
+            eq_(tree({'bool': result}, budget), not result)
+    
+    def test_original_tree_untouched(self):
+        operation = Not(BoolVar())
+        tree = EvaluableParseTree(operation)
+        assert_false(tree({'bool': True}, EvaluationBudget(max_visits=2)))
+        ok_(operation.arguments['operand'].__class__ is BoolVar)
+    
+    def test_tree_instrumented_once(self):
+        budget = EvaluationBudget(max_visits=2)
+        tree = EvaluableParseTree(Not(BoolVar()))
+        ok_(tree({'bool': False}, budget))
+        instrumented_root = budget._instrumented_roots[tree]
+        assert_false(tree({'bool': True}, budget))
+        ok_(budget._instrumented_roots[tree] is instrumented_root)
+    
+    def test_membership(self):
+        """The members of sets are visited, unless the set is constant."""
+        tree = EvaluableParseTree(BelongsTo(NumVar(),
+                                            Set(Number(3), NumVar())))
+        ok_(tree({'num': 4}, EvaluationBudget(max_visits=5)))
+        assert_raises(BudgetExceededError, tree, {'num': 4},
+                      EvaluationBudget(max_visits=4))
+        
+        tree = EvaluableParseTree(BelongsTo(NumVar(),
+                                            Set(Number(3), Number(4))))
+        ok_(tree({'num': 4}, EvaluationBudget(max_visits=3)))
+    
+    def test_prefetching_time(self):
+        """The time spent prefetching the data counts."""
+        tree = EvaluableParseTree(SlowStoredBoolVar("active"))
+        context = {'store': MockKeyValueStore(active=True)}
+        ok_(tree(context, EvaluationBudget(timeout=10)))
+        context = {'store': MockKeyValueStore(active=True)}
+        assert_raises(BudgetExceededError, tree, context,
+                      EvaluationBudget(timeout=0.005))
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2009-2010 by Gustavo Narea <http://gustavonarea.net/>.
+#
+# This file is part of Booleano <http://booleano.efous.org/>.
+#
+# This program is Freedomware: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+Tests for the objects loaded on first use from :mod:`booleano.parser`.
+
+"""
+
+import os
+import sys
+from subprocess import PIPE, Popen
+
+from nose.tools import eq_, ok_, assert_raises
+
+import booleano
+import booleano.parser
+
+
+def test_definitions_without_parser_machinery():
+    """The grammar and scope definitions don't load Pyparsing or the nodes."""
+    code = "import sys; " \
+           "from booleano.parser import Grammar, SymbolTable, Bind; " \
+           "print ' '.join(sys.modules)"
+    # The child process must find this copy of Booleano, wherever the tests
+    # are run from:
+    environment = dict(os.environ)
+    environment['PYTHONPATH'] = os.path.dirname(
+        os.path.dirname(os.path.abspath(booleano.__file__)))
+    process = Popen([sys.executable, "-c", code], stdout=PIPE,
+                    env=environment)
+    loaded_modules = process.communicate()[0].split()
+    eq_(process.returncode, 0)
+    for module_name in ("pyparsing", "multiprocessing",
+                        "booleano.parser.parsers",
+                        "booleano.nodes.operations"):
+        ok_(module_name not in loaded_modules,
+            "%s was loaded" % module_name)
+
+
+def test_lazy_parsers():
+    """The parsers are available from the package once they're requested."""
+    from booleano.parser import EvaluableParser, ConvertibleParser
+    from booleano.parser import parsers
+    ok_(EvaluableParser is parsers.EvaluableParser)
+    ok_(ConvertibleParser is parsers.ConvertibleParser)
+
+
+def test_unknown_attribute():
+    assert_raises(AttributeError, getattr, booleano.parser, "NonExisting")
+
+
+def test_monkeypatching():
+    """The attributes set on the package are seen by its functions."""
+    original_logger = booleano.parser.LOGGER
+    logger = object()
+    booleano.parser.LOGGER = logger
+    try:
+        ok_(booleano.parser.ParseManager.__init__.im_func.func_globals
+            ['LOGGER'] is logger)
+    finally:
+        booleano.parser.LOGGER = original_logger
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2009-2010 by Gustavo Narea <http://gustavonarea.net/>.
+#
+# This file is part of Booleano <http://booleano.efous.org/>.
+#
+# This program is Freedomware: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+Tests for the parse limits.
+
+"""
+
+from sys import getrecursionlimit
+
+from nose.tools import eq_, ok_, assert_raises
+
+from booleano.exc import ExpressionTooComplexError, BadExpressionError
+from booleano.nodes.operations import And, Not, BelongsTo
+from booleano.nodes.constants import String, Set
+from booleano.parser import Grammar, ParseManager
+from booleano.parser.limits import ParseLimits
+from booleano.parser.trees import EvaluableParseTree
+
+from tests.utils.mock_nodes import BoolVar, TrafficLightVar
+
+
+class CountingParser(object):
+    """Mock parser which records the expressions it parses."""
+    
+    def __init__(self):
+        self.expressions = []
+    
+    def __call__(self, expression):
+        self.expressions.append(expression)
+        return EvaluableParseTree(Not(Not(BoolVar())))
+
+
+class CountingParseManager(ParseManager):
+    """Mock parse manager whose parsers are :class:`CountingParser`."""
+    
+    def _define_parser(self, locale, grammar):
+        return CountingParser()
+
+
+class TestExpressionLimits(object):
+    """Tests for the checks run before the expressions are parsed."""
+    
+    def test_no_limits(self):
+        limits = ParseLimits()
+        limits.check_expression("(" * 1000, Grammar())
+    
+    def test_max_length(self):
+        limits = ParseLimits(max_length=5)
+        limits.check_expression("a & b", Grammar())
+        assert_raises(ExpressionTooComplexError, limits.check_expression,
+                      "a & bc", Grammar())
+    
+    def test_max_depth(self):
+        limits = ParseLimits(max_depth=2)
+        grammar = Grammar()
+        limits.check_expression("((a) & f(b)) | {1, (2)}", grammar)
+        assert_raises(ExpressionTooComplexError, limits.check_expression,
+                      "((f(a)))", grammar)
+        assert_raises(ExpressionTooComplexError, limits.check_expression,
+                      "({(1)})", grammar)
+    
+    def test_max_tokens(self):
+        limits = ParseLimits(max_tokens=5)
+        grammar = Grammar()
+        # Operators, identifiers, numbers and strings are single tokens:
+        limits.check_expression('ns:foo_bar <= 2.5 | "a & b | c"', grammar)
+        assert_raises(ExpressionTooComplexError, limits.check_expression,
+                      "~a & ~b & c", grammar)
+    
+    def test_marks_inside_strings(self):
+        limits = ParseLimits(max_depth=1, max_tokens=3)
+        grammar = Grammar()
+        limits.check_expression('a == "(((((("', grammar)
+        # Unterminated strings are single tokens too:
+        limits.check_expression('a == "((((((', grammar)
+    
+    def test_custom_grammar(self):
+        limits = ParseLimits(max_depth=1, max_tokens=5)
+        grammar = Grammar(group_start="[", group_end="]", **{'and': "and"})
+        limits.check_expression("[a and b]", grammar)
+        assert_raises(ExpressionTooComplexError, limits.check_expression,
+                      "[[a]]", grammar)
+    
+    def test_alphabetic_operators(self):
+        """Alphabetic operators aren't found inside identifiers."""
+        limits = ParseLimits(max_tokens=3)
+        grammar = Grammar(**{'and': "y", 'or': "o"})
+        limits.check_expression("mayo y oso", grammar)
+        limits.check_expression("yoyo o y_o", grammar)
+        assert_raises(ExpressionTooComplexError, limits.check_expression,
+                      "a y b o c", grammar)
+    
+    def test_exception_type(self):
+        """The complexity errors are bad expression errors too."""
+        limits = ParseLimits(max_length=1)
+        assert_raises(BadExpressionError, limits.check_expression, "ab",
+                      Grammar())
+
+
+class TestTreeLimits(object):
+    """Tests for the checks run on the resulting parse trees."""
+    
+    def test_no_limits(self):
+        limits = ParseLimits(max_length=1, max_depth=1, max_tokens=1)
+        limits.check_tree(EvaluableParseTree(Not(Not(Not(BoolVar())))))
+    
+    def test_max_nodes(self):
+        limits = ParseLimits(max_nodes=3)
+        limits.check_tree(EvaluableParseTree(And(BoolVar(), BoolVar())))
+        assert_raises(ExpressionTooComplexError, limits.check_tree,
+                      EvaluableParseTree(And(BoolVar(), Not(BoolVar()))))
+    
+    def test_max_tree_depth(self):
+        limits = ParseLimits(max_tree_depth=3)
+        limits.check_tree(EvaluableParseTree(And(BoolVar(),
+                                                 Not(TrafficLightVar()))))
+        assert_raises(ExpressionTooComplexError, limits.check_tree,
+                      EvaluableParseTree(Not(Not(Not(BoolVar())))))
+    
+    def test_set_members(self):
+        """The members of the sets are nodes of the tree too."""
+        operation = BelongsTo(String("a"), Set(String("a"), String("b")))
+        ParseLimits(max_nodes=5, max_tree_depth=3).check_tree(
+            EvaluableParseTree(operation))
+        assert_raises(ExpressionTooComplexError,
+                      ParseLimits(max_nodes=4).check_tree,
+                      EvaluableParseTree(operation))
+        assert_raises(ExpressionTooComplexError,
+                      ParseLimits(max_tree_depth=2).check_tree,
+                      EvaluableParseTree(operation))
+    
+    def test_deep_trees(self):
+        """Trees nested beyond the recursion limit can be checked."""
+        node = BoolVar()
+        for index in xrange(getrecursionlimit()):
+            node = Not(node)
+        tree = EvaluableParseTree(node)
+        ParseLimits(max_nodes=getrecursionlimit() + 1).check_tree(tree)
+        assert_raises(ExpressionTooComplexError,
+                      ParseLimits(max_tree_depth=100).check_tree, tree)
+
+
+class TestManagersWithLimits(object):
+    """Tests for the parse managers with parse limits."""
+    
+    def test_rejected_before_parsing(self):
+        manager = CountingParseManager(Grammar(), cache_limit=None,
+                                       parse_limits=ParseLimits(max_depth=3))
+        assert_raises(ExpressionTooComplexError, manager.parse,
+                      "(" * 10000 + "a" + ")" * 10000)
+        eq_(manager._parsers[None].expressions, [])
+    
+    def test_rejected_before_caching(self):
+        manager = CountingParseManager(Grammar(), cache_limit=None,
+                                       parse_limits=ParseLimits(max_nodes=2))
+        assert_raises(ExpressionTooComplexError, manager.parse, "~~a")
+        eq_(manager._cache.counter, 0)
+    
+    def test_accepted_expressions(self):
+        manager = CountingParseManager(Grammar(), cache_limit=None,
+                                       parse_limits=ParseLimits(max_depth=3,
+                                                                max_nodes=3))
+        manager.parse("~~a", "es")
+        manager.parse("~~a", "es")
+        # The second time it was taken from the cache:
+        eq_(manager._parsers["es"].expressions, ["~~a"])
+        ok_(manager._cache.is_stored("es", "~~a"))
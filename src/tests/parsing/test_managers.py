@@ -20,14 +20,18 @@ Tests for the parsing managers.
 
 """
 
+from sys import getrecursionlimit
+
 from nose.tools import eq_, ok_, assert_false, assert_raises
 
 from booleano.parser import (SymbolTable, Bind, Grammar, ParseManager,
-                             EvaluableParseManager, ConvertibleParseManager)
+                             EvaluableParseManager, ConvertibleParseManager,
+                             _get_canonical_form)
 from booleano.parser.trees import EvaluableParseTree, ConvertibleParseTree
-from booleano.nodes.operations import Equal, LessEqual
-from booleano.nodes.constants import String, Number, PlaceholderVariable
-from booleano.exc import GrammarError
+from booleano.nodes.operations import Not, Equal, LessEqual
+from booleano.nodes.constants import String, Number
+from booleano.nodes.placeholders import PlaceholderVariable
+from booleano.exc import GrammarError, ScopeError
 
 from tests.utils import LoggingHandlerFixture
 from tests.utils.mock_nodes import (BoolVar, TrafficLightVar,
@@ -174,6 +178,192 @@ class TestEvaluableParseManager(object):
         ok_(evaluation1)
         ok_(evaluation2)
         assert_false(evaluation3)
+    
+    def test_symbol_table_changes(self):
+        """Parsers are given the new namespace when the symbol table changes."""
+        traffic_table = SymbolTable("traffic", [], es=u"tráfico")
+        symbol_table = SymbolTable("root",
+            [Bind("message", String("Hello world"), es="mensaje")],
+            traffic_table)
+        mgr = EvaluableParseManager(symbol_table, Grammar(), cache_limit=None,
+                                    es=Grammar())
+        expression = u'tráfico:peatones_cruzando_calle <= 3'
+        assert_raises(ScopeError, mgr.parse, expression, "es")
+        parse_tree1 = mgr.parse('mensaje == "2009-07-13"', "es")
+        
+        traffic_table.add_object(Bind("pedestrians_crossing_road",
+                                      PedestriansCrossingRoad(),
+                                      es="peatones_cruzando_calle"))
+        parse_tree2 = mgr.parse(expression, "es")
+        expected_tree = EvaluableParseTree(
+            LessEqual(PedestriansCrossingRoad(), Number(3)))
+        eq_(parse_tree2, expected_tree)
+        # The trees cached before the change are kept:
+        ok_(mgr.parse('mensaje == "2009-07-13"', "es") is parse_tree1)
+    
+    def test_subtables_added(self):
+        """
+        Parsers see the sub-tables added after they were built, even in other
+        locales.
+        
+        """
+        symbol_table = SymbolTable("root",
+            [Bind("message", String("Hello world"), es="mensaje")])
+        mgr = EvaluableParseManager(symbol_table, Grammar(), cache_limit=None,
+                                    es=Grammar())
+        expression = u'tráfico:peatones_cruzando_calle <= 3'
+        assert_raises(ScopeError, mgr.parse, expression, "es")
+        assert_raises(ScopeError, mgr.parse,
+                      "traffic:pedestrians_crossing_road <= 3")
+        
+        traffic_table = SymbolTable("traffic",
+            [Bind("pedestrians_crossing_road", PedestriansCrossingRoad(),
+                  es="peatones_cruzando_calle")],
+            es=u"tráfico")
+        symbol_table.add_subtable(traffic_table)
+        expected_tree = EvaluableParseTree(
+            LessEqual(PedestriansCrossingRoad(), Number(3)))
+        eq_(mgr.parse(expression, "es"), expected_tree)
+        eq_(mgr.parse("traffic:pedestrians_crossing_road <= 3"), expected_tree)
+    
+    def test_removed_objects(self):
+        """Only the cached trees which use the objects removed are discarded."""
+        pedestrians_bind = Bind("pedestrians_crossing_road",
+                                PedestriansCrossingRoad(),
+                                es="peatones_cruzando_calle")
+        traffic_table = SymbolTable("traffic", [pedestrians_bind],
+                                    es=u"tráfico")
+        symbol_table = SymbolTable("root",
+            [Bind("message", String("Hello world"), es="mensaje")],
+            traffic_table)
+        mgr = EvaluableParseManager(symbol_table, Grammar(), cache_limit=None,
+                                    es=Grammar())
+        expression1 = u'tráfico:peatones_cruzando_calle <= 3'
+        expression2 = 'traffic:pedestrians_crossing_road <= 3'
+        parse_tree1 = mgr.parse('mensaje == "2009-07-13"', "es")
+        mgr.parse(expression1, "es")
+        mgr.parse(expression2)
+        eq_(mgr._cache.counter, 3)
+        
+        traffic_table.remove_object(pedestrians_bind)
+        eq_(mgr._cache.counter, 1)
+        eq_(mgr._cache.latest_expressions,
+            [("es", 'mensaje == "2009-07-13"')])
+        assert_raises(ScopeError, mgr.parse, expression1, "es")
+        assert_raises(ScopeError, mgr.parse, expression2)
+        ok_(mgr.parse('mensaje == "2009-07-13"', "es") is parse_tree1)
+    
+    def test_replaced_objects(self):
+        """The cached trees which use the objects replaced are discarded."""
+        old_bind = Bind("message", String("Hello world"), es="mensaje")
+        symbol_table = SymbolTable("root", [old_bind])
+        mgr = EvaluableParseManager(symbol_table, Grammar(), cache_limit=None,
+                                    es=Grammar())
+        mgr.parse('mensaje == "Hello world"', "es")
+        
+        symbol_table.replace_object(old_bind, Bind("message", String("Hi"),
+                                                   es="mensaje"))
+        parse_tree = mgr.parse('mensaje == "Hello world"', "es")
+        expected_tree = EvaluableParseTree(
+            Equal(String("Hi"), String("Hello world")))
+        eq_(parse_tree, expected_tree)
+        eq_(mgr._cache.expressions_by_identifier,
+            {("es", ("mensaje", )): set(['mensaje == "Hello world"'])})
+    
+    def test_removed_objects_without_localized_names(self):
+        """
+        The objects removed are found by their global names in the locales
+        where they don't have a name of their own.
+        
+        """
+        bool_bind = Bind("boolean", BoolVar())
+        traffic_table = SymbolTable("traffic", [bool_bind], es=u"tráfico")
+        symbol_table = SymbolTable("root", [], traffic_table)
+        mgr = EvaluableParseManager(symbol_table, Grammar(), cache_limit=None,
+                                    es=Grammar())
+        mgr.parse(u"~ tráfico:boolean", "es")
+        eq_(mgr._cache.counter, 1)
+        
+        traffic_table.remove_object(bool_bind)
+        eq_(mgr._cache.counter, 0)
+        assert_raises(ScopeError, mgr.parse, u"~ tráfico:boolean", "es")
+    
+    def test_binding_convertible_trees(self):
+        """Convertible parse trees can be bound to the symbol table."""
+        mgr = EvaluableParseManager(self.symbol_table, Grammar(), es=Grammar())
+        convertible_mgr = ConvertibleParseManager(Grammar(), es=Grammar())
+        expression = u'tráfico:semáforo == "verde" & ~ fulano(booleano)'
+        parse_tree = mgr.bind(convertible_mgr.parse(expression, "es"), "es")
+        eq_(parse_tree, mgr.parse(expression, "es"))
+        # The names must be those in the locale:
+        convertible_tree = convertible_mgr.parse("traffic:traffic_light", "es")
+        assert_raises(ScopeError, mgr.bind, convertible_tree, "es")
+    
+    def test_trees_shared_across_locales(self):
+        """The same expression in different grammars is cached once."""
+        mgr = EvaluableParseManager(self.symbol_table, Grammar(),
+                                    cache_limit=None, es=Grammar())
+        parse_tree1 = mgr.parse(u'tráfico:peatones_cruzando_calle <= 3 & '
+                                u'fulano(booleano, {"a", 2})', "es")
+        parse_tree2 = mgr.parse('traffic:pedestrians_crossing_road <= 3 & '
+                                'foo(boolean, {2, "a"})')
+        ok_(parse_tree1 is parse_tree2)
+        eq_(mgr._cache.counter, 2)
+        eq_(len(mgr._cache.trees_by_canonical_form), 1)
+        # A different expression which uses the same objects:
+        parse_tree3 = mgr.parse(u'tráfico:peatones_cruzando_calle >= 3', "es")
+        ok_(parse_tree3 is not parse_tree1)
+        eq_(len(mgr._cache.trees_by_canonical_form), 2)
+    
+    def test_trees_with_equivalent_objects(self):
+        """
+        The trees which use different objects are not shared, even if the
+        objects are equivalent.
+        
+        """
+        symbol_table = SymbolTable("root",
+            (
+                Bind("first", BoolVar(), es="primero"),
+                Bind("second", BoolVar(), es="segundo"),
+            ),
+        )
+        mgr = EvaluableParseManager(symbol_table, Grammar(), cache_limit=None,
+                                    es=Grammar())
+        parse_tree1 = mgr.parse("primero", "es")
+        parse_tree2 = mgr.parse("segundo", "es")
+        parse_tree3 = mgr.parse("second")
+        ok_(parse_tree1 is not parse_tree2)
+        ok_(parse_tree2 is parse_tree3)
+    
+    def test_shared_trees_removed(self):
+        """A shared tree is forgotten once no expression uses it."""
+        mgr = EvaluableParseManager(self.symbol_table, Grammar(), cache_limit=2,
+                                    es=Grammar())
+        mgr.parse('mensaje == "Hello"', "es")
+        mgr.parse('message == "Hello"')
+        eq_(len(mgr._cache.trees_by_canonical_form), 1)
+        mgr.parse("boolean")
+        eq_(len(mgr._cache.trees_by_canonical_form), 2)
+        mgr.parse("booleano", "es")
+        eq_(mgr._cache.trees_by_canonical_form.keys(), [("boolean", )])
+        eq_(mgr._cache.expression_counts, {("boolean", ): 2})
+    
+    def test_canonical_form_of_deep_trees(self):
+        """
+        The canonical form of trees nested beyond the recursion limit can be
+        computed.
+        
+        """
+        operand = BoolVar()
+        node = operand
+        depth = getrecursionlimit() + 1
+        for index in xrange(depth):
+            node = Not(node)
+        form = _get_canonical_form(node, {id(operand): ("boolean", )})
+        for index in xrange(depth):
+            eq_(form[0], Not)
+            form = form[1][0]
+        eq_(form, ("boolean", ))
 
 
 class TestConvertibleParseManager(object):
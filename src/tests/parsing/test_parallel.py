@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2009-2010 by Gustavo Narea <http://gustavonarea.net/>.
+#
+# This file is part of Booleano <http://booleano.efous.org/>.
+#
+# This program is Freedomware: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+Tests for the parallel evaluation of parse trees.
+
+"""
+
+from nose.tools import eq_, assert_raises
+
+from booleano.parser import SymbolTable, Bind, Grammar
+from booleano.parser.parallel import (ParallelEvaluator, TreeSpec,
+    ExpressionSpec)
+from booleano.parser.streaming import StreamStatistics, filter_contexts
+from booleano.parser.trees import EvaluableParseTree
+
+from tests.utils.mock_nodes import BoolVar, NumVar
+
+
+def make_symbol_table():
+    """Build the symbol table used by the expression specifications."""
+    symbol_table = SymbolTable("root",
+        (
+            Bind("boolean", BoolVar(), es="booleano"),
+            Bind("number", NumVar(), es=u"número"),
+        ),
+    )
+    return symbol_table
+
+
+def _make_contexts(amount):
+    """Return ``amount`` contexts, where every third one is true."""
+    return [{'bool': index % 3 == 0, 'num': index} for index in range(amount)]
+
+
+class TestParallelEvaluator(object):
+    """Tests for the evaluation of parse trees in worker processes."""
+    
+    def test_tree(self):
+        """Parse trees are shipped to the workers."""
+        tree = EvaluableParseTree(BoolVar())
+        with ParallelEvaluator(tree, processes=2, chunk_size=3) as evaluator:
+            results = list(evaluator.evaluate(_make_contexts(20)))
+            eq_(results, [index % 3 == 0 for index in range(20)])
+            # The workers are reused:
+            results = list(evaluator.evaluate(_make_contexts(5)))
+            eq_(results, [True, False, False, True, False])
+    
+    def test_expression_spec(self):
+        """Workers can build the parse tree from an expression."""
+        spec = ExpressionSpec(make_symbol_table, Grammar(), u"número < 4", "es")
+        with ParallelEvaluator(spec, processes=2, chunk_size=2) as evaluator:
+            results = list(evaluator.evaluate(_make_contexts(6)))
+        eq_(results, [True, True, True, True, False, False])
+    
+    def test_results_with_contexts(self):
+        tree = EvaluableParseTree(BoolVar())
+        with ParallelEvaluator(tree, processes=2, chunk_size=4) as evaluator:
+            results = list(evaluator.iter_results(_make_contexts(3)))
+        eq_(results, zip(_make_contexts(3), [True, False, False]))
+    
+    def test_statistics(self):
+        tree = EvaluableParseTree(BoolVar())
+        statistics = StreamStatistics()
+        with ParallelEvaluator(tree, processes=2, chunk_size=4) as evaluator:
+            results = list(evaluator.iter_results(_make_contexts(10),
+                                                  statistics))
+        eq_(len(results), 10)
+        eq_(statistics.evaluated, 10)
+        eq_(statistics.matched, 4)
+        eq_(statistics.chunks, 3)
+    
+    def test_streaming(self):
+        """The evaluator can be used with the streaming functions."""
+        tree = EvaluableParseTree(BoolVar())
+        contexts = filter_contexts(tree, _make_contexts(10), chunk_size=3,
+                                   processes=2)
+        eq_([context['num'] for context in contexts], [0, 3, 6, 9])
+    
+    def test_abstract_spec(self):
+        assert_raises(NotImplementedError, TreeSpec().make_tree)
@@ -20,15 +20,19 @@ Test suite for the built-in parser implementation.
 
 """
 
-from nose.tools import eq_, assert_raises
+from sys import getrecursionlimit
 
-from booleano.parser import Grammar, ConvertibleParser, EvaluableParser
+from nose.tools import eq_, ok_, assert_false, assert_raises
+
+from booleano.parser import Grammar
 from booleano.parser.scope import Namespace
-from booleano.parser.parsers import Parser
+from booleano.parser.parsers import Parser, ConvertibleParser, EvaluableParser
+from booleano.parser.trees import ConvertibleParseTree
+from booleano.nodes.interning import NodeInterner
 from booleano.nodes.operations import (Not, And, Or, Xor, Equal, NotEqual,
     LessThan, GreaterThan, LessEqual, GreaterEqual, BelongsTo, IsSubset)
-from booleano.nodes.constants import (String, Number, Set,
-    PlaceholderVariable, PlaceholderFunction)
+from booleano.nodes.constants import String, Number, Set
+from booleano.nodes.placeholders import PlaceholderVariable, PlaceholderFunction
 from booleano.parser.testutils import BaseGrammarTest
 from booleano.exc import ScopeError, BadExpressionError
 
@@ -105,7 +109,7 @@ class TestDefaultGrammar(BaseGrammarTest):
             PlaceholderVariable("today", ("days",)),
             PlaceholderVariable("yesterday", ("days",))),
         '3.00 != Pi': NotEqual(Number(3.0), PlaceholderVariable("pi")),
-        'Pi != 3.00': Equal(PlaceholderVariable("pi"), Number(3.00)),
+        'Pi != 3.00': NotEqual(PlaceholderVariable("pi"), Number(3.00)),
         'days:today > days:yesterday': GreaterThan(
             PlaceholderVariable("today", ("days",)),
             PlaceholderVariable("yesterday", ("days",))),
@@ -694,6 +698,9 @@ class TestDefaultGrammar(BaseGrammarTest):
         "1stnamespace:var",
         "global:2ndlevel:var",
         "namespace:1st_variable",
+        u"٣rd_variable",
+        u"²nd_variable",
+        u"\U0001d7d1st_variable",
         # Invalid functions:
         "func(",
         "func)",
@@ -832,6 +839,8 @@ class TestEvaluableParser(object):
     
     parser = EvaluableParser(Grammar(), root_namespace)
     
+    convertible_parser = ConvertibleParser(Grammar())
+    
     #{ Tests for the parse action that makes the variables
     
     def test_existing_variable_without_namespace(self):
@@ -900,4 +909,109 @@ class TestEvaluableParser(object):
             assert 0, '"bool" is a variable, not a function!'
     
     #}
+    
+    def test_interning(self):
+        """Identical constants and operations are shared across trees."""
+        parser = EvaluableParser(Grammar(), self.root_namespace,
+                                 NodeInterner())
+        tree1 = parser('bool & message == "foo"')
+        tree2 = parser('~ bool | message == "foo"')
+        tree3 = parser('message != "foo"')
+        equality1 = tree1.root_node.arguments['right_operand']
+        equality2 = tree2.root_node.arguments['right_operand']
+        ok_(equality1 is equality2)
+        ok_(equality1.arguments['right_operand'] is
+            tree3.root_node.arguments['right_operand'])
 
+    
+    #{ Tests for the literal sets
+    
+    def test_literal_set_of_strings(self):
+        parse_tree = self.parser(u'traffic:traffic_light ∈ {"red", "amber"}')
+        expected_node = BelongsTo(self.traffic_objects['traffic_light'],
+                                  Set(String("red"), String("amber")))
+        eq_(parse_tree.root_node, expected_node)
+        ok_(parse_tree({'traffic_light': "amber"}))
+        assert_false(parse_tree({'traffic_light': "green"}))
+    
+    def test_literal_set_of_numbers(self):
+        parse_tree = self.parser(u'{1,234.5, -2, +3} ⊂ {-2, 3, 1,234.5}')
+        subset = Set(Number(1234.5), Number(-2), Number(3))
+        eq_(parse_tree.root_node, IsSubset(subset, subset))
+    
+    def test_mixed_literal_set(self):
+        """Sets with several kinds of operands are still supported."""
+        parse_tree = self.parser(u'bool ∈ {"red", 2, bool, {3}}')
+        expected_set = Set(String("red"), Number(2),
+                           self.global_objects['bool'], Set(Number(3)))
+        eq_(parse_tree.root_node.arguments['right_operand'], expected_set)
+    
+    def test_large_literal_set(self):
+        strings = ['"sku%s"' % index for index in xrange(20000)]
+        parse_tree = self.parser(u'"sku19999" ∈ {%s}' % ", ".join(strings))
+        eq_(len(parse_tree.root_node.arguments['right_operand'].get_children()),
+            20000)
+        ok_(parse_tree(None))
+    
+    #{ Tests for the binding of convertible parse trees
+    
+    def test_binding_variables(self):
+        expression = 'traffic:traffic_light == "green" & ~ bool'
+        parse_tree = self.parser.bind(self.convertible_parser(expression))
+        eq_(parse_tree, self.parser(expression))
+    
+    def test_binding_functions(self):
+        expression = '~ traffic:traffic_violation("pedestrians") | foo(bool)'
+        parse_tree = self.parser.bind(self.convertible_parser(expression))
+        eq_(parse_tree, self.parser(expression))
+    
+    def test_binding_sets(self):
+        expression = u'bool ∈ {"red", 2, bool, {3}}'
+        parse_tree = self.parser.bind(self.convertible_parser(expression))
+        eq_(parse_tree, self.parser(expression))
+    
+    def test_binding_without_placeholders(self):
+        """The nodes without placeholders are reused."""
+        convertible_tree = self.convertible_parser('"a" == "b" | bool')
+        parse_tree = self.parser.bind(convertible_tree)
+        ok_(parse_tree.root_node.arguments['left_operand'] is
+            convertible_tree.root_node.arguments['left_operand'])
+    
+    def test_binding_deep_trees(self):
+        """Trees nested beyond the recursion limit can be bound."""
+        node = PlaceholderVariable("bool")
+        depth = getrecursionlimit() + 1
+        for index in xrange(depth):
+            node = Not(node)
+        parse_tree = self.parser.bind(ConvertibleParseTree(node))
+        node = parse_tree.root_node
+        for index in xrange(depth):
+            ok_(isinstance(node, Not))
+            node = node.arguments['operand']
+        ok_(node is self.global_objects['bool'])
+    
+    def test_binding_non_existing_objects(self):
+        for expression in ("~ non_existing_var", "~ bar:foo",
+                           "~ traffic:non_existing_func()"):
+            convertible_tree = self.convertible_parser(expression)
+            assert_raises(ScopeError, self.parser.bind, convertible_tree)
+    
+    def test_binding_function_instead_of_variable(self):
+        convertible_tree = self.convertible_parser("~ foo")
+        try:
+            self.parser.bind(convertible_tree)
+        except BadExpressionError, exc:
+            eq_('"foo" represents a function, not a variable', unicode(exc))
+        else:
+            assert 0, '"foo" is a function, not a variable!'
+    
+    def test_binding_variable_instead_of_function(self):
+        convertible_tree = self.convertible_parser("~ traffic:traffic_light()")
+        try:
+            self.parser.bind(convertible_tree)
+        except BadExpressionError, exc:
+            eq_('"traffic:traffic_light" is not a function', unicode(exc))
+        else:
+            assert 0, '"traffic_light" is a variable, not a function!'
+    
+    #}
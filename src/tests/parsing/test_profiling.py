@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2009-2010 by Gustavo Narea <http://gustavonarea.net/>.
+#
+# This file is part of Booleano <http://booleano.efous.org/>.
+#
+# This program is Freedomware: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+Tests for the profiler of parse trees.
+
+"""
+
+from sys import getrecursionlimit
+
+from nose.tools import eq_, ok_
+
+from booleano.nodes.constants import Number, Set
+from booleano.nodes.operations import And, Not, LessThan, BelongsTo
+from booleano.parser.profiling import EvaluationProfiler, NodeProfile
+from booleano.parser.trees import EvaluableParseTree
+
+from tests.utils.mock_nodes import BoolVar, NumVar
+
+
+class TestEvaluationProfiler(object):
+    """Tests for the :class:`EvaluationProfiler`."""
+    
+    def setup(self):
+        self.less_than = LessThan(NumVar(), Number(3))
+        self.operation = And(BoolVar(), Not(self.less_than))
+        self.tree = EvaluableParseTree(self.operation)
+    
+    def test_results(self):
+        """The results must be the same as those of the original tree."""
+        profiler = EvaluationProfiler(self.tree)
+        ok_(profiler({'bool': True, 'num': 4}))
+        eq_(profiler({'bool': True, 'num': 2}), False)
+        eq_(profiler({'bool': False, 'num': 4}), False)
+    
+    def test_statistics(self):
+        contexts = (
+            {'bool': True, 'num': 4},
+            {'bool': True, 'num': 2},
+            {'bool': False, 'num': 4},
+            )
+        profiler = self.tree.profile(contexts)
+        
+        root_profile = profiler.root_profile
+        eq_(root_profile.node, self.operation)
+        eq_(root_profile.calls, 3)
+        eq_(root_profile.true_count, 1)
+        eq_(root_profile.false_count, 2)
+        eq_(root_profile.skipped, 0)
+        
+        # The operands of the conjunction:
+        (bool_profile, not_profile) = sorted(
+            root_profile.children,
+            key=lambda profile: isinstance(profile.node, Not),
+            )
+        eq_(bool_profile.node, BoolVar())
+        eq_(bool_profile.calls, 3)
+        eq_(bool_profile.true_count, 2)
+        eq_(not_profile.calls, 2)
+        eq_(not_profile.skipped, 1)
+        
+        # The inequality:
+        less_than_profile = not_profile.children[0]
+        eq_(less_than_profile.node, self.less_than)
+        eq_(less_than_profile.calls, 2)
+        eq_(less_than_profile.true_count, 1)
+        eq_(less_than_profile.false_count, 1)
+        eq_(len(less_than_profile.children), 2)
+    
+    def test_times(self):
+        profiler = self.tree.profile([{'bool': True, 'num': 4}])
+        root_profile = profiler.root_profile
+        ok_(root_profile.inclusive_time >= root_profile.exclusive_time >= 0)
+        children_time = sum(child.inclusive_time for child in
+                            root_profile.children)
+        ok_(root_profile.inclusive_time >= children_time)
+    
+    def test_membership(self):
+        """The members of sets are profiled unless the set is constant."""
+        variable_set = Set(Number(3), NumVar())
+        tree = EvaluableParseTree(BelongsTo(NumVar(), variable_set))
+        profiler = tree.profile([{'num': 4}, {'num': 5}])
+        eq_(profiler.root_profile.true_count, 2)
+        (item_profile, set_profile) = profiler.root_profile.children
+        eq_(item_profile.calls, 2)
+        eq_(set_profile.node, variable_set)
+        eq_(set_profile.calls, 2)
+        eq_(len(set_profile.children), 2)
+        for member_profile in set_profile.children:
+            eq_(member_profile.calls, 2)
+        
+        constant_set = Set(Number(3), Number(4))
+        tree = EvaluableParseTree(BelongsTo(NumVar(), constant_set))
+        profiler = tree.profile([{'num': 4}, {'num': 5}])
+        eq_(profiler.root_profile.true_count, 1)
+        set_profile = profiler.root_profile.children[1]
+        eq_(set_profile.calls, 2)
+        eq_(set_profile.children, [])
+    
+    def test_original_tree_untouched(self):
+        """Profiling must not instrument the original tree."""
+        self.tree.profile([{'bool': True, 'num': 4}])
+        ok_(self.operation.arguments['left_operand'].__class__ is BoolVar)
+    
+    def test_report(self):
+        profiler = self.tree.profile([{'bool': False, 'num': 4}])
+        lines = profiler.get_report().splitlines()
+        eq_(len(lines), 6)
+        ok_(lines[0].startswith("And calls=1 true=0 false=1 skipped=0 "))
+        ok_(lines[1].startswith("  "))
+    
+    def test_report_of_deep_trees(self):
+        """
+        The report of trees nested beyond the recursion limit can be made.
+        
+        """
+        root_profile = NodeProfile(Not(BoolVar()))
+        profile = root_profile
+        depth = getrecursionlimit() + 1
+        for index in xrange(depth):
+            profile = profile.add_child(Not(BoolVar()))
+        profile.add_child(BoolVar())
+        lines = root_profile.get_report_lines()
+        eq_(len(lines), depth + 2)
+        ok_(lines[-2].startswith("  " * depth + "Not calls=0 "))
+        ok_(lines[-1].startswith("  " * (depth + 1) + "bool calls=0 "))
@@ -22,7 +22,8 @@ Scope handling tests.
 
 from nose.tools import eq_, ok_, assert_false, assert_raises, raises
 
-from booleano.parser.scope import Bind, SymbolTable, Namespace, _Identifier
+from booleano.parser.scope import (Bind, SymbolTable, Namespace, LazyNamespace,
+                                   _Identifier)
 from booleano.nodes.constants import String, Number
 from booleano.exc import ScopeError
 
@@ -515,6 +516,41 @@ class TestSymbolTable(object):
         assert_raises(ScopeError, st3.validate_scope)
         assert_raises(ScopeError, st4.validate_scope)
     
+    def test_name_clash_solved(self):
+        """Removing one of the objects which share a name solves the clash."""
+        e_bind = Bind("eulers-number", Number(2.71828), es_VE=u"número e")
+        st = SymbolTable("global",
+            (
+                Bind("e", Number(2.7183), es_VE=u"número e"),
+                e_bind,
+            ),
+        )
+        assert_raises(ScopeError, st.validate_scope)
+        st.remove_object(e_bind)
+        eq_(st.validate_scope(), None)
+        st.add_object(Bind(u"número e", Number(2.71828)))
+        assert_raises(ScopeError, st.validate_scope)
+    
+    def test_full_validation(self):
+        """
+        The names changed after the objects were added are checked in full
+        validations.
+        
+        """
+        pi_bind = Bind("pi", Number(3.1416))
+        st = SymbolTable("global",
+            (),
+            SymbolTable("maths",
+                (
+                    Bind("e", Number(2.7183), es_VE=u"número e"),
+                    pi_bind,
+                ),
+            ),
+        )
+        eq_(st.validate_scope(full=True), None)
+        pi_bind.names["es_VE"] = u"número e"
+        assert_raises(ScopeError, st.validate_scope, full=True)
+    
     def test_retrieving_namespace_without_children(self):
         """
         A namespace shouldn't have sub-namespaces if the original symbol table
@@ -651,6 +687,98 @@ class TestSymbolTable(object):
         }
         eq_(namespace.objects, expected_unbound_objects_global)
     
+    def test_namespaces_are_cached(self):
+        """Namespaces are extracted once per locale, until the table changes."""
+        subtable = SymbolTable("foo", [Bind("bar", BoolVar(), es="fulano")])
+        st = SymbolTable("global", [Bind("bool", BoolVar())], subtable)
+        ok_(st.get_namespace() is st.get_namespace())
+        ok_(st.get_namespace("es") is st.get_namespace("es"))
+        ok_(st.get_namespace() is not st.get_namespace("es"))
+        ok_(st.get_namespace().subnamespaces["foo"] is
+            subtable.get_namespace())
+    
+    def test_versions(self):
+        """Changes to a table are propagated to its ancestors."""
+        grandchild = SymbolTable("grandchild", [])
+        child = SymbolTable("child", [], grandchild)
+        sibling = SymbolTable("sibling", [])
+        st = SymbolTable("global", [], child, sibling)
+        versions = (st.version, child.version, grandchild.version,
+                    sibling.version)
+        
+        grandchild.add_object(Bind("bool", BoolVar()))
+        eq_((st.version, child.version, grandchild.version, sibling.version),
+            (versions[0] + 1, versions[1] + 1, versions[2] + 1, versions[3]))
+        
+        child.add_subtable(SymbolTable("new", []))
+        eq_((st.version, child.version, grandchild.version, sibling.version),
+            (versions[0] + 2, versions[1] + 2, versions[2] + 1, versions[3]))
+    
+    def test_cached_namespaces_invalidated(self):
+        """
+        The cached namespaces of a table and its ancestors are discarded when
+        the table changes, but not those of the other tables.
+        
+        """
+        grandchild = SymbolTable("grandchild", [])
+        child = SymbolTable("child", [], grandchild)
+        sibling = SymbolTable("sibling", [Bind("traffic", TrafficLightVar())])
+        st = SymbolTable("global", [], child, sibling)
+        namespace = st.get_namespace()
+        sibling_namespace = sibling.get_namespace()
+        assert_raises(ScopeError, namespace.get_object, "bool",
+                      ["child", "grandchild"])
+        
+        grandchild.add_object(Bind("bool", BoolVar()))
+        new_namespace = st.get_namespace()
+        ok_(new_namespace is not namespace)
+        eq_(new_namespace.get_object("bool", ["child", "grandchild"]),
+            BoolVar())
+        ok_(new_namespace.subnamespaces["sibling"] is sibling_namespace)
+    
+    def test_removing_objects(self):
+        bool_bind = Bind("bool", BoolVar())
+        traffic_bind = Bind("traffic", TrafficLightVar())
+        st = SymbolTable("global", [bool_bind, traffic_bind])
+        version = st.version
+        namespace = st.get_namespace()
+        st.remove_object(bool_bind)
+        eq_(st.objects, set([traffic_bind]))
+        eq_(bool_bind.symbol_table, None)
+        eq_(st.version, version + 1)
+        ok_(st.get_namespace() is not namespace)
+        assert_raises(ScopeError, st.get_namespace().get_object, "bool")
+    
+    def test_removing_foreign_objects(self):
+        """Only the objects in a table can be removed from it."""
+        bool_bind = Bind("bool", BoolVar())
+        SymbolTable("other", [bool_bind])
+        st = SymbolTable("global", [Bind("bool", BoolVar())])
+        assert_raises(ScopeError, st.remove_object, bool_bind)
+        assert_raises(ScopeError, st.remove_object, Bind("traffic",
+                                                         TrafficLightVar()))
+        eq_(len(st.objects), 1)
+    
+    def test_replacing_objects(self):
+        old_bind = Bind("traffic", TrafficLightVar(), es=u"semáforo")
+        new_bind = Bind("traffic", String("green"), es=u"semáforo")
+        st = SymbolTable("global", [old_bind])
+        st.replace_object(old_bind, new_bind)
+        eq_(st.objects, set([new_bind]))
+        ok_(new_bind.symbol_table is st)
+        eq_(old_bind.symbol_table, None)
+        eq_(st.get_namespace("es").get_object(u"semáforo"), String("green"))
+    
+    def test_replacing_objects_with_unavailable_ones(self):
+        """The old object is kept if the new one can't be added."""
+        old_bind = Bind("traffic", TrafficLightVar())
+        new_bind = Bind("traffic", String("green"))
+        SymbolTable("other", [new_bind])
+        st = SymbolTable("global", [old_bind])
+        assert_raises(ScopeError, st.replace_object, old_bind, new_bind)
+        eq_(st.objects, set([old_bind]))
+        ok_(old_bind.symbol_table is st)
+    
     def test_equivalence(self):
         objects1 = lambda: [Bind("dish", String("cachapa")),
                             Bind("drink", String("empanada"))]
@@ -908,3 +1036,107 @@ class TestNamespaces(object):
         st = Namespace(global_objects,)
         assert_raises(ScopeError, st.get_object, "bool")
 
+    
+    def test_namespace_parts_untouched(self):
+        """The namespace parts passed are not consumed while resolving them."""
+        sub2 = Namespace({'bool': BoolVar()})
+        st = Namespace({}, {'sub1': Namespace({}, {'sub2': sub2})})
+        namespace_parts = ["sub1", "sub2"]
+        eq_(st.get_object("bool", namespace_parts), BoolVar())
+        eq_(namespace_parts, ["sub1", "sub2"])
+    
+    def test_same_name_in_different_namespaces(self):
+        sub2 = Namespace({'traffic': TrafficLightVar()})
+        sub1 = Namespace({'traffic': BoolVar()}, {'sub2': sub2})
+        st = Namespace({'sub1': Number(3)}, {'sub1': sub1})
+        eq_(st.get_object("sub1"), Number(3))
+        eq_(st.get_object("traffic", ["sub1"]), BoolVar())
+        eq_(st.get_object("traffic", ["sub1", "sub2"]), TrafficLightVar())
+        assert_raises(ScopeError, st.get_object, "traffic")
+        assert_raises(ScopeError, st.get_object, "traffic", ["sub2"])
+    
+    def test_error_messages(self):
+        sub1 = Namespace({'bool': BoolVar()})
+        st = Namespace({}, {'sub1': sub1})
+        for (namespace_parts, expected_message) in (
+            (None, u'No such object "foo"'),
+            (["sub1"], u'No such object "foo" in sub1'),
+            (["sub1", "sub2"], u'No such object "foo" in sub1:sub2'),
+            (["sub2", "sub1"], u'No such object "foo" in sub2:sub1')):
+            try:
+                st.get_object("foo", namespace_parts)
+            except ScopeError, exc:
+                eq_(unicode(exc), expected_message)
+            else:
+                assert 0, "ScopeError not raised"
+
+
+class TestLazyNamespaces(object):
+    """Tests for the namespaces which resolve their objects on demand."""
+    
+    def setUp(self):
+        self.traffic_light = TrafficLightVar()
+        self.symbol_table = SymbolTable("global",
+            (
+                Bind("bool", BoolVar(), es="booleano"),
+                Bind("traffic", self.traffic_light, es=u"tráfico"),
+            ),
+            SymbolTable("maths",
+                (
+                    Bind("pi", Number(3.1416)),
+                    Bind("e", Number(2.7183), es=u"número e"),
+                ),
+                es=u"matemática"
+            ),
+        )
+    
+    def test_symbol_table_namespaces(self):
+        namespace = self.symbol_table.get_namespace("es")
+        ok_(isinstance(namespace, LazyNamespace))
+        eq_(namespace.get_object(u"tráfico"), TrafficLightVar())
+        eq_(namespace.get_object(u"número e", [u"matemática"]), Number(2.7183))
+        # Objects without a name in the locale take their global name:
+        eq_(namespace.get_object("pi", [u"matemática"]), Number(3.1416))
+        assert_raises(ScopeError, namespace.get_object, "traffic")
+        assert_raises(ScopeError, namespace.get_object, "e", [u"matemática"])
+        assert_raises(ScopeError, namespace.get_object, "pi", ["maths"])
+    
+    def test_global_names(self):
+        namespace = LazyNamespace(self.symbol_table)
+        eq_(namespace.get_object("traffic"), TrafficLightVar())
+        eq_(namespace.get_object("e", ["maths"]), Number(2.7183))
+        assert_raises(ScopeError, namespace.get_object, u"tráfico")
+        assert_raises(ScopeError, namespace.get_object, "bool", ["maths"])
+    
+    def test_objects_resolved_on_demand(self):
+        """Only the objects requested are resolved, and only once."""
+        namespace = LazyNamespace(self.symbol_table, "es")
+        ok_(namespace.get_object(u"tráfico") is self.traffic_light)
+        eq_(namespace._objects_by_path, {(u"tráfico", ): self.traffic_light})
+        eq_(namespace._objects, None)
+        eq_(namespace._subnamespaces, None)
+        # The objects are cached:
+        self.symbol_table.objects.clear()
+        ok_(namespace.get_object(u"tráfico") is self.traffic_light)
+    
+    def test_contents(self):
+        """The objects and sub-namespaces are extracted if requested."""
+        namespace = LazyNamespace(self.symbol_table, "es")
+        eq_(namespace.objects, {'booleano': BoolVar(),
+                                u'tráfico': TrafficLightVar()})
+        eq_(namespace.subnamespaces.keys(), [u"matemática"])
+        eq_(namespace.subnamespaces[u"matemática"].objects,
+            {'pi': Number(3.1416), u'número e': Number(2.7183)})
+    
+    def test_error_messages(self):
+        namespace = LazyNamespace(self.symbol_table)
+        for (namespace_parts, expected_message) in (
+            (None, u'No such object "foo"'),
+            (["maths"], u'No such object "foo" in maths'),
+            (["maths", "sub2"], u'No such object "foo" in maths:sub2')):
+            try:
+                namespace.get_object("foo", namespace_parts)
+            except ScopeError, exc:
+                eq_(unicode(exc), expected_message)
+            else:
+                assert 0, "ScopeError not raised"
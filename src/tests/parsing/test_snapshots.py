@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2009-2010 by Gustavo Narea <http://gustavonarea.net/>.
+#
+# This file is part of Booleano <http://booleano.efous.org/>.
+#
+# This program is Freedomware: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+Tests for the snapshots of symbol tables.
+
+"""
+
+import os
+from tempfile import mkstemp
+
+from nose.tools import eq_, ok_, assert_raises
+
+from booleano.nodes.constants import String, Number, Set
+from booleano.parser.scope import Bind, SymbolTable
+from booleano.parser.snapshots import SymbolTableSnapshot
+from booleano.exc import ScopeError
+
+from tests.utils.mock_nodes import (BoolVar, TrafficLightVar,
+    PermissiveFunction, ColumnVar)
+
+
+class TestSymbolTableSnapshot(object):
+    """Tests for the :class:`SymbolTableSnapshot`."""
+    
+    def setUp(self):
+        self.colors = Set(String("red"), String("green"))
+        self.symbol_table = SymbolTable("global",
+            (
+                Bind("bool", BoolVar(), es="booleano"),
+                Bind("message", String(u"¡Hola!"), es="mensaje"),
+                Bind("foo", PermissiveFunction, es="fulano"),
+            ),
+            SymbolTable("traffic",
+                (
+                    Bind("traffic_light", TrafficLightVar(), es=u"semáforo"),
+                    Bind("colors", self.colors, es="colores"),
+                ),
+                SymbolTable("maths",
+                    (
+                        Bind("pi", Number(3.1416)),
+                        Bind("e", Number(2.7183), es=u"número e"),
+                    ),
+                ),
+                es=u"tráfico"
+            ),
+        )
+    
+    def test_symbol_table(self):
+        snapshot = SymbolTableSnapshot.from_symbol_table(self.symbol_table)
+        eq_(snapshot.table_count, 3)
+        eq_(snapshot.binding_count, 7)
+        symbol_table = snapshot.make_symbol_table()
+        ok_(symbol_table is not self.symbol_table)
+        eq_(symbol_table, self.symbol_table)
+        eq_(symbol_table.validate_scope(), None)
+    
+    def test_operands(self):
+        snapshot = SymbolTableSnapshot.from_symbol_table(self.symbol_table)
+        namespace = snapshot.make_symbol_table().get_namespace("es")
+        eq_(namespace.get_object("booleano"), BoolVar())
+        eq_(namespace.get_object("mensaje"), String(u"¡Hola!"))
+        ok_(namespace.get_object("fulano") is PermissiveFunction)
+        eq_(namespace.get_object(u"semáforo", [u"tráfico"]), TrafficLightVar())
+        eq_(namespace.get_object(u"número e", [u"tráfico", "maths"]),
+            Number(2.7183))
+        ok_(namespace.get_object("colores", [u"tráfico"]) is self.colors)
+    
+    def test_opaque_operands(self):
+        """The operands which can't be imported or built are kept as is."""
+        snapshot = SymbolTableSnapshot.from_symbol_table(self.symbol_table)
+        eq_(snapshot.operands, (self.colors, ))
+    
+    def test_names_indexed(self):
+        """The symbol tables built can be changed as usual."""
+        snapshot = SymbolTableSnapshot.from_symbol_table(self.symbol_table)
+        symbol_table = snapshot.make_symbol_table()
+        symbol_table.add_object(Bind("boolean", BoolVar(), es="booleano"))
+        assert_raises(ScopeError, symbol_table.validate_scope)
+        assert_raises(ScopeError, symbol_table.add_object,
+                      Bind("bool", BoolVar(), es="booleano"))
+    
+    def test_serialization(self):
+        snapshot = SymbolTableSnapshot.from_symbol_table(self.symbol_table)
+        data = snapshot.to_bytes()
+        loaded_snapshot = SymbolTableSnapshot.from_bytes(data,
+                                                         snapshot.operands)
+        eq_(loaded_snapshot.to_bytes(), data)
+        eq_(loaded_snapshot.make_symbol_table(), self.symbol_table)
+        # The same table always results in the same snapshot:
+        other_snapshot = SymbolTableSnapshot.from_symbol_table(
+            loaded_snapshot.make_symbol_table())
+        eq_(other_snapshot.to_bytes(), data)
+    
+    def test_memory_mapped_file(self):
+        snapshot = SymbolTableSnapshot.from_symbol_table(self.symbol_table)
+        (file_descriptor, path) = mkstemp()
+        try:
+            os.write(file_descriptor, snapshot.to_bytes())
+            os.close(file_descriptor)
+            with open(path, "rb") as file_:
+                loaded_snapshot = SymbolTableSnapshot.from_file(
+                    file_, snapshot.operands)
+            eq_(loaded_snapshot.make_symbol_table(), self.symbol_table)
+        finally:
+            os.remove(path)
+    
+    def test_invalid_buffers(self):
+        snapshot = SymbolTableSnapshot.from_symbol_table(self.symbol_table)
+        data = snapshot.to_bytes()
+        assert_raises(ValueError, SymbolTableSnapshot.from_bytes, "", ())
+        assert_raises(ValueError, SymbolTableSnapshot.from_bytes,
+                      "X" + data[1:], snapshot.operands)
+        assert_raises(ValueError, SymbolTableSnapshot.from_bytes, data[:-8],
+                      snapshot.operands)
+        # The operands must be passed:
+        assert_raises(ValueError, SymbolTableSnapshot.from_bytes, data, ())
+    
+    def test_missing_references(self):
+        """The classes which can't be imported anymore are reported."""
+        snapshot = SymbolTableSnapshot.from_symbol_table(self.symbol_table)
+        data = snapshot.to_bytes().replace("PermissiveFunction",
+                                           "PermissiveFunctioN")
+        loaded_snapshot = SymbolTableSnapshot.from_bytes(data,
+                                                         snapshot.operands)
+        assert_raises(ImportError, loaded_snapshot.make_symbol_table)
+
+    
+    def test_configured_operands(self):
+        """
+        The operands which don't declare themselves stateless are opaque,
+        even if they equal a new instance of their class.
+        
+        """
+        height = ColumnVar("height")
+        eq_(height, ColumnVar())
+        symbol_table = SymbolTable("global", (Bind("height", height), ))
+        snapshot = SymbolTableSnapshot.from_symbol_table(symbol_table)
+        eq_(snapshot.operands, (height, ))
+        
+        loaded_snapshot = SymbolTableSnapshot.from_bytes(snapshot.to_bytes(),
+                                                         snapshot.operands)
+        namespace = loaded_snapshot.make_symbol_table().get_namespace()
+        operand = namespace.get_object("height")
+        ok_(operand is height)
+        eq_(operand.column, "height")
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2009-2010 by Gustavo Narea <http://gustavonarea.net/>.
+#
+# This file is part of Booleano <http://booleano.efous.org/>.
+#
+# This program is Freedomware: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+Tests for the evaluation of parse trees over streams of contexts.
+
+"""
+
+from nose.tools import eq_, ok_
+
+from booleano.parser.streaming import (StreamEvaluator, StreamStatistics,
+    filter_contexts, partition_contexts, iter_results, iter_chunks)
+from booleano.parser.trees import EvaluableParseTree
+
+from tests.utils.mock_nodes import BoolVar
+
+
+def _make_contexts(amount):
+    """Yield ``amount`` contexts, where every third one is true."""
+    for index in xrange(amount):
+        yield {'bool': index % 3 == 0, 'index': index}
+
+
+class TestStreaming(object):
+    """Tests for the lazy evaluation of streams of contexts."""
+    
+    tree = EvaluableParseTree(BoolVar())
+    
+    def test_results(self):
+        """The results must be yielded in order along with their contexts."""
+        results = iter_results(self.tree, _make_contexts(10), chunk_size=3)
+        eq_([(context['index'], result) for (context, result) in results],
+            [(0, True), (1, False), (2, False), (3, True), (4, False),
+             (5, False), (6, True), (7, False), (8, False), (9, True)])
+    
+    def test_filter(self):
+        contexts = filter_contexts(self.tree, _make_contexts(10), chunk_size=4)
+        eq_([context['index'] for context in contexts], [0, 3, 6, 9])
+    
+    def test_partition(self):
+        (matches, non_matches) = partition_contexts(self.tree,
+                                                    _make_contexts(6))
+        eq_([context['index'] for context in matches], [0, 3])
+        eq_([context['index'] for context in non_matches], [1, 2, 4, 5])
+    
+    def test_laziness(self):
+        """Contexts are consumed one chunk at a time."""
+        consumed = []
+        
+        def contexts():
+            for context in _make_contexts(100):
+                consumed.append(context)
+                yield context
+        
+        results = iter_results(self.tree, contexts(), chunk_size=10)
+        results.next()
+        eq_(len(consumed), 10)
+    
+    def test_statistics(self):
+        statistics = StreamStatistics()
+        eq_(statistics.throughput, 0.0)
+        contexts = filter_contexts(self.tree, _make_contexts(10), chunk_size=4,
+                                   statistics=statistics)
+        eq_(len(list(contexts)), 4)
+        eq_(statistics.evaluated, 10)
+        eq_(statistics.matched, 4)
+        eq_(statistics.chunks, 3)
+        ok_(statistics.elapsed_time >= 0)
+    
+    def test_worker_processes(self):
+        """Chunks can be evaluated by worker processes."""
+        statistics = StreamStatistics()
+        contexts = filter_contexts(self.tree, _make_contexts(100),
+                                   chunk_size=7, processes=2,
+                                   statistics=statistics)
+        eq_([context['index'] for context in contexts], range(0, 100, 3))
+        eq_(statistics.evaluated, 100)
+    
+    def test_evaluator(self):
+        """Several streams can be evaluated with the same evaluator."""
+        with StreamEvaluator(self.tree, chunk_size=2) as evaluator:
+            eq_(list(evaluator.evaluate(_make_contexts(4))),
+                [True, False, False, True])
+            results = evaluator.iter_results(_make_contexts(2))
+            eq_([(context['index'], result) for (context, result) in results],
+                [(0, True), (1, False)])
+    
+    def test_tree_methods(self):
+        contexts = self.tree.filter(_make_contexts(4))
+        eq_([context['index'] for context in contexts], [0, 3])
+        (matches, non_matches) = self.tree.partition(_make_contexts(4))
+        eq_(len(list(matches)), 2)
+        eq_(len(list(non_matches)), 2)
+
+
+def test_chunks():
+    chunks = iter_chunks(range(7), 3)
+    eq_(list(chunks), [[0, 1, 2], [3, 4, 5], [6]])
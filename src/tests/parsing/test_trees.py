@@ -20,16 +20,20 @@ Tests for the parse trees.
 
 """
 
+from concurrent.futures import ThreadPoolExecutor
 from nose.tools import eq_, ok_, assert_false, assert_raises
 
 from booleano.parser.trees import EvaluableParseTree, ConvertibleParseTree
-from booleano.nodes.operations import And
-from booleano.nodes.constants import String, PlaceholderVariable
+from booleano.nodes.operations import And, Or, LessThan, BelongsTo
+from booleano.nodes.constants import String, Number, Set
+from booleano.nodes.placeholders import PlaceholderVariable
 from booleano.exc import InvalidOperationError
 
+from tests.utils import MockExecutor
 from tests.utils.mock_converters import AntiConverter
 from tests.utils.mock_nodes import (TrafficLightVar,
-    PedestriansCrossingRoad, BoolVar, DriversAwaitingGreenLightVar)
+    PedestriansCrossingRoad, BoolVar, DriversAwaitingGreenLightVar,
+    MockKeyValueStore, StoredBoolVar, StoredNumVar)
 
 
 class TestEvaluableTrees(object):
@@ -65,6 +69,46 @@ class TestEvaluableTrees(object):
                    'drivers_traffic_light': ()}
         assert_false(tree(context))
     
+    def test_concurrent_evaluation(self):
+        """Trees can be evaluated with their branches run concurrently."""
+        operation = And(StoredBoolVar("active"), StoredBoolVar("admin"))
+        tree = EvaluableParseTree(operation)
+        store = MockKeyValueStore(active=True, admin=False)
+        context = {'store': store}
+        executor = MockExecutor()
+        
+        assert_false(tree.evaluate_concurrently(context, executor))
+        eq_(len(executor.futures), 2)
+        eq_(store.round_trips, 1)
+    
+    def test_thread_pool(self):
+        """Trees can be evaluated concurrently with a pool of threads."""
+        operation = Or(And(StoredBoolVar("active"), StoredBoolVar("admin")),
+                       LessThan(StoredNumVar("age"), StoredNumVar("limit")))
+        tree = EvaluableParseTree(operation)
+        executor = ThreadPoolExecutor(max_workers=2)
+        try:
+            store = MockKeyValueStore(active=True, admin=False, age=12,
+                                      limit=18)
+            ok_(tree.evaluate_concurrently({'store': store}, executor))
+            eq_(store.round_trips, 1)
+            store = MockKeyValueStore(active=True, admin=False, age=21,
+                                      limit=18)
+            assert_false(tree.evaluate_concurrently({'store': store},
+                                                    executor))
+        finally:
+            executor.shutdown()
+    
+    def test_partial_evaluation(self):
+        """Trees can be evaluated with incomplete contexts."""
+        operation = And(PedestriansCrossingRoad(), BoolVar())
+        tree = EvaluableParseTree(operation)
+        
+        eq_(tree.evaluate_partially({'pedestrians_crossroad': ()}), False)
+        eq_(tree.evaluate_partially({'pedestrians_crossroad': ("carla", )}),
+            EvaluableParseTree(BoolVar()))
+        ok_(tree.evaluate_partially({}) is tree)
+    
     def test_equivalence(self):
         tree1 = EvaluableParseTree(BoolVar())
         tree2 = EvaluableParseTree(BoolVar())
@@ -89,15 +133,99 @@ class TestEvaluableTrees(object):
     def test_string(self):
         tree = EvaluableParseTree(BoolVar())
         as_unicode = unicode(tree)
-        expected = "Evaluable parse tree (Anonymous variable [BoolVar])"
+        expected = "Evaluable parse tree (bool)"
         eq_(as_unicode, expected)
     
     def test_representation(self):
         tree = EvaluableParseTree(BoolVar())
-        expected = "<Parse tree (evaluable) <Anonymous variable [BoolVar]>>"
+        expected = "<Parse tree (evaluable) bool>"
         eq_(repr(tree), expected)
 
 
+class TestPrefetching(object):
+    """Tests for the prefetching of context data in evaluable trees."""
+    
+    def test_single_round_trip(self):
+        """All the keys in the tree must be loaded with one round trip."""
+        operation = And(
+            StoredBoolVar("active"),
+            Or(
+                LessThan(StoredNumVar("age"), StoredNumVar("limit")),
+                StoredBoolVar("admin"),
+                ),
+            )
+        tree = EvaluableParseTree(operation)
+        store = MockKeyValueStore(active=True, age=20, limit=18, admin=True)
+        context = {'store': store}
+        
+        ok_(tree(context))
+        eq_(store.round_trips, 1)
+        eq_(context['age'], 20)
+        eq_(context['admin'], True)
+    
+    def test_duplicate_keys(self):
+        """Keys requested by several nodes must be loaded just once."""
+        loaded_keys = []
+        
+        class RecordingBoolVar(StoredBoolVar):
+            @classmethod
+            def prefetch(cls, context, keys):
+                loaded_keys.append(keys)
+                super(RecordingBoolVar, cls).prefetch(context, keys)
+        
+        operation = Or(RecordingBoolVar("admin"), RecordingBoolVar("admin"))
+        tree = EvaluableParseTree(operation)
+        context = {'store': MockKeyValueStore(admin=False)}
+        
+        assert_false(tree(context))
+        eq_(loaded_keys, [("admin", )])
+    
+    def test_loaders_by_class(self):
+        """
+        The keys are grouped by the class which defines their bulk loader, so
+        the sub-classes which share a loader are prefetched together.
+        
+        """
+        loaded_keys = []
+        
+        class RecordingBoolVar(StoredBoolVar):
+            @classmethod
+            def prefetch(cls, context, keys):
+                loaded_keys.append((cls, keys))
+                super(RecordingBoolVar, cls).prefetch(context, keys)
+        
+        class OtherRecordingBoolVar(RecordingBoolVar):
+            pass
+        
+        operation = Or(
+            And(RecordingBoolVar("active"), StoredBoolVar("admin")),
+            OtherRecordingBoolVar("staff"),
+            )
+        tree = EvaluableParseTree(operation)
+        store = MockKeyValueStore(active=True, admin=False, staff=True)
+        
+        ok_(tree({'store': store}))
+        eq_(loaded_keys, [(RecordingBoolVar, ("active", "staff"))])
+        eq_(store.round_trips, 2)
+    
+    def test_set_members(self):
+        """The variables in sets are prefetched too."""
+        operation = BelongsTo(StoredNumVar("age"),
+                              Set(StoredNumVar("limit"), Number(21)))
+        tree = EvaluableParseTree(operation)
+        store = MockKeyValueStore(age=18, limit=18)
+        
+        ok_(tree({'store': store}))
+        eq_(store.round_trips, 1)
+    
+    def test_no_keys(self):
+        """Nothing is prefetched if no node requests it."""
+        tree = EvaluableParseTree(BoolVar())
+        context = {'bool': True}
+        tree.prefetch(context)
+        eq_(context, {'bool': True})
+
+
 class TestConvertibleTrees(object):
     """Tests for the convertible trees."""
     
@@ -133,12 +261,11 @@ class TestConvertibleTrees(object):
     def test_string(self):
         tree = ConvertibleParseTree(BoolVar())
         as_unicode = unicode(tree)
-        expected = "Convertible parse tree (Anonymous variable [BoolVar])"
+        expected = "Convertible parse tree (bool)"
         eq_(as_unicode, expected)
     
     def test_representation(self):
         tree = ConvertibleParseTree(BoolVar())
-        expected = "<Parse tree (convertible) " \
-                   "<Anonymous variable [BoolVar]>>"
+        expected = "<Parse tree (convertible) bool>"
         eq_(repr(tree), expected)
 
@@ -22,8 +22,10 @@ Utilities for Booleano's test suite.
 
 from logging import Handler, getLogger
 
+from concurrent.futures import Future
 
-__all__ = ["MockLoggingHandler", "LoggingHandlerFixture"]
+
+__all__ = ["MockLoggingHandler", "LoggingHandlerFixture", "MockExecutor"]
 
 
 class MockLoggingHandler(Handler):
@@ -56,3 +58,50 @@ class LoggingHandlerFixture(object):
     
     def undo(self):
         self.logger.removeHandler(self.handler)
+
+
+class MockExecutor(object):
+    """
+    Mock executor with the :class:`concurrent.futures.Executor` interface.
+    
+    Submitted calls are deferred until they are run explicitly, so tests can
+    check which ones were cancelled and which ones were run.
+    
+    """
+    
+    def __init__(self):
+        self.futures = []
+    
+    def submit(self, function, *args, **kwargs):
+        future = MockFuture(function, args, kwargs)
+        self.futures.append(future)
+        return future
+
+
+class MockFuture(Future):
+    """
+    Deferred call created by :class:`MockExecutor`.
+    
+    The call is only made when :meth:`run` is called, as a worker would do.
+    Once it's running, it can't be cancelled anymore.
+    
+    """
+    
+    def __init__(self, function, args, kwargs):
+        super(MockFuture, self).__init__()
+        self.function = function
+        self.args = args
+        self.kwargs = kwargs
+    
+    def run(self):
+        assert self.set_running_or_notify_cancel(), "The call was cancelled"
+        try:
+            result = self.function(*self.args, **self.kwargs)
+        except Exception, exc:
+            self.set_exception(exc)
+        else:
+            self.set_result(result)
+    
+    def result(self, timeout=None):
+        assert self.done() and not self.cancelled(), "The call wasn't made"
+        return super(MockFuture, self).result(timeout)
@@ -22,8 +22,8 @@ Mock converters.
 from booleano.nodes.converters import BaseConverter
 from booleano.nodes.operations import (Not, And, Or, Xor, Equal, NotEqual,
     LessThan, GreaterThan, LessEqual, GreaterEqual, BelongsTo, IsSubset)
-from booleano.nodes.constants import (String, Number, Set, PlaceholderVariable,
-                                     PlaceholderFunction)
+from booleano.nodes.constants import String, Number, Set
+from booleano.nodes.placeholders import PlaceholderVariable, PlaceholderFunction
 
 
 class AntiConverter(BaseConverter):
@@ -27,8 +27,9 @@ from booleano.nodes.datatypes import (BooleanType, NumberType, SetType,
 from booleano.nodes.constants import String
 
 
-__all__ = ["BranchNode", "BoolVar", "DriversAwaitingGreenLightVar", "LeafNode",
-           "NumVar", "PedestriansCrossingRoad", "PermissiveFunction",
+__all__ = ["BranchNode", "BoolVar", "ColumnVar", "DriversAwaitingGreenLightVar",
+           "LeafNode", "MockKeyValueStore", "NumVar", "PedestriansCrossingRoad",
+           "PermissiveFunction", "StoredBoolVar", "StoredNumVar",
            "TrafficLightVar", "TrafficViolationFunc", "VariableSet"]
 
 
@@ -71,6 +72,8 @@ class BoolVar(OperationNode, BooleanType):
     
     is_leaf = True
     
+    is_stateless = True
+    
     def __init__(self):
         self.evaluated = False
         super(BoolVar, self).__init__()
@@ -106,6 +109,29 @@ class NumVar(OperationNode, NumberType):
         return self.__class__.__name__
 
 
+class ColumnVar(OperationNode, NumberType):
+    """
+    Mock variable for a numeric column, which is equivalent to the variables
+    for any other column.
+    
+    """
+    
+    is_leaf = True
+    
+    def __init__(self, column="age"):
+        self.column = column
+        super(ColumnVar, self).__init__()
+    
+    def get_as_number(self, context):
+        return context[self.column]
+    
+    def __eq__(self, other):
+        return super(ColumnVar, self).__eq__(other)
+    
+    def __repr__(self):
+        return "<Column %s>" % self.column
+
+
 class TrafficLightVar(OperationNode, BooleanType, StringType):
     """
     Variable that represents a traffic light.
@@ -114,6 +140,8 @@ class TrafficLightVar(OperationNode, BooleanType, StringType):
     
     is_leaf = True
     
+    is_stateless = True
+    
     valid_colors = ("red", "amber", "green")
     
     def get_as_string(self, context):
@@ -175,6 +203,80 @@ class DriversAwaitingGreenLightVar(VariableSet):
     people_set = "drivers_trafficlight"
 
 
+#{ Mock variables backed by an external store
+
+
+class MockKeyValueStore(object):
+    """
+    In-memory key-value store which counts the round trips made to it.
+    
+    """
+    
+    def __init__(self, **items):
+        self.items = items
+        self.round_trips = 0
+    
+    def get(self, key):
+        self.round_trips += 1
+        return self.items[key]
+    
+    def get_many(self, keys):
+        self.round_trips += 1
+        return dict((key, self.items[key]) for key in keys)
+
+
+class StoredVar(OperationNode):
+    """
+    Base class for mock variables whose values live in a
+    :class:`MockKeyValueStore`.
+    
+    The context is a dictionary whose ``store`` item is the store itself.
+    Values prefetched from the store are kept in the same context.
+    
+    """
+    
+    is_leaf = True
+    
+    def __init__(self, key):
+        self.key = key
+        super(StoredVar, self).__init__()
+    
+    def get_prefetch_keys(self):
+        return (self.key, )
+    
+    @classmethod
+    def prefetch(cls, context, keys):
+        context.update(context['store'].get_many(keys))
+    
+    def _get_value(self, context):
+        if self.key not in context:
+            context[self.key] = context['store'].get(self.key)
+        return context[self.key]
+    
+    def __eq__(self, other):
+        equals = False
+        if super(StoredVar, self).__eq__(other):
+            equals = self.key == other.key
+        return equals
+    
+    def __repr__(self):
+        return "%s(%r)" % (self.__class__.__name__, self.key)
+
+
+class StoredBoolVar(StoredVar, BooleanType):
+    """Mock boolean variable backed by a :class:`MockKeyValueStore`."""
+    
+    def get_as_boolean(self, context):
+        return bool(self._get_value(context))
+
+
+class StoredNumVar(StoredVar, NumberType):
+    """Mock numeric variable backed by a :class:`MockKeyValueStore`."""
+    
+    def get_as_number(self, context):
+        return self._get_value(context)
+
+
 #{ Mock functions
 
 
@@ -215,7 +317,7 @@ class TrafficViolationFunc(Function, BooleanType):
             raise BadCallError("Only pedestrians and drivers have lights")
     
     def get_as_boolean(self, context):
-        if self.arguments['light'] == "pedestrians":
+        if self.arguments['light'].constant_value == "pedestrians":
             return context['pedestrians_light'] == "red" and \
                    len(context['people_crossing'])
         # It's the drivers' light.
@@ -223,5 +325,5 @@ class TrafficViolationFunc(Function, BooleanType):
                len(context['cars_crossing'])
     
     def __eq__(self, other):
-        return super(PermissiveFunction, self).__eq__(other)
+        return super(TrafficViolationFunc, self).__eq__(other)
 